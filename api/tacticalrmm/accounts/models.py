@@ -9,6 +9,7 @@ from django.db.models.fields import CharField, DateTimeField
 from logs.models import BaseAuditModel
 from tacticalrmm.constants import (
     ROLE_CACHE_PREFIX,
+    ROLE_PERMS_CACHE_PREFIX,
     AgentDblClick,
     AgentTableTabs,
     ClientTreeSort,
@@ -213,6 +214,8 @@ class Role(BaseAuditModel):
     def save(self, *args, **kwargs) -> None:
         # delete cache on save
         cache.delete(f"{ROLE_CACHE_PREFIX}{self.name}")
+        if self.pk:
+            cache.delete(f"{ROLE_PERMS_CACHE_PREFIX}{self.pk}")
         super().save(*args, **kwargs)
 
     @staticmethod
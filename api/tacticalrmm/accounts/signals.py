@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from agents.models import Agent
+from clients.models import Client, Site
+from tacticalrmm.constants import AGENT_SITE_CACHE_PREFIX, ROLE_PERMS_CACHE_PREFIX
+
+from .models import Role
+
+
+@receiver(m2m_changed, sender=Role.can_view_clients.through)
+@receiver(m2m_changed, sender=Role.can_view_sites.through)
+def clear_role_perms_cache(sender, instance, action: str, reverse: bool, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    if reverse:
+        # changed from the client/site side, so any role could be affected
+        cache.delete_many_pattern(f"{ROLE_PERMS_CACHE_PREFIX}*")
+    else:
+        cache.delete(f"{ROLE_PERMS_CACHE_PREFIX}{instance.pk}")
+
+
+@receiver(post_delete, sender=Agent)
+def clear_agent_site_cache(sender, instance: Agent, **kwargs):
+    cache.delete(f"{AGENT_SITE_CACHE_PREFIX}{instance.agent_id}")
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Site)
+def clear_deleted_client_site_caches(sender, instance, **kwargs):
+    # deleting the m2m rows sends no m2m_changed, so any role could be affected
+    cache.delete_many_pattern(f"{ROLE_PERMS_CACHE_PREFIX}*")
+    cache.delete_many_pattern(f"{AGENT_SITE_CACHE_PREFIX}*")
+
+
+@receiver(post_delete, sender=Role)
+def clear_deleted_role_cache(sender, instance: Role, **kwargs):
+    cache.delete(f"{ROLE_PERMS_CACHE_PREFIX}{instance.pk}")
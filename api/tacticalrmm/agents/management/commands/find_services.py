@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
+from django.db.models import Q
 
-from agents.models import Agent
-from tacticalrmm.constants import AGENT_DEFER
+from services.models import AgentService
 
 
 class Command(BaseCommand):
@@ -11,20 +11,18 @@ class Command(BaseCommand):
         parser.add_argument("name", type=str)
 
     def handle(self, *args, **kwargs):
-        search = kwargs["name"].lower()
+        search = kwargs["name"]
 
-        agents = Agent.objects.defer(*AGENT_DEFER)
-        for agent in agents:
-            try:
-                for svc in agent.services:
-                    if (
-                        search in svc["name"].lower()
-                        or search in svc["display_name"].lower()
-                    ):
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"{agent.hostname} - {svc['name']} ({svc['display_name']}) - {svc['status']}"
-                            )
-                        )
-            except:
-                continue
+        services = (
+            AgentService.objects.filter(
+                Q(name__icontains=search) | Q(display_name__icontains=search)
+            )
+            .select_related("agent")
+            .order_by("agent__hostname", "name")
+        )
+        for svc in services.iterator(chunk_size=500):
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{svc.agent.hostname} - {svc.name} ({svc.display_name}) - {svc.status}"
+                )
+            )
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.16 on 2026-10-19 08:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0060_agenthistory_collector_all_output_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentInventory",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("wmi_detail", models.JSONField(blank=True, null=True)),
+                ("services", models.JSONField(blank=True, null=True)),
+                ("disks", models.JSONField(blank=True, null=True)),
+                (
+                    "agent",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory",
+                        to="agents.agent",
+                    ),
+                ),
+            ],
+        ),
+        # use lz4 for the toasted json columns when the postgres build supports it
+        migrations.RunSQL(
+            sql="""
+            DO $$
+            BEGIN
+                ALTER TABLE agents_agentinventory
+                    ALTER COLUMN wmi_detail SET COMPRESSION lz4,
+                    ALTER COLUMN services SET COMPRESSION lz4,
+                    ALTER COLUMN disks SET COMPRESSION lz4;
+            EXCEPTION WHEN OTHERS THEN
+                RAISE NOTICE 'lz4 compression not available, using default';
+            END $$;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO agents_agentinventory (agent_id, wmi_detail, services, disks)
+            SELECT id, wmi_detail, services, disks FROM agents_agent;
+            """,
+            reverse_sql="""
+            UPDATE agents_agent
+            SET wmi_detail = inv.wmi_detail, services = inv.services, disks = inv.disks
+            FROM agents_agentinventory inv
+            WHERE inv.agent_id = agents_agent.id;
+            """,
+        ),
+        migrations.RemoveField(
+            model_name="agent",
+            name="disks",
+        ),
+        migrations.RemoveField(
+            model_name="agent",
+            name="services",
+        ),
+        migrations.RemoveField(
+            model_name="agent",
+            name="wmi_detail",
+        ),
+    ]
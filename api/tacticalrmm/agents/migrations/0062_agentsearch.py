@@ -0,0 +1,134 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:19
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# builds the weighted search document for a single agent from the agent row and
+# its inventory. A: hostname, description  B: users, ips, serial  C: make/model
+# D: service names
+REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION agents_agentsearch_refresh(target integer) RETURNS void AS $$
+    INSERT INTO agents_agentsearch (agent_id, vector)
+    SELECT
+        a.id,
+        setweight(to_tsvector('simple', concat_ws(' ', a.hostname, a.description)), 'A')
+        || setweight(to_tsvector('simple', concat_ws(' ',
+            a.logged_in_username,
+            a.last_logged_in_user,
+            a.public_ip,
+            (SELECT string_agg(v #>> '{}', ' ') FROM (
+                SELECT jsonb_path_query(i.wmi_detail, '$.network_config[*][*].IPAddress[*]') AS v
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.local_ips[*]')
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.bios[*][*].SerialNumber')
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.serialnumber')
+            ) d)
+        )), 'B')
+        || setweight(to_tsvector('simple', coalesce((SELECT string_agg(v #>> '{}', ' ') FROM (
+                SELECT jsonb_path_query(i.wmi_detail, '$.comp_sys_prod[*][*].Vendor') AS v
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.comp_sys[*][*].Model')
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.comp_sys[*][*].SystemFamily')
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.base_board[*][*].Manufacturer')
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.base_board[*][*].Product')
+                UNION ALL SELECT jsonb_path_query(i.wmi_detail, '$.make_model')
+            ) m), '')), 'C')
+        || setweight(to_tsvector('simple', coalesce((SELECT string_agg(v #>> '{}', ' ') FROM (
+                SELECT jsonb_path_query(i.services, '$[*].name') AS v
+                UNION ALL SELECT jsonb_path_query(i.services, '$[*].display_name')
+            ) s), '')), 'D')
+    FROM agents_agent a
+    LEFT JOIN agents_agentinventory i ON i.agent_id = a.id
+    WHERE a.id = target
+    ON CONFLICT (agent_id) DO UPDATE SET vector = EXCLUDED.vector;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION agents_agentsearch_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'agents_agent' THEN
+        PERFORM agents_agentsearch_refresh(NEW.id);
+    ELSE
+        PERFORM agents_agentsearch_refresh(NEW.agent_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER agents_agent_search_insert
+    AFTER INSERT ON agents_agent
+    FOR EACH ROW EXECUTE FUNCTION agents_agentsearch_trigger();
+
+CREATE TRIGGER agents_agent_search_update
+    AFTER UPDATE ON agents_agent
+    FOR EACH ROW WHEN (
+        OLD.hostname IS DISTINCT FROM NEW.hostname
+        OR OLD.description IS DISTINCT FROM NEW.description
+        OR OLD.logged_in_username IS DISTINCT FROM NEW.logged_in_username
+        OR OLD.last_logged_in_user IS DISTINCT FROM NEW.last_logged_in_user
+        OR OLD.public_ip IS DISTINCT FROM NEW.public_ip
+    ) EXECUTE FUNCTION agents_agentsearch_trigger();
+
+CREATE TRIGGER agents_agentinventory_search_insert
+    AFTER INSERT ON agents_agentinventory
+    FOR EACH ROW EXECUTE FUNCTION agents_agentsearch_trigger();
+
+CREATE TRIGGER agents_agentinventory_search_update
+    AFTER UPDATE ON agents_agentinventory
+    FOR EACH ROW WHEN (
+        OLD.wmi_detail IS DISTINCT FROM NEW.wmi_detail
+        OR OLD.services IS DISTINCT FROM NEW.services
+    ) EXECUTE FUNCTION agents_agentsearch_trigger();
+
+SELECT agents_agentsearch_refresh(id) FROM agents_agent;
+"""
+
+DROP_FUNCTION = """
+DROP TRIGGER IF EXISTS agents_agent_search_insert ON agents_agent;
+DROP TRIGGER IF EXISTS agents_agent_search_update ON agents_agent;
+DROP TRIGGER IF EXISTS agents_agentinventory_search_insert ON agents_agentinventory;
+DROP TRIGGER IF EXISTS agents_agentinventory_search_update ON agents_agentinventory;
+DROP FUNCTION IF EXISTS agents_agentsearch_trigger();
+DROP FUNCTION IF EXISTS agents_agentsearch_refresh(integer);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0061_agentinventory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentSearch",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vector", django.contrib.postgres.search.SearchVectorField(null=True)),
+                (
+                    "agent",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search",
+                        to="agents.agent",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["vector"], name="agents_search_vector_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(sql=REFRESH_FUNCTION, reverse_sql=DROP_FUNCTION),
+    ]
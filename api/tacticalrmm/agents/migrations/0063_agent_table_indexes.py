@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0062_agentsearch"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="agent",
+            index=models.Index(
+                fields=["hostname", "id"], name="agents_agen_hostnam_7acc45_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="agent",
+            index=models.Index(
+                fields=["last_seen", "id"], name="agents_agen_last_se_5d69fd_idx"
+            ),
+        ),
+    ]
@@ -10,6 +10,8 @@ import nats
 import validators
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
 from django.core.cache import cache
 from django.db import models
 from django.utils import timezone as djangotime
@@ -23,6 +25,8 @@ from core.models import TZ_CHOICES
 from core.utils import _b64_to_hex, get_core_settings, send_command_with_mesh
 from logs.models import BaseAuditModel, DebugLog, PendingAction
 from tacticalrmm.constants import (
+    AGENT_INVENTORY_FIELDS,
+    AGENT_SITE_CACHE_PREFIX,
     AGENT_STATUS_OFFLINE,
     AGENT_STATUS_ONLINE,
     AGENT_STATUS_OVERDUE,
@@ -61,6 +65,9 @@ class Agent(BaseAuditModel):
     class Meta:
         indexes = [
             models.Index(fields=["monitoring_type"]),
+            # keyset pagination of the agent table
+            models.Index(fields=["hostname", "id"]),
+            models.Index(fields=["last_seen", "id"]),
         ]
 
     objects = PermissionQuerySet.as_manager()
@@ -76,10 +83,8 @@ class Agent(BaseAuditModel):
     hostname = models.CharField(max_length=255)
     agent_id = models.CharField(max_length=200, unique=True)
     last_seen = models.DateTimeField(null=True, blank=True)
-    services = models.JSONField(null=True, blank=True)
     public_ip = models.CharField(null=True, max_length=255)
     total_ram = models.IntegerField(null=True, blank=True)
-    disks = models.JSONField(null=True, blank=True)
     boot_time = models.FloatField(null=True, blank=True)
     logged_in_username = models.CharField(null=True, blank=True, max_length=255)
     last_logged_in_user = models.CharField(null=True, blank=True, max_length=255)
@@ -96,7 +101,6 @@ class Agent(BaseAuditModel):
     check_interval = models.PositiveIntegerField(default=120)
     needs_reboot = models.BooleanField(default=False)
     choco_installed = models.BooleanField(default=False)
-    wmi_detail = models.JSONField(null=True, blank=True)
     patches_last_installed = models.DateTimeField(null=True, blank=True)
     time_zone = models.CharField(
         max_length=255, choices=TZ_CHOICES, null=True, blank=True
@@ -127,12 +131,20 @@ class Agent(BaseAuditModel):
         return self.hostname
 
     def save(self, *args, **kwargs):
+        # inventory fields live on AgentInventory, strip them from update_fields
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = [
+                field for field in update_fields if field not in AGENT_INVENTORY_FIELDS
+            ]
+
         # prevent recursion since calling set_alert_template() also calls save()
         if not hasattr(self, "_processing_set_alert_template"):
             self._processing_set_alert_template = False
 
+        orig = None
         if self.pk and not self._processing_set_alert_template:
-            orig = Agent.objects.get(pk=self.pk)
+            orig = self.get_original()
             mon_type_changed = self.monitoring_type != orig.monitoring_type
             site_changed = self.site_id != orig.site_id
             policy_changed = self.policy != orig.policy
@@ -140,12 +152,72 @@ class Agent(BaseAuditModel):
                 self.block_policy_inheritance != orig.block_policy_inheritance
             )
 
+            if site_changed:
+                cache.delete(f"{AGENT_SITE_CACHE_PREFIX}{self.agent_id}")
+
             if mon_type_changed or site_changed or policy_changed or block_inherit:
                 self._processing_set_alert_template = True
                 self.set_alert_template()
                 self._processing_set_alert_template = False
 
-        super().save(*args, **kwargs)
+        super().save(old_model=orig, *args, **kwargs)
+
+        if getattr(self, "_inventory_fields", None):
+            self.save_inventory()
+
+    def get_inventory(self) -> "AgentInventory":
+        # inventory is only fetched from the db the first time it is accessed
+        # use select_related("inventory") when it is needed for many agents
+        try:
+            return self.inventory
+        except AgentInventory.DoesNotExist:
+            self.inventory = AgentInventory(agent=self)
+            return self.inventory
+
+    def _set_inventory_field(self, field: str, value: Any) -> None:
+        setattr(self.get_inventory(), field, value)
+        # only the fields set here are written, natsapi updates the others
+        fields: set[str] = getattr(self, "_inventory_fields", set())
+        fields.add(field)
+        self._inventory_fields = fields
+
+    def save_inventory(self) -> None:
+        inventory = self.get_inventory()
+        inventory.agent = self
+        fields = getattr(self, "_inventory_fields", set())
+        if inventory._state.adding:
+            # natsapi upserts the same row, so it may have been created since
+            # the inventory was read
+            self.inventory, _ = AgentInventory.objects.update_or_create(
+                agent=self, defaults={f: getattr(inventory, f) for f in fields}
+            )
+        elif fields:
+            inventory.save(update_fields=sorted(fields))
+        self._inventory_fields = set()
+
+    @property
+    def wmi_detail(self) -> Any:
+        return self.get_inventory().wmi_detail
+
+    @wmi_detail.setter
+    def wmi_detail(self, value: Any) -> None:
+        self._set_inventory_field("wmi_detail", value)
+
+    @property
+    def services(self) -> Any:
+        return self.get_inventory().services
+
+    @services.setter
+    def services(self, value: Any) -> None:
+        self._set_inventory_field("services", value)
+
+    @property
+    def disks(self) -> Any:
+        return self.get_inventory().disks
+
+    @disks.setter
+    def disks(self, value: Any) -> None:
+        self._set_inventory_field("disks", value)
 
     @property
     def client(self) -> "Client":
@@ -238,6 +310,26 @@ class Agent(BaseAuditModel):
         else:
             return AGENT_STATUS_OFFLINE
 
+    @staticmethod
+    def status_filter(status: str) -> models.Q:
+        # the status property expressed in sql so agent lists can be filtered in the db
+        now = djangotime.now()
+        offline = models.Value(now) - models.F("offline_time") * models.Value(
+            djangotime.timedelta(minutes=1)
+        )
+        overdue = models.Value(now) - models.F("overdue_time") * models.Value(
+            djangotime.timedelta(minutes=1)
+        )
+
+        if status == AGENT_STATUS_ONLINE:
+            return models.Q(last_seen__gte=offline)
+        elif status == AGENT_STATUS_OVERDUE:
+            return models.Q(last_seen__lt=offline) & models.Q(last_seen__lt=overdue)
+
+        return models.Q(last_seen__isnull=True) | (
+            models.Q(last_seen__lt=offline) & models.Q(last_seen__gt=overdue)
+        )
+
     @property
     def checks(self) -> Dict[str, Any]:
         total, passing, failing, warning, info = 0, 0, 0, 0, 0
@@ -1018,6 +1110,55 @@ class Agent(BaseAuditModel):
         )
 
 
+class AgentInventory(models.Model):
+    # large json blobs reported by the agent, kept off the agents_agent row
+    # so that status queries and list endpoints stay narrow
+    objects = PermissionQuerySet.as_manager()
+
+    agent = models.OneToOneField(
+        Agent,
+        related_name="inventory",
+        on_delete=models.CASCADE,
+    )
+    wmi_detail = models.JSONField(null=True, blank=True)
+    services = models.JSONField(null=True, blank=True)
+    disks = models.JSONField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return self.agent.hostname
+
+
+class AgentSearch(models.Model):
+    # full text search document for an agent. rows are maintained in the database
+    # by triggers on agents_agent and agents_agentinventory (see migration 0062)
+    # so that writes coming from natsapi are picked up as well
+    agent = models.OneToOneField(
+        Agent,
+        related_name="search",
+        on_delete=models.CASCADE,
+    )
+    vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["vector"], name="agents_search_vector_idx")]
+
+    def __str__(self) -> str:
+        return self.agent.hostname
+
+    @staticmethod
+    def parse_query(text: str) -> Optional[SearchQuery]:
+        # every term is matched as a prefix so partial hostnames and ips work
+        terms = re.findall(r"[\w.@-]+", text)
+        if not terms:
+            return None
+
+        return SearchQuery(
+            " & ".join(f"'{term}':*" for term in terms),
+            search_type="raw",
+            config="simple",
+        )
+
+
 class Note(models.Model):
     objects = PermissionQuerySet.as_manager()
 
@@ -44,6 +44,9 @@ class AgentSerializer(serializers.ModelSerializer):
     applied_policies = serializers.SerializerMethodField()
     effective_patch_policy = serializers.SerializerMethodField()
     alert_template = serializers.SerializerMethodField()
+    wmi_detail = serializers.ReadOnlyField()
+    services = serializers.ReadOnlyField()
+    disks = serializers.ReadOnlyField()
 
     def get_alert_template(self, obj):
         from alerts.serializers import AlertTemplateSerializer
@@ -175,6 +178,29 @@ class AgentHostnameSerializer(serializers.ModelSerializer):
         )
 
 
+class AgentSearchSerializer(serializers.ModelSerializer):
+    client = serializers.ReadOnlyField(source="client.name")
+    site = serializers.ReadOnlyField(source="site.name")
+    status = serializers.ReadOnlyField()
+    rank = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Agent
+        fields = (
+            "agent_id",
+            "hostname",
+            "client",
+            "site",
+            "description",
+            "plat",
+            "monitoring_type",
+            "status",
+            "logged_in_username",
+            "public_ip",
+            "rank",
+        )
+
+
 class AgentNoteSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source="user.username")
     agent_id = serializers.ReadOnlyField(source="agent.agent_id")
@@ -196,4 +222,4 @@ class AgentHistorySerializer(serializers.ModelSerializer):
 class AgentAuditSerializer(serializers.ModelSerializer):
     class Meta:
         model = Agent
-        exclude = ["disks", "services", "wmi_detail"]
+        fields = "__all__"
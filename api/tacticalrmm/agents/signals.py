@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from checks.models import CheckHistory
+
+from .models import Agent
+
+
+@receiver(post_delete, sender=Agent)
+def delete_agent_check_history(sender, instance: Agent, **kwargs):
+    # CheckHistory only stores the agent_id string, so nothing cascades to it
+    CheckHistory.objects.filter(agent_id=instance.agent_id).delete()
@@ -18,6 +18,7 @@ from tacticalrmm.constants import (
     DebugLogType,
 )
 from tacticalrmm.helpers import rand_range
+from tacticalrmm.prune import prune_older_than
 from tacticalrmm.utils import redis_lock
 
 if TYPE_CHECKING:
@@ -247,11 +248,13 @@ def clear_faults_task(older_than_days: int) -> None:
 def prune_agent_history(older_than_days: int) -> str:
     from .models import AgentHistory
 
-    AgentHistory.objects.filter(
-        time__lt=djangotime.now() - djangotime.timedelta(days=older_than_days)
-    ).delete()
-
-    return "ok"
+    return str(
+        prune_older_than(
+            AgentHistory.objects.all(),
+            "time",
+            djangotime.now() - djangotime.timedelta(days=older_than_days),
+        )
+    )
 
 
 @app.task
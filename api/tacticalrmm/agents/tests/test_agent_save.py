@@ -2,7 +2,7 @@ from unittest.mock import patch
 
 from model_bakery import baker
 
-from agents.models import Agent
+from agents.models import Agent, AgentInventory
 from tacticalrmm.constants import AgentMonType
 from tacticalrmm.test import TacticalTestCase
 
@@ -59,3 +59,91 @@ class AgentSaveTestCase(TacticalTestCase):
         self.agent.hostname = "abc123"
         self.agent.save()
         mock_set_alert_template.assert_not_called()
+
+
+class AgentInventoryTestCase(TacticalTestCase):
+    def setUp(self):
+        self.agent = baker.make_recipe("agents.agent")
+
+    def test_inventory_is_created_on_save(self):
+        self.assertFalse(AgentInventory.objects.filter(agent=self.agent).exists())
+        self.assertIsNone(self.agent.wmi_detail)
+
+        self.agent.disks = [{"device": "C:", "percent": 50}]
+        self.agent.save()
+
+        inventory = AgentInventory.objects.get(agent=self.agent)
+        self.assertEqual(inventory.disks, [{"device": "C:", "percent": 50}])
+        self.assertIsNone(inventory.services)
+
+    def test_inventory_kwargs_on_create(self):
+        agent = baker.make_recipe("agents.agent_with_services")
+        self.assertEqual(
+            Agent.objects.get(pk=agent.pk).services[0]["name"], "AeLookupSvc"
+        )
+
+    def test_inventory_update_fields(self):
+        self.agent.services = [{"name": "spooler"}]
+        self.agent.hostname = "changed"
+        self.agent.save(update_fields=["services"])
+
+        agent = Agent.objects.get(pk=self.agent.pk)
+        self.assertEqual(agent.services, [{"name": "spooler"}])
+        self.assertNotEqual(agent.hostname, "changed")
+
+    def test_save_inventory_only_writes_changed_fields(self):
+        self.agent.services = []
+        self.agent.save()
+        agent = Agent.objects.get(pk=self.agent.pk)
+        agent.get_inventory()
+
+        # written by natsapi after the inventory was loaded
+        AgentInventory.objects.filter(agent=self.agent).update(
+            disks=[{"device": "C:"}], wmi_detail={"bios": []}
+        )
+        agent.services = [{"name": "spooler"}]
+        agent.save_inventory()
+
+        inventory = AgentInventory.objects.get(agent=self.agent)
+        self.assertEqual(inventory.services, [{"name": "spooler"}])
+        self.assertEqual(inventory.disks, [{"device": "C:"}])
+        self.assertEqual(inventory.wmi_detail, {"bios": []})
+
+    def test_save_inventory_created_concurrently(self):
+        agent = baker.make_recipe("agents.agent")
+        AgentInventory.objects.filter(agent=agent).delete()
+        agent = Agent.objects.get(pk=agent.pk)
+        agent.services = [{"name": "spooler"}]
+
+        # natsapi inserted the row after the agent found none
+        AgentInventory.objects.create(agent_id=agent.pk, disks=[{"device": "C:"}])
+        agent.save()
+
+        inventory = AgentInventory.objects.get(agent=agent)
+        self.assertEqual(inventory.services, [{"name": "spooler"}])
+        self.assertEqual(inventory.disks, [{"device": "C:"}])
+
+        agent.services = []
+        agent.save()
+        self.assertEqual(AgentInventory.objects.get(agent=agent).services, [])
+
+    def test_inventory_not_loaded_with_agent(self):
+        agent = baker.make_recipe("agents.agent_with_wmi")
+
+        with self.assertNumQueries(1):
+            agent = Agent.objects.get(pk=agent.pk)
+
+        with self.assertNumQueries(1):
+            self.assertIn("bios", agent.wmi_detail)
+            agent.serial_number
+
+        with self.assertNumQueries(1):
+            agent = Agent.objects.select_related("inventory").get(pk=agent.pk)
+            agent.serial_number
+            agent.services
+
+    def test_inventory_deleted_with_agent(self):
+        self.agent.services = []
+        self.agent.save()
+        self.agent.delete()
+        self.assertFalse(AgentInventory.objects.exists())
@@ -0,0 +1,100 @@
+from model_bakery import baker
+
+from agents.models import Agent, AgentSearch
+from tacticalrmm.test import TacticalTestCase
+
+base_url = "/agents/search/"
+
+
+class TestAgentSearch(TacticalTestCase):
+    def setUp(self):
+        self.authenticate()
+        self.setup_coresettings()
+
+    def search(self, text: str) -> "list[str]":
+        return list(
+            Agent.objects.filter(
+                search__vector=AgentSearch.parse_query(text)
+            ).values_list("hostname", flat=True)
+        )
+
+    def test_parse_query(self):
+        self.assertIsNone(AgentSearch.parse_query(""))
+        self.assertIsNone(AgentSearch.parse_query("  '&!  "))
+        self.assertIsNotNone(AgentSearch.parse_query("desk 10.0"))
+
+    def test_search_document_maintained(self):
+        agent = baker.make_recipe(
+            "agents.agent", hostname="DESKTOP-ACCT01", description="front desk"
+        )
+        self.assertEqual(AgentSearch.objects.filter(agent=agent).count(), 1)
+        self.assertEqual(self.search("desktop-acc"), ["DESKTOP-ACCT01"])
+        self.assertEqual(self.search("front"), ["DESKTOP-ACCT01"])
+
+        agent.hostname = "LAPTOP-SALES02"
+        agent.logged_in_username = "jdoe"
+        agent.save()
+        self.assertEqual(self.search("desktop"), [])
+        self.assertEqual(self.search("laptop jdoe"), ["LAPTOP-SALES02"])
+
+    def test_search_inventory(self):
+        baker.make_recipe("agents.agent_with_wmi", hostname="wmi-agent")
+        baker.make_recipe("agents.agent_with_services", hostname="svc-agent")
+
+        self.assertEqual(self.search("172.17.9"), ["wmi-agent"])
+        self.assertEqual(self.search("inspiron"), ["wmi-agent"])
+        self.assertEqual(self.search("aelookup"), ["svc-agent"])
+        self.assertEqual(self.search("layer gateway"), ["svc-agent"])
+
+        agent = Agent.objects.get(hostname="svc-agent")
+        agent.services = []
+        agent.save()
+        self.assertEqual(self.search("aelookup"), [])
+
+    def test_search_agents(self):
+        baker.make_recipe(
+            "agents.agent", hostname="fileserver", description="prod", _quantity=3
+        )
+        baker.make_recipe("agents.agent", hostname="prod-sql01")
+        baker.make_recipe("agents.agent", hostname="other")
+
+        r = self.client.get(base_url, {"q": "prod"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["count"], 4)
+        # hostname matches rank above description matches
+        self.assertEqual(r.data["results"][0]["hostname"], "prod-sql01")
+
+        r = self.client.get(base_url, {"q": "prod", "page_size": 2, "page": 2})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data["results"]), 2)
+
+        r = self.client.get(base_url, {"q": ""})
+        self.assertEqual(r.status_code, 400)
+
+        self.check_not_authenticated("get", base_url)
+
+    def test_search_agents_permissions(self):
+        agents = [
+            baker.make_recipe(
+                "agents.agent", hostname="printsrv", site=baker.make("clients.Site")
+            )
+            for _ in range(2)
+        ]
+        user = self.create_user_with_roles(["can_list_agents"])
+        self.client.force_authenticate(user=user)
+
+        user.role.can_view_sites.set([agents[0].site])
+        r = self.client.get(base_url, {"q": "printsrv"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(
+            [i["agent_id"] for i in r.data["results"]], [agents[0].agent_id]
+        )
+
+        user.role.can_view_sites.clear()
+        r = self.client.get(base_url, {"q": "printsrv"})
+        self.assertEqual(r.data["count"], 2)
+
+        user = self.create_user_with_roles([])
+        self.client.force_authenticate(user=user)
+        r = self.client.get(base_url, {"q": "printsrv"})
+        self.assertEqual(r.status_code, 403)
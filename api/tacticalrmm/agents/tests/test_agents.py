@@ -6,6 +6,7 @@ from unittest.mock import PropertyMock, patch
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
+from django.db.models import F
 from django.utils import timezone as djangotime
 from model_bakery import baker
 
@@ -20,6 +21,8 @@ from tacticalrmm.constants import (
     AGENT_STATUS_OFFLINE,
     AGENT_STATUS_ONLINE,
     AgentMonType,
+    AgentPlat,
+    CheckStatus,
     CustomFieldModel,
     CustomFieldType,
     EvtLogNames,
@@ -101,6 +104,93 @@ class TestAgentsList(TacticalTestCase):
 
         self.check_not_authenticated("get", url)
 
+    def test_get_agents_paged(self) -> None:
+        url = f"{base_url}/"
+
+        site1: "Site" = baker.make("clients.Site")
+        site2: "Site" = baker.make("clients.Site")
+        online = baker.make_recipe(
+            "agents.online_agent",
+            site=site1,
+            hostname=cycle(["b-host", "a-host", "c-host"]),
+            _quantity=9,
+        )
+        baker.make_recipe("agents.overdue_agent", site=site2, _quantity=3)
+        baker.make_recipe(
+            "agents.agent", site=site2, plat=AgentPlat.LINUX, last_seen=None
+        )
+        baker.make("winupdate.WinUpdate", agent=online[0], action="approve")
+        baker.make(
+            "checks.CheckResult",
+            agent=online[1],
+            assigned_check=baker.make_recipe("checks.ping_check", agent=online[1]),
+            status=CheckStatus.FAILING,
+        )
+
+        # walk all pages and make sure every agent is returned exactly once in order
+        seen = []
+        params = {"page_size": 4, "ordering": "hostname"}
+        while True:
+            r = self.client.get(url, params, format="json")
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.data["count"], 13)
+            seen.extend(i["hostname"] for i in r.data["results"])
+            if not r.data["next"]:
+                break
+            params["cursor"] = r.data["next"]
+
+        self.assertEqual(len(seen), 13)
+        self.assertEqual(seen, sorted(seen))
+
+        # nullable sort column, descending
+        seen = []
+        params = {"page_size": 5, "ordering": "-last_seen", "detail": "false"}
+        while True:
+            r = self.client.get(url, params, format="json")
+            seen.extend(i["agent_id"] for i in r.data["results"])
+            if not r.data["next"]:
+                break
+            params["cursor"] = r.data["next"]
+
+        self.assertEqual(
+            seen,
+            list(
+                Agent.objects.order_by(
+                    F("last_seen").desc(nulls_first=True), "-pk"
+                ).values_list("agent_id", flat=True)
+            ),
+        )
+
+        r = self.client.get(url, {"page_size": 50, "status": "overdue"})
+        self.assertEqual(r.data["count"], 3)
+
+        r = self.client.get(url, {"page_size": 50, "status": "offline"})
+        self.assertEqual(r.data["count"], 1)
+
+        r = self.client.get(
+            url, {"page_size": 50, "status": "online", "site": site1.pk}
+        )
+        self.assertEqual(r.data["count"], 9)
+
+        r = self.client.get(url, {"page_size": 50, "plat": AgentPlat.LINUX})
+        self.assertEqual(r.data["count"], 1)
+
+        r = self.client.get(url, {"page_size": 50, "patches_pending": "true"})
+        self.assertEqual(
+            [i["agent_id"] for i in r.data["results"]], [online[0].agent_id]
+        )
+
+        r = self.client.get(url, {"page_size": 50, "failing_checks": "true"})
+        self.assertEqual(
+            [i["agent_id"] for i in r.data["results"]], [online[1].agent_id]
+        )
+
+        r = self.client.get(url, {"page_size": 50, "status": "asleep"})
+        self.assertEqual(r.status_code, 400)
+
+        r = self.client.get(url, {"cursor": "garbage"})
+        self.assertEqual(r.status_code, 404)
+
 
 class TestAgentViews(TacticalTestCase):
     def setUp(self):
@@ -214,7 +304,7 @@ class TestAgentViews(TacticalTestCase):
     @patch("asyncio.run")
     @patch("core.utils._b64_to_hex")
     @patch("agents.models.Agent.nats_cmd")
-    @patch("agents.views.reload_nats")
+    @patch("agents.views.schedule_reload_nats")
     def test_agent_uninstall(
         self, reload_nats, nats_cmd, b64_to_hex, asyncio_run1, asyncio_run2
     ):
@@ -1011,7 +1101,7 @@ class TestAgentPermissions(TacticalTestCase):
     @patch("asyncio.run")
     @patch("core.utils._b64_to_hex")
     @patch("agents.models.Agent.nats_cmd")
-    @patch("agents.views.reload_nats")
+    @patch("agents.views.schedule_reload_nats")
     def test_get_edit_uninstall_permissions(
         self, reload_nats, nats_cmd, b64_to_hex, asyncio_run
     ):
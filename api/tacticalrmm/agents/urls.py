@@ -9,6 +9,7 @@ from . import views
 urlpatterns = [
     # agent views
     path("", views.GetAgents.as_view()),
+    path("search/", views.SearchAgents.as_view()),
     path("<agent:agent_id>/", views.GetUpdateDeleteAgent.as_view()),
     path("<agent:agent_id>/cmd/", views.send_raw_cmd),
     path("<agent:agent_id>/runscript/", views.run_script),
@@ -1,5 +1,6 @@
 import asyncio
 import datetime as dt
+import hashlib
 import random
 import string
 import time
@@ -7,7 +8,9 @@ from io import StringIO
 from pathlib import Path
 
 from django.conf import settings
-from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.core.cache import cache
+from django.contrib.postgres.search import SearchRank
+from django.db.models import Exists, F, OuterRef, Prefetch, Q
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone as djangotime
@@ -17,6 +20,7 @@ from packaging import version as pyver
 from rest_framework import serializers
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -34,29 +38,34 @@ from scripts.models import Script
 from scripts.tasks import bulk_command_task, bulk_script_task
 from tacticalrmm.constants import (
     AGENT_DEFER,
+    AGENT_SEARCH_FIELDS,
     AGENT_STATUS_OFFLINE,
     AGENT_STATUS_ONLINE,
+    AGENT_STATUSES,
     AGENT_TABLE_DEFER,
+    AGENT_TBL_COUNT_CACHE_PREFIX,
     AgentHistoryType,
     AgentMonType,
     AgentPlat,
+    CheckStatus,
     CustomFieldModel,
     DebugLogType,
     EvtLogNames,
     PAAction,
 )
 from tacticalrmm.helpers import date_is_in_past, notify_error
+from tacticalrmm.pagination import KeysetPagination
 from tacticalrmm.permissions import (
     _has_perm_on_agent,
     _has_perm_on_client,
     _has_perm_on_site,
 )
-from tacticalrmm.utils import get_default_timezone, reload_nats
+from tacticalrmm.utils import get_default_timezone, schedule_reload_nats
 from winupdate.models import WinUpdate, WinUpdatePolicy
 from winupdate.serializers import WinUpdatePolicySerializer
 from winupdate.tasks import bulk_check_for_updates_task, bulk_install_updates_task
 
-from .models import Agent, AgentCustomField, AgentHistory, Note
+from .models import Agent, AgentCustomField, AgentHistory, AgentSearch, Note
 from .permissions import (
     AgentHistoryPerms,
     AgentNotesPerms,
@@ -78,6 +87,7 @@ from .serializers import (
     AgentHistorySerializer,
     AgentHostnameSerializer,
     AgentNoteSerializer,
+    AgentSearchSerializer,
     AgentSerializer,
     AgentTableSerializer,
 )
@@ -88,6 +98,30 @@ from .tasks import (
 )
 
 
+class AgentTablePagination(KeysetPagination):
+    page_size = 100
+    max_page_size = 1000
+    ordering_fields = ("hostname", "last_seen", "agent_id")
+
+    def get_count(self, queryset, request) -> int:
+        # totals are cached briefly per user and filter set so that paging through
+        # the table does not count the whole fleet on every request
+        params = sorted(
+            (k, v)
+            for k, v in request.query_params.items()
+            if k not in ("cursor", "ordering", "page_size")
+        )
+        key = hashlib.md5(f"{request.user.pk}{params}".encode()).hexdigest()
+        cache_key = f"{AGENT_TBL_COUNT_CACHE_PREFIX}{key}"
+
+        count = cache.get(cache_key)
+        if count is None:
+            count = queryset.count()
+            cache.set(cache_key, count, 60)
+
+        return count
+
+
 class GetAgents(APIView):
     permission_classes = [IsAuthenticated, AgentPerms]
 
@@ -96,6 +130,7 @@ class GetAgents(APIView):
 
         monitoring_type_filter = Q()
         client_site_filter = Q()
+        extra_filter = Q()
 
         monitoring_type = request.query_params.get("monitoring_type", None)
         if monitoring_type:
@@ -109,6 +144,38 @@ class GetAgents(APIView):
         elif "client" in request.query_params.keys():
             client_site_filter = Q(site__client_id=request.query_params["client"])
 
+        agent_status = request.query_params.get("status", None)
+        if agent_status:
+            if agent_status in AGENT_STATUSES:
+                extra_filter &= Agent.status_filter(agent_status)
+            else:
+                return notify_error("status does not exist")
+
+        plat = request.query_params.get("plat", None)
+        if plat:
+            if plat in AgentPlat.values:
+                extra_filter &= Q(plat=plat)
+            else:
+                return notify_error("platform does not exist")
+
+        if request.query_params.get("failing_checks", None) == "true":
+            extra_filter &= Q(
+                Exists(
+                    CheckResult.objects.filter(
+                        agent_id=OuterRef("pk"), status=CheckStatus.FAILING
+                    )
+                )
+            )
+
+        if request.query_params.get("patches_pending", None) == "true":
+            extra_filter &= Q(
+                Exists(
+                    WinUpdate.objects.filter(
+                        agent_id=OuterRef("pk"), action="approve", installed=False
+                    )
+                )
+            )
+
         # by default detail=true
         if (
             "detail" not in request.query_params.keys()
@@ -119,7 +186,7 @@ class GetAgents(APIView):
                 Agent.objects.filter_by_role(request.user)  # type: ignore
                 .filter(monitoring_type_filter)
                 .filter(client_site_filter)
-                .defer(*AGENT_TABLE_DEFER)
+                .filter(extra_filter)
                 .select_related(
                     "site__server_policy",
                     "site__workstation_policy",
@@ -127,7 +194,9 @@ class GetAgents(APIView):
                     "site__client__workstation_policy",
                     "policy",
                     "alert_template",
+                    "inventory",
                 )
+                .defer(*AGENT_TABLE_DEFER, "inventory__services", "inventory__disks")
                 .prefetch_related(
                     Prefetch(
                         "agentchecks",
@@ -150,7 +219,7 @@ class GetAgents(APIView):
                     ),
                 )
             )
-            serializer = AgentTableSerializer(agents, many=True)
+            serializer_class = AgentTableSerializer
 
         # if detail=false
         else:
@@ -160,10 +229,49 @@ class GetAgents(APIView):
                 .select_related("site__client")
                 .filter(monitoring_type_filter)
                 .filter(client_site_filter)
+                .filter(extra_filter)
             )
-            serializer = AgentHostnameSerializer(agents, many=True)
+            serializer_class = AgentHostnameSerializer
+
+        # paged mode, opt in so existing callers still get the full list
+        if "cursor" in request.query_params or "page_size" in request.query_params:
+            paginator = AgentTablePagination()
+            page = paginator.paginate_queryset(agents, request, view=self)
+            return paginator.get_paginated_response(
+                serializer_class(page, many=True).data
+            )
+
+        return Response(serializer_class(agents, many=True).data)
 
-        return Response(serializer.data)
+
+class AgentSearchPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class SearchAgents(APIView):
+    permission_classes = [IsAuthenticated, AgentPerms]
+
+    def get(self, request):
+        query = AgentSearch.parse_query(request.query_params.get("q", ""))
+        if query is None:
+            return notify_error("Search query is required")
+
+        agents = (
+            Agent.objects.filter_by_role(request.user)  # type: ignore
+            .filter(search__vector=query)
+            .select_related("site__client")
+            .only(*AGENT_SEARCH_FIELDS)
+            .annotate(rank=SearchRank(F("search__vector"), query))
+            .order_by("-rank", "hostname", "pk")
+        )
+
+        paginator = AgentSearchPagination()
+        page = paginator.paginate_queryset(agents, request, view=self)
+        return paginator.get_paginated_response(
+            AgentSearchSerializer(page, many=True).data
+        )
 
 
 class GetUpdateDeleteAgent(APIView):
@@ -200,6 +308,7 @@ class GetUpdateDeleteAgent(APIView):
                 "site__client__workstation_policy",
                 "policy",
                 "alert_template",
+                "inventory",
             ).prefetch_related(
                 Prefetch(
                     "agentchecks",
@@ -276,7 +385,7 @@ class GetUpdateDeleteAgent(APIView):
         name = agent.hostname
         mesh_id = agent.mesh_node_id
         agent.delete()
-        reload_nats()
+        schedule_reload_nats()
         try:
             uri = get_mesh_ws_url()
             asyncio.run(remove_mesh_agent(uri, mesh_id))
@@ -1177,13 +1286,10 @@ class ScriptRunHistory(APIView):
             script_name_filter = Q(script__name=script_name)
 
         AGENT_R_DEFER = (
-            "agent__wmi_detail",
-            "agent__services",
             "agent__created_by",
             "agent__created_time",
             "agent__modified_by",
             "agent__modified_time",
-            "agent__disks",
             "agent__operating_system",
             "agent__mesh_node_id",
             "agent__description",
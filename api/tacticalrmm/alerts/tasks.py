@@ -2,6 +2,7 @@ from django.utils import timezone as djangotime
 
 from agents.models import Agent
 from tacticalrmm.celery import app
+from tacticalrmm.prune import prune_older_than
 
 from .models import Alert
 
@@ -27,8 +28,10 @@ def cache_agents_alert_template() -> str:
 
 @app.task
 def prune_resolved_alerts(older_than_days: int) -> str:
-    Alert.objects.filter(resolved=True).filter(
-        alert_time__lt=djangotime.now() - djangotime.timedelta(days=older_than_days)
-    ).delete()
-
-    return "ok"
+    return str(
+        prune_older_than(
+            Alert.objects.filter(resolved=True),
+            "alert_time",
+            djangotime.now() - djangotime.timedelta(days=older_than_days),
+        )
+    )
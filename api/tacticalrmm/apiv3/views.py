@@ -30,7 +30,7 @@ from core.utils import (
     get_meshagent_url,
 )
 from logs.models import DebugLog, PendingAction
-from software.models import InstalledSoftware
+from software.utils import sync_agent_software
 from tacticalrmm.constants import (
     AGENT_DEFER,
     TRMM_MAX_REQUEST_SIZE,
@@ -47,7 +47,7 @@ from tacticalrmm.constants import (
     PAStatus,
 )
 from tacticalrmm.helpers import make_random_password, notify_error
-from tacticalrmm.utils import reload_nats
+from tacticalrmm.utils import schedule_reload_nats
 from winupdate.models import WinUpdate, WinUpdatePolicy
 
 
@@ -351,10 +351,8 @@ class TaskRunner(APIView):
 
         # get task result or create if doesn't exist
         try:
-            task_result = (
-                TaskResult.objects.select_related("agent")
-                .defer("agent__services", "agent__wmi_detail")
-                .get(task=task, agent=agent)
+            task_result = TaskResult.objects.select_related("agent").get(
+                task=task, agent=agent
             )
             serializer = TaskResultSerializer(
                 data=request.data, instance=task_result, partial=True
@@ -478,7 +476,7 @@ class NewAgent(APIView):
         else:
             WinUpdatePolicy(agent=agent).save()
 
-        reload_nats()
+        schedule_reload_nats()
 
         # create agent install audit record
         AuditLog.objects.create(
@@ -503,14 +501,7 @@ class Software(APIView):
 
     def post(self, request):
         agent = get_object_or_404(Agent, agent_id=request.data["agent_id"])
-        sw = request.data["software"]
-        if not InstalledSoftware.objects.filter(agent=agent).exists():
-            InstalledSoftware(agent=agent, software=sw).save()
-        else:
-            s = agent.installedsoftware_set.first()  # type: ignore
-            s.software = sw
-            s.save(update_fields=["software"])
-
+        sync_agent_software(agent, request.data["software"])
         return Response("ok")
 
 
@@ -44,9 +44,7 @@ class Policy(BaseAuditModel):
         from alerts.tasks import cache_agents_alert_template
 
         # get old policy if exists
-        old_policy: Optional[Policy] = (
-            type(self).objects.get(pk=self.pk) if self.pk else None
-        )
+        old_policy: Optional[Policy] = self.get_original()
         super().save(old_model=old_policy, *args, **kwargs)
 
         # check if alert template was changes and cache on agents
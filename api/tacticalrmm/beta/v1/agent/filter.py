@@ -1,5 +1,7 @@
 import django_filters
-from agents.models import Agent
+from rest_framework.filters import BaseFilterBackend
+
+from agents.models import Agent, AgentSearch
 
 
 class AgentFilter(django_filters.FilterSet):
@@ -35,3 +37,13 @@ class AgentFilter(django_filters.FilterSet):
         if value:
             return queryset.filter(site__client__id=value)
         return queryset
+
+
+class AgentSearchFilter(BaseFilterBackend):
+    # matches ?search= against the agent full text search document
+    def filter_queryset(self, request, queryset, view):
+        query = AgentSearch.parse_query(request.query_params.get("search", ""))
+        if query is None:
+            return queryset
+
+        return queryset.filter(search__vector=query)
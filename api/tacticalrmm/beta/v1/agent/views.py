@@ -1,25 +1,25 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.request import Request
 from rest_framework.serializers import BaseSerializer
 
 from agents.models import Agent
 from agents.permissions import AgentPerms
-from beta.v1.agent.filter import AgentFilter
+from beta.v1.agent.filter import AgentFilter, AgentSearchFilter
 from beta.v1.pagination import StandardResultsSetPagination
+from tacticalrmm.routers import read_from_replica
 from ..serializers import DetailAgentSerializer, ListAgentSerializer
 
 
 class AgentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, AgentPerms]
-    queryset = Agent.objects.all()
+    queryset = Agent.objects.select_related("inventory")
     pagination_class = StandardResultsSetPagination
     http_method_names = ["get", "put"]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, AgentSearchFilter, OrderingFilter]
     filterset_class = AgentFilter
-    search_fields = ["hostname", "services"]
     ordering_fields = ["id"]
     ordering = ["id"]
 
@@ -28,6 +28,10 @@ class AgentViewSet(viewsets.ModelViewSet):
             self.kwargs["agent_id"] = request.query_params["agent_id"]
         super().check_permissions(request)
 
+    @read_from_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def get_permissions(self):
         if self.request.method == "POST":
             self.permission_classes = [IsAuthenticated]
@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 
 from clients.models import Client
 from clients.permissions import ClientsPerms
+from tacticalrmm.routers import read_from_replica
 from ..serializers import ClientSerializer
 
 
@@ -11,3 +12,7 @@ class ClientViewSet(viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
     http_method_names = ["get", "put"]
+
+    @read_from_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -5,6 +5,10 @@ from clients.models import Client, Site
 
 
 class ListAgentSerializer(serializers.ModelSerializer[Agent]):
+    wmi_detail = serializers.ReadOnlyField()
+    services = serializers.ReadOnlyField()
+    disks = serializers.ReadOnlyField()
+
     class Meta:
         model = Agent
         fields = "__all__"
@@ -12,6 +16,9 @@ class ListAgentSerializer(serializers.ModelSerializer[Agent]):
 
 class DetailAgentSerializer(serializers.ModelSerializer[Agent]):
     status = serializers.ReadOnlyField()
+    wmi_detail = serializers.ReadOnlyField()
+    services = serializers.ReadOnlyField()
+    disks = serializers.ReadOnlyField()
 
     class Meta:
         model = Agent
@@ -6,6 +6,7 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from clients.models import Site
 from clients.permissions import SitesPerms
 from beta.v1.pagination import StandardResultsSetPagination
+from tacticalrmm.routers import read_from_replica
 from ..serializers import SiteSerializer
 
 
@@ -19,3 +20,7 @@ class SiteViewSet(viewsets.ModelViewSet):
     search_fields = ["name"]
     ordering_fields = ["id"]
     ordering = ["id"]
+
+    @read_from_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checks", "0032_alter_checkhistory_id_alter_checkresult_id"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="checkhistory",
+            index=models.Index(
+                fields=["agent_id", "check_id", "x"],
+                name="checks_chec_agent_i_4de434_idx",
+            ),
+        ),
+    ]
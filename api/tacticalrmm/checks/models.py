@@ -667,6 +667,12 @@ class CheckResult(models.Model):
 
 
 class CheckHistory(models.Model):
+    class Meta:
+        indexes = [
+            # history graphs and removing an agent's history
+            models.Index(fields=["agent_id", "check_id", "x"]),
+        ]
+
     objects = PermissionQuerySet.as_manager()
 
     id = models.BigAutoField(primary_key=True)
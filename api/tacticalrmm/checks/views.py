@@ -18,6 +18,7 @@ from tacticalrmm.exceptions import NatsDown
 from tacticalrmm.helpers import notify_error
 from tacticalrmm.nats_utils import abulk_nats_command
 from tacticalrmm.permissions import _has_perm_on_agent
+from tacticalrmm.routers import read_from_replica
 
 from .models import Check, CheckHistory, CheckResult
 from .permissions import BulkRunChecksPerms, ChecksPerms, RunChecksPerms
@@ -173,6 +174,7 @@ class ResetAllChecksStatus(APIView):
 class GetCheckHistory(APIView):
     permission_classes = [IsAuthenticated, ChecksPerms]
 
+    @read_from_replica
     def patch(self, request, pk):
         result = get_object_or_404(CheckResult, pk=pk)
 
@@ -7,7 +7,14 @@ from django.db import models
 
 from agents.models import Agent
 from logs.models import BaseAuditModel
-from tacticalrmm.constants import AGENT_DEFER, AgentMonType, CustomFieldType, GoArch
+from tacticalrmm.constants import (
+    AGENT_DEFER,
+    AGENT_SITE_CACHE_PREFIX,
+    ROLE_PERMS_CACHE_PREFIX,
+    AgentMonType,
+    CustomFieldType,
+    GoArch,
+)
 from tacticalrmm.models import PermissionQuerySet
 
 
@@ -48,7 +55,7 @@ class Client(BaseAuditModel):
         from alerts.tasks import cache_agents_alert_template
 
         # get old client if exists
-        old_client = Client.objects.get(pk=self.pk) if self.pk else None
+        old_client = self.get_original()
         super().save(old_model=old_client, *args, **kwargs)
 
         # check if polcies have changed and initiate task to reapply policies if so
@@ -124,9 +131,16 @@ class Site(BaseAuditModel):
         from alerts.tasks import cache_agents_alert_template
 
         # get old client if exists
-        old_site = Site.objects.get(pk=self.pk) if self.pk else None
+        old_site = self.get_original()
         super().save(old_model=old_site, *args, **kwargs)
 
+        # roles limited by client cover every site of that client
+        if not old_site or old_site.client_id != self.client_id:
+            cache.delete_many_pattern(f"{ROLE_PERMS_CACHE_PREFIX}*")
+
+        if old_site and old_site.client_id != self.client_id:
+            cache.delete_many_pattern(f"{AGENT_SITE_CACHE_PREFIX}*")
+
         # check if polcies have changed and initiate task to reapply policies if so
         if old_site:
             if (
@@ -4,6 +4,7 @@ import uuid
 from contextlib import suppress
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Count, Exists, OuterRef, Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from django.utils import timezone as djangotime
@@ -15,8 +16,13 @@ from rest_framework.views import APIView
 
 from agents.models import Agent
 from core.utils import get_core_settings
+from tacticalrmm.constants import AGENT_SITE_CACHE_PREFIX
 from tacticalrmm.helpers import notify_error
-from tacticalrmm.permissions import _has_perm_on_client, _has_perm_on_site
+from tacticalrmm.permissions import (
+    _has_perm_on_client,
+    _has_perm_on_site,
+    get_user_perms,
+)
 
 from .models import Client, ClientCustomField, Deployment, Site, SiteCustomField
 from .permissions import ClientsPerms, DeploymentPerms, SitesPerms
@@ -33,10 +39,11 @@ class GetAddClients(APIView):
     permission_classes = [IsAuthenticated, ClientsPerms]
 
     def get(self, request):
+        perms = get_user_perms(request.user)
         clients = (
             Client.objects.order_by("name")
             .select_related("workstation_policy", "server_policy", "alert_template")
-            .filter_by_role(request.user)  # type: ignore
+            .filter_by_role(request.user, perms=perms)  # type: ignore
             .prefetch_related(
                 Prefetch(
                     "custom_fields",
@@ -46,7 +53,7 @@ class GetAddClients(APIView):
                     "sites",
                     queryset=Site.objects.order_by("name")
                     .select_related("client")
-                    .filter_by_role(request.user)
+                    .filter_by_role(request.user, perms=perms)
                     .prefetch_related("custom_fields__field")
                     .annotate(
                         maintenance_mode=Exists(
@@ -177,6 +184,7 @@ class GetUpdateDeleteClient(APIView):
             agents = Agent.objects.filter(site__client=client)
             site = get_object_or_404(Site, pk=request.query_params["move_to_site"])
             agents.update(site=site)
+            cache.delete_many_pattern(f"{AGENT_SITE_CACHE_PREFIX}*")
 
         elif agent_count > 0:
             return notify_error(
@@ -272,6 +280,7 @@ class GetUpdateDeleteSite(APIView):
             agents = Agent.objects.filter(site=site)
             new_site = get_object_or_404(Site, pk=request.query_params["move_to_site"])
             agents.update(site=new_site)
+            cache.delete_many_pattern(f"{AGENT_SITE_CACHE_PREFIX}*")
 
         elif agent_count > 0:
             return notify_error(
@@ -22,6 +22,7 @@ from core.models import CoreSettings
 from tacticalrmm.constants import AgentMonType
 from tacticalrmm.helpers import days_until_cert_expires
 from tacticalrmm.logger import logger
+from tacticalrmm.permissions import get_user_perms
 
 
 def _has_perm(user, perm: str) -> bool:
@@ -62,13 +63,14 @@ class DashInfo(AsyncJsonWebsocketConsumer):
 
     @database_sync_to_async
     def get_dashboard_info(self):
+        perms = get_user_perms(self.user)
         total_server_agents_count = (
-            Agent.objects.filter_by_role(self.user)
+            Agent.objects.filter_by_role(self.user, perms=perms)
             .filter(monitoring_type=AgentMonType.SERVER)
             .count()
         )
         offline_server_agents_count = (
-            Agent.objects.filter_by_role(self.user)
+            Agent.objects.filter_by_role(self.user, perms=perms)
             .filter(monitoring_type=AgentMonType.SERVER)
             .filter(
                 last_seen__lt=djangotime.now()
@@ -77,12 +79,12 @@ class DashInfo(AsyncJsonWebsocketConsumer):
             .count()
         )
         total_workstation_agents_count = (
-            Agent.objects.filter_by_role(self.user)
+            Agent.objects.filter_by_role(self.user, perms=perms)
             .filter(monitoring_type=AgentMonType.WORKSTATION)
             .count()
         )
         offline_workstation_agents_count = (
-            Agent.objects.filter_by_role(self.user)
+            Agent.objects.filter_by_role(self.user, perms=perms)
             .filter(monitoring_type=AgentMonType.WORKSTATION)
             .filter(
                 last_seen__lt=djangotime.now()
@@ -1,18 +1,23 @@
-import asyncio
 import json
 import re
 import secrets
 import string
 import traceback
-from typing import TYPE_CHECKING, Any
+from collections import defaultdict
+from itertools import count
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Iterable
 
-import websockets
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
 
 from accounts.utils import is_superuser
 from tacticalrmm.constants import TRMM_WS_MAX_SIZE
 from tacticalrmm.logger import logger
 
 if TYPE_CHECKING:
+    from websockets.sync.client import ClientConnection
+
     from accounts.models import User
 
 
@@ -41,6 +46,62 @@ def has_mesh_perms(*, user: "User") -> bool:
     return user.role and getattr(user.role, "can_use_mesh")
 
 
+def build_mesh_perm_matrix(
+    *, users: "Iterable[User]", agents: "Iterable[tuple[int, int, int]]"
+) -> "dict[int, set[int]]":
+    """
+    Returns the pks of the agents each user can access in mesh, keyed by user pk.
+    agents is an iterable of (agent pk, site pk, client pk).
+
+    Every role's client/site restrictions are resolved once into the set of agents
+    they cover, so this does two queries no matter how many agents and users there are.
+    Follows the same rules as _has_perm_on_agent.
+    """
+    from accounts.models import Role
+
+    all_agents: set[int] = set()
+    site_agents: dict[int, set[int]] = defaultdict(set)
+    client_sites: dict[int, set[int]] = defaultdict(set)
+    for agent_pk, site_pk, client_pk in agents:
+        all_agents.add(agent_pk)
+        site_agents[site_pk].add(agent_pk)
+        client_sites[client_pk].add(site_pk)
+
+    role_ids = {user.role_id for user in users if user.role_id}
+    role_sites: dict[int, set[int]] = defaultdict(set)
+    for role_id, site_pk in Role.can_view_sites.through.objects.filter(
+        role_id__in=role_ids
+    ).values_list("role_id", "site_id"):
+        role_sites[role_id].add(site_pk)
+
+    for role_id, client_pk in Role.can_view_clients.through.objects.filter(
+        role_id__in=role_ids
+    ).values_list("role_id", "client_id"):
+        # make sure a role limited to clients without sites still counts as limited
+        role_sites[role_id].update(client_sites.get(client_pk, set()))
+
+    role_agents: dict[int, set[int]] = {}
+    for role_id in role_ids:
+        if role_id not in role_sites:
+            # no client or site restrictions
+            role_agents[role_id] = all_agents
+        else:
+            role_agents[role_id] = set().union(
+                *(site_agents.get(site_pk, set()) for site_pk in role_sites[role_id])
+            )
+
+    ret: dict[int, set[int]] = {}
+    for user in users:
+        if not has_mesh_perms(user=user):
+            ret[user.pk] = set()
+        elif user.is_superuser or is_superuser(user):
+            ret[user.pk] = all_agents
+        else:
+            ret[user.pk] = role_agents.get(user.role_id, set())
+
+    return ret
+
+
 def make_mesh_password() -> str:
     alpha = string.ascii_letters + string.digits
     nonalpha = "!@#$"
@@ -86,34 +147,194 @@ def transform_mesh(obj):
     return ret
 
 
+class MeshActionFailed(Exception):
+    """Mesh never answered an action that was waited on."""
+
+
 class MeshSync:
+    """
+    One MeshCentral control session. Every action goes over the same websocket,
+    which stays open until close() is called.
+
+    Actions are pipelined and replies are matched to requests by responseid,
+    or by action name for replies that don't echo it. The number of
+    unanswered actions allowed at once (the window) grows while mesh replies
+    quickly and is halved when a reply is slow. This keeps mesh from being
+    flooded without pausing for a fixed time.
+    """
+
+    min_window = 1
+    max_window = 64
+    # a reply slower than this means mesh is falling behind
+    slow_reply = 2.0
+    # give up on an unanswered action after this many seconds
+    reply_timeout = 120
+    # total time close() waits for outstanding replies
+    close_timeout = 10
+
     def __init__(self, uri: str):
         self.uri = uri
+        self.window = 8
+        self._ws: "ClientConnection | None" = None
+        self._seq = count(1)
+        # responseid: (time sent, action), oldest first
+        self._pending: dict[str, tuple[float, str]] = {}
+        self._waiting: set[str] = set()  # responseids whose reply is returned
+        self._replies: dict[str, dict[str, Any]] = {}
+        # fire and forget actions mesh never confirmed, see close()
+        self.dropped: list[str] = []
         self.mesh_users = self.get_trmm_mesh_users()  # full list
 
+    def __enter__(self) -> "MeshSync":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _connect(self) -> "ClientConnection":
+        if self._ws is None:
+            self._ws = connect(self.uri, max_size=TRMM_WS_MAX_SIZE)
+        return self._ws
+
+    def _drop(self, responseid: str) -> None:
+        _, action = self._pending.pop(responseid)
+        if responseid in self._waiting:
+            # mesh_action raises for these
+            self._waiting.discard(responseid)
+        else:
+            self.dropped.append(action)
+
+    def _reset(self) -> None:
+        if self._pending:
+            logger.error(
+                f"Mesh connection lost with {len(self._pending)} actions unanswered"
+            )
+        for responseid in list(self._pending):
+            self._drop(responseid)
+        self._ws = None
+        self._pending.clear()
+        self._waiting.clear()
+
+    def _on_reply(self, elapsed: float) -> None:
+        if elapsed > self.slow_reply:
+            self.window = max(self.min_window, self.window // 2)
+            logger.debug(f"Slow mesh reply ({elapsed:.2f}s), window is {self.window}")
+        else:
+            self.window = min(self.max_window, self.window + 1)
+
+    def _expire(self) -> None:
+        cutoff = monotonic() - self.reply_timeout
+        for responseid, (sent, _) in list(self._pending.items()):
+            if sent < cutoff:
+                logger.error(f"Timeout reached waiting for {responseid}.")
+                self._drop(responseid)
+                self.window = self.min_window
+
+    def _recv(self, deadline: float | None = None) -> None:
+        """Reads one message and records it if it answers one of our actions."""
+        oldest = min(sent for sent, _ in self._pending.values())
+        timeout = max(oldest + self.reply_timeout - monotonic(), 0)
+        if deadline is not None:
+            timeout = max(min(timeout, deadline - monotonic()), 0)
+        try:
+            message = self._connect().recv(timeout)
+        except TimeoutError:
+            self._expire()
+            return
+        except ConnectionClosed:
+            self._reset()
+            return
+
+        r = json.loads(message)
+        responseid = r.get("responseid")
+        if responseid not in self._pending:
+            # not every reply echoes responseid, fall back to the oldest
+            # unanswered action with the same name
+            responseid = next(
+                (k for k, (_, a) in self._pending.items() if a == r.get("action")),
+                None,
+            )
+            if responseid is None:
+                return
+
+        sent, _ = self._pending.pop(responseid)
+        self._on_reply(monotonic() - sent)
+        if responseid in self._waiting:
+            self._waiting.discard(responseid)
+            self._replies[responseid] = r
+
+    def _send(self, payload: dict[str, Any], wait: bool) -> str:
+        # backpressure, don't send more until mesh has caught up
+        while len(self._pending) >= self.window:
+            self._recv()
+
+        responseid = f"meshctrl{next(self._seq)}"
+        payload["responseid"] = responseid
+        logger.debug(payload)
+
+        try:
+            self._connect().send(json.dumps(payload))
+        except ConnectionClosed:
+            self._reset()
+            self._connect().send(json.dumps(payload))
+
+        self._pending[responseid] = (monotonic(), payload["action"])
+        if wait:
+            self._waiting.add(responseid)
+
+        return responseid
+
     def mesh_action(
         self, *, payload: dict[str, Any], wait=True
     ) -> dict[str, Any] | None:
-        async def _do(payload):
-            async with websockets.connect(self.uri, max_size=TRMM_WS_MAX_SIZE) as ws:
-                await ws.send(json.dumps(payload))
-                if wait:
-                    while 1:
-                        try:
-                            message = await asyncio.wait_for(ws.recv(), 120)
-                            r = json.loads(message)
-                            if r["action"] == payload["action"]:
-                                return r
-                        except asyncio.TimeoutError:
-                            logger.error("Timeout reached.")
-                            return None
-                else:
-                    return None
+        responseid = self._send(payload, wait)
+        if not wait:
+            return None
 
-        payload["responseid"] = "meshctrl"
-        logger.debug(payload)
+        while responseid in self._pending:
+            self._recv()
+
+        reply = self._replies.pop(responseid, None)
+        if reply is None:
+            raise MeshActionFailed(
+                f"No reply from mesh to {payload['action']}, "
+                "the connection was lost or the action timed out"
+            )
+
+        return reply
+
+    def flush(self, timeout: float | None = None) -> None:
+        """
+        Waits until mesh has answered every action sent so far, or at most
+        timeout seconds. Actions still unanswered after that are dropped.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        while self._pending:
+            if deadline is not None and monotonic() >= deadline:
+                logger.error(f"Gave up waiting for {len(self._pending)} mesh replies")
+                for responseid in list(self._pending):
+                    self._drop(responseid)
+                return
+
+            self._recv(deadline)
+
+    def close(self) -> list[str]:
+        """
+        Closes the session, returning the fire and forget actions mesh never
+        confirmed (also kept in dropped).
+        """
+        if self._ws is None:
+            return self.dropped
+
+        try:
+            self.flush(self.close_timeout)
+        except Exception:
+            logger.debug(traceback.format_exc())
+        finally:
+            self._ws.close()
+            self._ws = None
 
-        return asyncio.run(_do(payload))
+        return self.dropped
 
     def get_unique_mesh_users(
         self, trmm_agents_list: list[dict[str, Any]]
@@ -13,7 +13,7 @@ from django.db import models
 from twilio.base.exceptions import TwilioRestException
 from twilio.rest import Client as TwClient
 
-from logs.models import BaseAuditModel, DebugLog
+from logs.models import BaseAuditModel, DebugLog, clear_debug_level
 from tacticalrmm.constants import (
     ALL_TIMEZONES,
     CORESETTINGS_CACHE_KEY,
@@ -119,6 +119,7 @@ class CoreSettings(BaseAuditModel):
         from alerts.tasks import cache_agents_alert_template
 
         cache.delete(CORESETTINGS_CACHE_KEY)
+        clear_debug_level()
 
         if not self.pk and CoreSettings.objects.exists():
             raise ValidationError("There can only be one CoreSettings instance")
@@ -130,7 +131,7 @@ class CoreSettings(BaseAuditModel):
                 self.mesh_username = settings.MESH_USERNAME.lower()
                 self.mesh_token = settings.MESH_TOKEN_KEY
 
-        old_settings = type(self).objects.get(pk=self.pk) if self.pk else None
+        old_settings = self.get_original()
 
         if old_settings:
             # fail safe to not lock out user logons
@@ -144,7 +145,7 @@ class CoreSettings(BaseAuditModel):
                 if not valid:
                     raise ValidationError("")
 
-        super().save(*args, **kwargs)
+        super().save(old_model=old_settings, *args, **kwargs)
 
         if old_settings:
 
@@ -1,19 +1,19 @@
 import asyncio
 import traceback
+from collections import defaultdict
 from contextlib import suppress
-from time import sleep
+from time import perf_counter, sleep
 from typing import TYPE_CHECKING, Any
 
 import nats
 from django.conf import settings
-from django.db import transaction
-from django.db.models import Prefetch
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Prefetch
 from django.db.utils import DatabaseError
 from django.utils import timezone as djangotime
 from packaging import version as pyver
 
 from accounts.models import User
-from accounts.utils import is_superuser
 from agents.models import Agent
 from agents.tasks import clear_faults_task, prune_agent_history
 from alerts.models import Alert
@@ -23,21 +23,33 @@ from checks.models import Check, CheckHistory, CheckResult
 from checks.tasks import prune_check_history
 from clients.models import Client, Site
 from core.mesh_utils import (
+    MeshActionFailed,
     MeshSync,
     build_mesh_display_name,
-    has_mesh_perms,
+    build_mesh_perm_matrix,
     transform_mesh,
     transform_trmm,
 )
 from core.models import CoreSettings
-from core.utils import get_core_settings, get_mesh_ws_url, make_alpha_numeric
+from core.utils import (
+    _b64_to_hex,
+    get_core_settings,
+    get_mesh_ws_url,
+    make_alpha_numeric,
+)
+from ee.reporting.settings import settings as reporting_settings
+from ee.reporting.tasks import prune_report_jobs
 from logs.models import PendingAction
 from logs.tasks import prune_audit_log, prune_debug_log
+from software.models import AgentSoftware, SoftwareCatalog
 from tacticalrmm.celery import app
 from tacticalrmm.constants import (
     AGENT_DEFER,
     AGENT_STATUS_ONLINE,
     AGENT_STATUS_OVERDUE,
+    NATS_RELOAD_PENDING_KEY,
+    PRUNE_BATCH_PAUSE,
+    PRUNE_BATCH_SIZE,
     RESOLVE_ALERTS_LOCK,
     SYNC_MESH_PERMS_TASK_LOCK,
     SYNC_SCHED_TASK_LOCK,
@@ -52,31 +64,55 @@ from tacticalrmm.constants import (
 from tacticalrmm.helpers import make_random_password, setup_nats_options
 from tacticalrmm.logger import logger
 from tacticalrmm.nats_utils import a_nats_cmd
-from tacticalrmm.permissions import _has_perm_on_agent
-from tacticalrmm.utils import redis_lock
+from tacticalrmm.utils import redis_lock, reload_nats
 
 if TYPE_CHECKING:
     from django.db.models import QuerySet
     from nats.aio.client import Client as NATSClient
 
 
-def remove_orphaned_history_results() -> int:
+def remove_orphaned_history_results(batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    # anti-join in the db, deleting a bounded batch per statement so no single
+    # transaction holds locks on the whole table
+    orphaned = CheckHistory.objects.filter(
+        ~Exists(Agent.objects.filter(agent_id=OuterRef("agent_id")))
+    )
+    total = 0
     try:
-        with transaction.atomic():
-            check_hist_agentids = CheckHistory.objects.values_list(
-                "agent_id", flat=True
-            ).distinct()
-            current_agentids = set(Agent.objects.values_list("agent_id", flat=True))
-            orphaned_agentids = [
-                i for i in check_hist_agentids if i not in current_agentids
-            ]
+        while True:
             count, _ = CheckHistory.objects.filter(
-                agent_id__in=orphaned_agentids
+                pk__in=orphaned.values("pk")[:batch_size]
+            ).delete()
+            total += count
+            if count < batch_size:
+                return total
+
+            sleep(PRUNE_BATCH_PAUSE)
+    except Exception as e:
+        logger.error(str(e))
+        return total
+
+
+def remove_orphaned_software_catalog(batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    # catalog rows no agent reports anymore, left behind when the last agent
+    # uninstalls the software or is deleted
+    orphaned = SoftwareCatalog.objects.filter(
+        ~Exists(AgentSoftware.objects.filter(software_id=OuterRef("pk")))
+    )
+    total = 0
+    try:
+        while True:
+            count, _ = SoftwareCatalog.objects.filter(
+                pk__in=orphaned.values("pk")[:batch_size]
             ).delete()
-            return count
+            total += count
+            if count < batch_size:
+                return total
+
+            sleep(PRUNE_BATCH_PAUSE)
     except Exception as e:
         logger.error(str(e))
-        return 0
+        return total
 
 
 @app.task
@@ -86,6 +122,7 @@ def core_maintenance_tasks() -> None:
     ).delete()
 
     remove_orphaned_history_results()
+    remove_orphaned_software_catalog()
 
     core = get_core_settings()
 
@@ -113,15 +150,25 @@ def core_maintenance_tasks() -> None:
     if core.clear_faults_days > 0:
         clear_faults_task.delay(core.clear_faults_days)
 
+    # remove finished report jobs and their artifacts
+    if reporting_settings.REPORTING_JOB_RETENTION_DAYS > 0:
+        prune_report_jobs.delay(reporting_settings.REPORTING_JOB_RETENTION_DAYS)
+
+
+@app.task
+def reload_nats_task() -> None:
+    # clear the pending flag before building the config, so any agent added after this
+    # point queues another run rather than being missed
+    cache.delete(NATS_RELOAD_PENDING_KEY)
+    reload_nats()
+
 
 @app.task
 def resolve_pending_actions() -> None:
     # change agent update pending status to completed if agent has just updated
-    actions: "QuerySet[PendingAction]" = (
-        PendingAction.objects.select_related("agent")
-        .defer("agent__services", "agent__wmi_detail")
-        .filter(action_type=PAAction.AGENT_UPDATE, status=PAStatus.PENDING)
-    )
+    actions: "QuerySet[PendingAction]" = PendingAction.objects.select_related(
+        "agent"
+    ).filter(action_type=PAAction.AGENT_UPDATE, status=PAStatus.PENDING)
 
     to_update: list[int] = [
         action.id
@@ -403,6 +450,7 @@ def sync_mesh_perms_task(self):
         if not acquired:
             return f"{self.app.oid} still running"
 
+        ms: MeshSync | None = None
         try:
             core = CoreSettings.objects.first()
             do_not_sync = not core.sync_mesh_with_trmm
@@ -415,6 +463,9 @@ def sync_mesh_perms_task(self):
 
                 return
 
+            # how long each phase took, logged at the end so slow runs can be diagnosed
+            timings: dict[str, float] = {}
+            start = perf_counter()
             company_name = core.mesh_company_name
             mnp = {"action": "nodes"}
             mesh_nodes_raw = ms.mesh_action(payload=mnp, wait=True)["nodes"]
@@ -426,12 +477,16 @@ def sync_mesh_perms_task(self):
                 block_dashboard_login=False,
             )
 
-            trmm_agents_meshnodeids = [
-                f"node//{i.hex_mesh_node_id}"
-                for i in Agent.objects.only("mesh_node_id")
-                if i.mesh_node_id
+            agents = [
+                i
+                for i in Agent.objects.order_by("pk").values_list(
+                    "pk", "site_id", "site__client_id", "mesh_node_id", "hostname"
+                )
+                if i[3]
             ]
+            timings["fetch"] = perf_counter() - start
 
+            start = perf_counter()
             mesh_users_dict = {}
             for user in users:
                 full_name = build_mesh_display_name(
@@ -454,28 +509,25 @@ def sync_mesh_perms_task(self):
                     "email": email,
                 }
 
-            new_trmm_agents = []
-            for agent in Agent.objects.defer(*AGENT_DEFER):
-                if not agent.mesh_node_id:
-                    continue
-                agent_dict = {
-                    "node_id": f"node//{agent.hex_mesh_node_id}",
-                    "hostname": agent.hostname,
+            perms = build_mesh_perm_matrix(
+                users=users, agents=((i[0], i[1], i[2]) for i in agents)
+            )
+            node_links: dict[int, list[dict[str, str]]] = defaultdict(list)
+            for user in users:
+                for agent_pk in perms[user.pk]:
+                    node_links[agent_pk].append({"_id": user.mesh_user_id})
+
+            new_trmm_agents = [
+                {
+                    "node_id": f"node//{_b64_to_hex(mesh_node_id)}",
+                    "hostname": hostname,
+                    "links": node_links.get(agent_pk, []),
                 }
-                tmp: list[dict[str, str]] = []
-                for user in users:
-                    if not has_mesh_perms(user=user):
-                        logger.debug(f"No mesh perms for {user} on {agent.hostname}")
-                        continue
-
-                    if (user.is_superuser or is_superuser(user)) or _has_perm_on_agent(
-                        user, agent.agent_id
-                    ):
-                        tmp.append({"_id": user.mesh_user_id})
-
-                agent_dict["links"] = tmp
-                new_trmm_agents.append(agent_dict)
+                for agent_pk, _, _, mesh_node_id, hostname in agents
+            ]
+            timings["perms"] = perf_counter() - start
 
+            start = perf_counter()
             final_trmm = transform_trmm(new_trmm_agents)
             final_mesh = transform_mesh(mesh_nodes_raw)
 
@@ -503,35 +555,16 @@ def sync_mesh_perms_task(self):
             source_map = {item["node_id"]: set(item["user_ids"]) for item in final_trmm}
             target_map = {item["node_id"]: set(item["user_ids"]) for item in final_mesh}
 
-            def _get_sleep_after_n_inter(n):
-                # {number of agents: chunk size}
-                thresholds = {250: 150, 500: 275, 800: 300, 1000: 340}
-                for threshold, value in sorted(thresholds.items()):
-                    if n <= threshold:
-                        return value
-
-                return 375
-
-            iter_count = 0
-            sleep_after = _get_sleep_after_n_inter(len(source_map))
+            deleted_users = set(users_to_delete_globally)
 
             for node_id, source_users in source_map.items():
-                # skip agents without valid node id
-                if node_id not in trmm_agents_meshnodeids:
-                    continue
-
-                target_users = target_map.get(node_id, set()) - set(
-                    users_to_delete_globally
-                )
-                source_users_adjusted = source_users - set(users_to_delete_globally)
+                target_users = target_map.get(node_id, set()) - deleted_users
+                source_users_adjusted = source_users - deleted_users
 
                 # find users that need to be added or deleted
                 users_to_add = list(source_users_adjusted - target_users)
                 users_to_delete = list(target_users - source_users_adjusted)
 
-                if users_to_add or users_to_delete:
-                    iter_count += 1
-
                 if users_to_add:
                     logger.info(f"Adding {users_to_add} to {node_id}")
                     ms.add_users_to_node(node_id=node_id, user_ids=users_to_add)
@@ -540,19 +573,17 @@ def sync_mesh_perms_task(self):
                     logger.info(f"Deleting {users_to_delete} from {node_id}")
                     ms.delete_users_from_node(node_id=node_id, user_ids=users_to_delete)
 
-                if iter_count % sleep_after == 0 and iter_count != 0:
-                    # mesh is very inefficient with sql, give it time to catch up so we don't crash the system
-                    logger.info(
-                        f"Sleeping for 7 seconds after {iter_count} iterations."
-                    )
-                    sleep(7)
+            # wait for mesh to apply everything before reading back the users
+            ms.flush()
+            timings["sync"] = perf_counter() - start
 
             # after all done, see if need to update display name
-            ms2 = MeshSync(uri)
-            unique_ids = ms2.get_unique_mesh_users(new_trmm_agents)
+            start = perf_counter()
+            ms.mesh_users = ms.get_trmm_mesh_users()
+            unique_ids = ms.get_unique_mesh_users(new_trmm_agents)
             for user in unique_ids:
                 try:
-                    mesh_realname = ms2.mesh_users[user]["realname"]
+                    mesh_realname = ms.mesh_users[user]["realname"]
                 except KeyError:
                     mesh_realname = ""
                 trmm_realname = mesh_users_dict[user]["full_name"]
@@ -560,7 +591,29 @@ def sync_mesh_perms_task(self):
                     logger.info(
                         f"Display names don't match. Updating {user} name from {mesh_realname} to {trmm_realname}"
                     )
-                    ms2.update_mesh_displayname(user_info=mesh_users_dict[user])
+                    ms.update_mesh_displayname(user_info=mesh_users_dict[user])
+
+            timings["display_names"] = perf_counter() - start
+
+            # waits for the display name updates
+            dropped = ms.close()
+            if dropped:
+                raise MeshActionFailed(
+                    f"{len(dropped)} actions were never confirmed by mesh "
+                    f"({', '.join(sorted(set(dropped)))})"
+                )
+
+            summary = ", ".join(f"{k}: {v:.2f}s" for k, v in timings.items())
+            logger.info(
+                f"Synced mesh perms for {len(agents)} agents and {len(mesh_users_dict)} users ({summary})"
+            )
+            return timings
 
+        except MeshActionFailed as e:
+            logger.error(f"Mesh perms sync incomplete: {e}")
+            return f"Mesh perms sync incomplete: {e}"
         except Exception:
             logger.debug(traceback.format_exc())
+        finally:
+            if ms is not None:
+                ms.close()
@@ -1,4 +1,6 @@
+import json
 import os
+from time import monotonic
 from unittest.mock import patch
 
 import requests
@@ -10,8 +12,10 @@ from django.core.management import call_command
 from django.test import override_settings
 from model_bakery import baker
 from rest_framework.authtoken.models import Token
+from websockets.exceptions import ConnectionClosed
 
 # from agents.models import Agent
+from core.mesh_utils import MeshActionFailed, MeshSync, build_mesh_perm_matrix
 from core.utils import get_core_settings, get_mesh_ws_url, get_meshagent_url
 
 # from logs.models import PendingAction
@@ -21,12 +25,17 @@ from tacticalrmm.constants import (  # PAAction,; PAStatus,
     MeshAgentIdent,
 )
 from tacticalrmm.helpers import get_nats_hosts, get_nats_url
+from tacticalrmm.permissions import _has_perm_on_agent
 from tacticalrmm.test import TacticalTestCase
 
 from .consumers import DashInfo
 from .models import CustomField, GlobalKVStore, URLAction
 from .serializers import CustomFieldSerializer, KeyStoreSerializer, URLActionSerializer
-from .tasks import core_maintenance_tasks  # , resolve_pending_actions
+from .tasks import (  # , resolve_pending_actions
+    core_maintenance_tasks,
+    remove_orphaned_history_results,
+    remove_orphaned_software_catalog,
+)
 
 
 class TestCodeSign(TacticalTestCase):
@@ -87,6 +96,52 @@ class TestCoreTasks(TacticalTestCase):
         core_maintenance_tasks()
         self.assertTrue(True)
 
+    @patch("core.tasks.sleep")
+    def test_remove_orphaned_history_results(self, sleep):
+        from checks.models import CheckHistory
+
+        agent = baker.make_recipe("agents.agent")
+        baker.make(CheckHistory, agent_id=agent.agent_id, _quantity=3)
+        baker.make(CheckHistory, agent_id="gone", _quantity=5)
+        baker.make(CheckHistory, agent_id=None)
+
+        self.assertEqual(remove_orphaned_history_results(batch_size=2), 6)
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(
+            set(CheckHistory.objects.values_list("agent_id", flat=True)),
+            {agent.agent_id},
+        )
+
+        # deleting the agent takes its history with it
+        agent.delete()
+        self.assertFalse(CheckHistory.objects.exists())
+
+    def test_remove_orphaned_software_catalog(self):
+        from software.models import SoftwareCatalog
+        from software.utils import sync_agent_software
+
+        agent = baker.make_recipe("agents.agent")
+        other_agent = baker.make_recipe("agents.agent")
+        shared = {"name": "shared", "version": "1", "publisher": "x"}
+        only = {"name": "only", "version": "1", "publisher": "x"}
+        sync_agent_software(agent, [shared, only])
+        sync_agent_software(other_agent, [shared])
+
+        self.assertEqual(remove_orphaned_software_catalog(), 0)
+
+        # uninstalled from its only agent
+        sync_agent_software(agent, [shared])
+        self.assertEqual(remove_orphaned_software_catalog(), 1)
+        self.assertEqual(
+            list(SoftwareCatalog.objects.values_list("name", flat=True)), ["shared"]
+        )
+
+        agent.delete()
+        self.assertEqual(remove_orphaned_software_catalog(), 0)
+        other_agent.delete()
+        self.assertEqual(remove_orphaned_software_catalog(), 1)
+        self.assertFalse(SoftwareCatalog.objects.exists())
+
     def test_dashboard_info(self):
         url = "/core/dashinfo/"
         r = self.client.get(url)
@@ -564,6 +619,185 @@ class TestMeshWSUrl(TacticalTestCase):
         )
 
 
+class FakeMeshWS:
+    def __init__(self, no_responseid=(), silent=()):
+        self.sent = []
+        self.replies = []
+        # actions answered without echoing responseid
+        self.no_responseid = no_responseid
+        # actions never answered
+        self.silent = silent
+
+    def send(self, message):
+        payload = json.loads(message)
+        self.sent.append(payload)
+        if payload["action"] in self.silent:
+            return
+        reply = {"action": payload["action"], "responseid": payload["responseid"]}
+        if payload["action"] == "users":
+            # mesh doesn't echo responseid for every action
+            reply = {"action": "users", "users": [{"_id": "user//bob___1"}]}
+        elif payload["action"] in self.no_responseid:
+            del reply["responseid"]
+        self.replies.append(json.dumps(reply))
+
+    def recv(self, timeout=None):
+        if not self.replies:
+            raise TimeoutError
+        return self.replies.pop(0)
+
+    def close(self):
+        pass
+
+
+class TestMeshSync(TacticalTestCase):
+    @patch("core.mesh_utils.connect")
+    def test_pipelined_session(self, connect):
+        ws = FakeMeshWS()
+        connect.return_value = ws
+
+        with MeshSync("ws://mesh") as ms:
+            self.assertEqual(list(ms.mesh_users), ["user//bob___1"])
+            for i in range(20):
+                ms.add_users_to_node(node_id=f"node//{i}", user_ids=["user//bob___1"])
+
+            # sent without waiting, but never more than the window at once
+            self.assertLessEqual(len(ms._pending), ms.window)
+            r = ms.mesh_action(payload={"action": "nodes"}, wait=True)
+            self.assertEqual(r["responseid"], ws.sent[-1]["responseid"])
+
+        connect.assert_called_once()
+        self.assertEqual(len(ws.sent), 22)
+        self.assertEqual(len({i["responseid"] for i in ws.sent}), 22)
+        # fast replies open the window up
+        self.assertEqual(ms.window, 8 + 22)
+        self.assertFalse(ms._pending)
+
+    @patch("core.mesh_utils.connect")
+    def test_backpressure(self, connect):
+        connect.return_value = FakeMeshWS()
+        ms = MeshSync("ws://mesh")
+        ms.window = 16
+
+        ms._pending["meshctrl100"] = (0, "adddeviceuser")
+        ms._on_reply(MeshSync.slow_reply + 1)
+        self.assertEqual(ms.window, 8)
+        ms._on_reply(0.1)
+        self.assertEqual(ms.window, 9)
+
+        # an action mesh never answers is dropped instead of blocking the session
+        with patch(
+            "core.mesh_utils.monotonic", return_value=MeshSync.reply_timeout * 2
+        ):
+            ms._expire()
+        self.assertNotIn("meshctrl100", ms._pending)
+        self.assertEqual(ms.window, MeshSync.min_window)
+
+    @patch("core.mesh_utils.connect")
+    def test_replies_without_responseid(self, connect):
+        ws = FakeMeshWS(no_responseid=("adddeviceuser",))
+        connect.return_value = ws
+
+        with patch.object(MeshSync, "_expire") as expire:
+            with MeshSync("ws://mesh") as ms:
+                for i in range(20):
+                    ms.add_users_to_node(
+                        node_id=f"node//{i}", user_ids=["user//bob___1"]
+                    )
+
+                # matched by action, so the window never fills up with them
+                self.assertLessEqual(len(ms._pending), ms.window)
+                ms.flush()
+                self.assertFalse(ms._pending)
+
+        expire.assert_not_called()
+        self.assertEqual(ms.window, 8 + 21)
+
+    @patch("core.mesh_utils.connect")
+    def test_connection_lost_while_waiting(self, connect):
+        ws = FakeMeshWS()
+        connect.return_value = ws
+        ms = MeshSync("ws://mesh")
+
+        with patch.object(ws, "recv", side_effect=ConnectionClosed(None, None)):
+            with self.assertRaises(MeshActionFailed):
+                ms.mesh_action(payload={"action": "nodes"}, wait=True)
+
+    @patch("core.mesh_utils.connect")
+    def test_connection_lost_drops_unanswered_actions(self, connect):
+        ws = FakeMeshWS(silent=("adddeviceuser",))
+        connect.return_value = ws
+        ms = MeshSync("ws://mesh")
+        for i in range(3):
+            ms.add_users_to_node(node_id=f"node//{i}", user_ids=["user//bob___1"])
+
+        with patch.object(ws, "recv", side_effect=ConnectionClosed(None, None)):
+            ms.flush()
+
+        self.assertEqual(ms.dropped, ["adddeviceuser"] * 3)
+
+    @patch("core.mesh_utils.connect")
+    def test_close_gives_up_after_close_timeout(self, connect):
+        connect.return_value = FakeMeshWS(silent=("adddeviceuser",))
+        ms = MeshSync("ws://mesh")
+        ms.close_timeout = 0.2
+        ms.delete_users_from_node(node_id="node//1", user_ids=["user//bob___1"])
+
+        start = monotonic()
+        self.assertEqual(ms.close(), ["adddeviceuser"])
+        self.assertLess(monotonic() - start, 2)
+        self.assertFalse(ms._pending)
+
+
+class TestMeshPermMatrix(TacticalTestCase):
+    def setUp(self):
+        self.setup_coresettings()
+        self.setup_base_instance()
+
+    def test_build_mesh_perm_matrix(self):
+        agents = [
+            baker.make_recipe("agents.agent", site=site)
+            for site in (self.site1, self.site2, self.site3)
+        ]
+        no_mesh = self.create_user_with_roles([])
+        unrestricted = self.create_user_with_roles(["can_use_mesh"])
+        by_client = self.create_user_with_roles(["can_use_mesh"])
+        by_client.role.can_view_clients.set([self.company2])
+        by_site = self.create_user_with_roles(["can_use_mesh"])
+        by_site.role.can_view_sites.set([self.site2])
+        both = self.create_user_with_roles(["can_use_mesh"])
+        both.role.can_view_clients.set([self.company2])
+        both.role.can_view_sites.set([self.site1])
+        empty_client = self.create_user_with_roles(["can_use_mesh"])
+        empty_client.role.can_view_clients.set([baker.make("clients.Client")])
+        superuser = baker.make("accounts.User", is_superuser=True, is_active=True)
+
+        users = [no_mesh, unrestricted, by_client, by_site, both, empty_client]
+        users.append(superuser)
+        with self.assertNumQueries(2):
+            perms = build_mesh_perm_matrix(
+                users=users,
+                agents=[(i.pk, i.site_id, i.site.client_id) for i in agents],
+            )
+
+        a1, a2, a3 = (i.pk for i in agents)
+        self.assertEqual(perms[no_mesh.pk], set())
+        self.assertEqual(perms[unrestricted.pk], {a1, a2, a3})
+        self.assertEqual(perms[by_client.pk], {a3})
+        self.assertEqual(perms[by_site.pk], {a2})
+        self.assertEqual(perms[both.pk], {a1, a3})
+        self.assertEqual(perms[empty_client.pk], set())
+        self.assertEqual(perms[superuser.pk], {a1, a2, a3})
+
+        # must agree with the per agent permission check
+        for user in users[1:]:
+            for agent in agents:
+                self.assertEqual(
+                    agent.pk in perms[user.pk],
+                    _has_perm_on_agent(user, agent.agent_id),
+                )
+
+
 class TestCorePermissions(TacticalTestCase):
     def setUp(self):
         self.setup_client()
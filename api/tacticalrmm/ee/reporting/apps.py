@@ -10,3 +10,6 @@ from django.apps import AppConfig
 class ReportingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ee.reporting"
+
+    def ready(self):
+        from . import signals  # noqa
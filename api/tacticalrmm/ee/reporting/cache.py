@@ -0,0 +1,125 @@
+"""
+Copyright (c) 2023-present Amidaware Inc.
+This file is subject to the EE License Agreement.
+For details, see: https://license.tacticalrmm.com/ee
+"""
+
+import datetime
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+from django.core.cache import cache
+
+from tacticalrmm.logger import logger
+
+from .constants import (
+    CHART_CACHE_PREFIX,
+    DATA_SOURCE_CACHE_PREFIX,
+    GENERATION_CACHE_PREFIX,
+)
+from .settings import settings
+
+if TYPE_CHECKING:
+    from django.db.models import Model
+
+
+# generation counters are bumped whenever something a cached value was built
+# from changes, so every process can tell its cached copies are stale with a
+# single cache lookup
+def get_generation(name: str) -> int:
+    return cache.get(f"{GENERATION_CACHE_PREFIX}{name}", 0)
+
+
+def bump_generation(name: str) -> None:
+    key = f"{GENERATION_CACHE_PREFIX}{name}"
+    counter_incr = getattr(cache, "counter_incr", None)
+    if counter_incr is not None:
+        counter_incr(key)
+        return
+
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the key can't be stored, e.g. the dummy cache in tests
+        pass
+
+
+def bump_generation_throttled(name: str) -> None:
+    """
+    Bumps the generation at most once per REPORTING_GENERATION_THROTTLE
+    seconds. Changes made while throttled queue one more bump for the end of
+    the window, so cached results are never stale for longer than that.
+    """
+    from .tasks import bump_generation_task
+
+    window = settings.REPORTING_GENERATION_THROTTLE
+    key = f"{GENERATION_CACHE_PREFIX}{name}"
+    if cache.add(f"{key}_bump_lock", 1, timeout=window):
+        bump_generation(name)
+        return
+
+    pending = f"{key}_bump_pending"
+    if cache.add(pending, 1, timeout=window):
+        try:
+            bump_generation_task.apply_async((name,), countdown=window)
+        except Exception as e:
+            logger.error(f"Unable to queue a generation bump, bumping now: {e}")
+            cache.delete(pending)
+            bump_generation(name)
+
+
+def bump_pending_generation(name: str) -> None:
+    # clear the flag first, so a change made after this point queues another
+    cache.delete(f"{GENERATION_CACHE_PREFIX}{name}_bump_pending")
+    bump_generation(name)
+
+
+def model_generation(model: "type[Model]") -> str:
+    return f"model_{model._meta.label_lower}"
+
+
+def _normalize(value: Any) -> Any:
+    # !now in the template variables resolves to the current time, so round
+    # it to the minute or no two renders would share a key
+    if isinstance(value, datetime.datetime):
+        return value.replace(second=0, microsecond=0).isoformat()
+
+    return str(value)
+
+
+def get_data_source_cache_key(
+    *,
+    data_source: Dict[str, Any],
+    models: "Iterable[type[Model]]",
+    limit: Optional[int] = None,
+) -> str:
+    """
+    The key covers the query itself, with dependencies already substituted,
+    and the generation of every model it reads, so saving or deleting any of
+    them makes the cached result unreachable.
+    """
+    names = [model_generation(model) for model in models]
+    generations = cache.get_many([f"{GENERATION_CACHE_PREFIX}{n}" for n in names])
+    payload = json.dumps(
+        {
+            "query": data_source,
+            "limit": limit,
+            "max_rows": settings.REPORTING_QUERY_MAX_ROWS,
+            "generations": sorted(generations.items()),
+        },
+        sort_keys=True,
+        default=_normalize,
+    )
+    return f"{DATA_SOURCE_CACHE_PREFIX}{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def get_chart_cache_key(**chart: Any) -> str:
+    """
+    Charts are keyed on everything they're drawn from, data included, so a
+    cached chart never needs invalidating
+    """
+    # str, not _normalize, since datetimes here are plotted values
+    payload = json.dumps(chart, sort_keys=True, default=str)
+    return f"{CHART_CACHE_PREFIX}{hashlib.sha256(payload.encode()).hexdigest()}"
@@ -9,6 +9,7 @@ REPORTING_MODELS = (
     ("Agent", "agents"),
     ("AgentCustomField", "agents"),
     ("AgentHistory", "agents"),
+    ("AgentInventory", "agents"),
     ("Alert", "alerts"),
     ("Policy", "automation"),
     ("AutomatedTask", "autotasks"),
@@ -24,8 +25,40 @@ REPORTING_MODELS = (
     ("AuditLog", "logs"),
     ("DebugLog", "logs"),
     ("PendingAction", "logs"),
+    ("AgentService", "services"),
     ("ChocoSoftware", "software"),
     ("InstalledSoftware", "software"),
+    ("SoftwareCatalog", "software"),
+    ("AgentSoftware", "software"),
     ("WinUpdate", "winupdate"),
     ("WinUpdatePolicy", "winupdate"),
 )
+
+GENERATION_CACHE_PREFIX = "reporting_generation_"
+# written on every agent check in or check run, bumping their generation on
+# each save would mean data sources reading them are never cached, so they
+# are bumped at most once per REPORTING_GENERATION_THROTTLE seconds
+HIGH_CHURN_MODELS = (
+    ("Agent", "agents"),
+    ("AgentHistory", "agents"),
+    ("Alert", "alerts"),
+    ("TaskResult", "autotasks"),
+    ("CheckResult", "checks"),
+    ("CheckHistory", "checks"),
+    ("AuditLog", "logs"),
+    ("DebugLog", "logs"),
+    ("PendingAction", "logs"),
+)
+# bumped when a report or base template is saved or deleted
+TEMPLATES_GENERATION = "templates"
+DATA_SOURCE_CACHE_PREFIX = "reporting_data_source_"
+CHART_CACHE_PREFIX = "reporting_chart_"
+# response header listing the data sources cut off at the row limit
+TRUNCATED_HEADER = "X-Report-Truncated"
+# rows fetched per round trip when streaming a data source
+STREAM_CHUNK_SIZE = 2000
+# asset urls carry this much of the checksum so they change with the contents
+ASSET_VERSION_LENGTH = 16
+ASSET_ENCODED_CACHE_PREFIX = "reporting_asset_base64_"
+# larger assets are encoded on every export rather than cached
+ASSET_ENCODED_CACHE_MAX_SIZE = 5 * 2**20
@@ -147,6 +147,7 @@ def generate_schema() -> None:
             "count": {"type": "boolean"},
             "get": {"type": "boolean"},
             "first": {"type": "boolean"},
+            "cache": {"type": "boolean"},
         },
         "required": ["model"],
         "oneOf": oneOf,
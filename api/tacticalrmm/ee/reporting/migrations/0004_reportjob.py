@@ -0,0 +1,103 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+import ee.reporting.storage
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0003_alter_reporthtmltemplate_name_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("format", models.CharField(max_length=15)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=15,
+                    ),
+                ),
+                ("created_by", models.CharField(blank=True, max_length=255, null=True)),
+                ("created_time", models.DateTimeField(auto_now_add=True)),
+                ("finished_time", models.DateTimeField(blank=True, null=True)),
+                (
+                    "template",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="jobs",
+                        to="reporting.reporttemplate",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ReportJobItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dependencies", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=15,
+                    ),
+                ),
+                ("error", models.TextField(blank=True, null=True)),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True,
+                        null=True,
+                        storage=ee.reporting.storage.get_report_artifacts_fs,
+                        upload_to="",
+                    ),
+                ),
+                ("finished_time", models.DateTimeField(blank=True, null=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="reporting.reportjob",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0004_reportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportasset",
+            name="checksum",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0005_reportasset_checksum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjobitem",
+            name="started_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -5,11 +5,15 @@ For details, see: https://license.tacticalrmm.com/ee
 """
 
 import uuid
+from contextlib import suppress
 
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.utils import timezone as djangotime
 
-from .storage import get_report_assets_fs
+from .cache import bump_generation
+from .constants import TEMPLATES_GENERATION
+from .storage import get_report_artifacts_fs, get_report_assets_fs
 
 
 class ReportFormatType(models.TextChoices):
@@ -18,6 +22,13 @@ class ReportFormatType(models.TextChoices):
     PLAIN_TEXT = "plaintext", "Plain Text"
 
 
+class ReportJobStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    RUNNING = "running", "Running"
+    COMPLETED = "completed", "Completed"
+    FAILED = "failed", "Failed"
+
+
 class ReportTemplate(models.Model):
     name = models.CharField(max_length=200, unique=True)
     template_md = models.TextField()
@@ -42,6 +53,15 @@ class ReportTemplate(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        bump_generation(TEMPLATES_GENERATION)
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        bump_generation(TEMPLATES_GENERATION)
+        return ret
+
 
 class ReportHTMLTemplate(models.Model):
     name = models.CharField(max_length=200, unique=True)
@@ -50,17 +70,97 @@ class ReportHTMLTemplate(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        bump_generation(TEMPLATES_GENERATION)
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        bump_generation(TEMPLATES_GENERATION)
+        return ret
+
 
 class ReportAsset(models.Model):
     id = models.UUIDField(
         primary_key=True, unique=True, default=uuid.uuid4, editable=False
     )
     file = models.FileField(storage=get_report_assets_fs, unique=True)
+    # sha256 of the file contents
+    checksum = models.CharField(max_length=64, blank=True, db_index=True)
 
     def __str__(self) -> str:
         return f"{self.id} - {self.file}"
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        # renames and moves don't change the contents, so only new files
+        # are hashed and linked to any identical file already stored
+        if self.file and not self.checksum:
+            with suppress(OSError):
+                self.checksum = self.file.storage.checksum(self.file.name)
+                self.file.storage.deduplicate(
+                    name=self.file.name, checksum=self.checksum
+                )
+                ReportAsset.objects.filter(pk=self.pk).update(checksum=self.checksum)
+
+    def get_checksum(self) -> str:
+        """Hashes assets uploaded before checksums were stored on first use"""
+        if not self.checksum and self.file:
+            with suppress(OSError):
+                self.checksum = self.file.storage.checksum(self.file.name)
+                ReportAsset.objects.filter(pk=self.pk).update(checksum=self.checksum)
+
+        return self.checksum
+
 
 class ReportDataQuery(models.Model):
     name = models.CharField(max_length=50, unique=True)
     json_query = models.JSONField()
+
+
+class ReportJob(models.Model):
+    id = models.UUIDField(
+        primary_key=True, unique=True, default=uuid.uuid4, editable=False
+    )
+    template = models.ForeignKey(
+        ReportTemplate, related_name="jobs", on_delete=models.CASCADE
+    )
+    format = models.CharField(max_length=15)
+    status = models.CharField(
+        max_length=15, choices=ReportJobStatus.choices, default=ReportJobStatus.PENDING
+    )
+    created_by = models.CharField(max_length=255, null=True, blank=True)
+    created_time = models.DateTimeField(auto_now_add=True)
+    finished_time = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.template} - {self.created_time}"
+
+    def finish_if_done(self) -> None:
+        statuses = set(self.items.values_list("status", flat=True))
+        if statuses & {ReportJobStatus.PENDING, ReportJobStatus.RUNNING}:
+            return
+
+        # a job only fails as a whole when nothing in it rendered
+        self.status = (
+            ReportJobStatus.FAILED
+            if statuses == {ReportJobStatus.FAILED}
+            else ReportJobStatus.COMPLETED
+        )
+        self.finished_time = djangotime.now()
+        self.save(update_fields=["status", "finished_time"])
+
+
+class ReportJobItem(models.Model):
+    job = models.ForeignKey(ReportJob, related_name="items", on_delete=models.CASCADE)
+    dependencies = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=15, choices=ReportJobStatus.choices, default=ReportJobStatus.PENDING
+    )
+    error = models.TextField(null=True, blank=True)
+    file = models.FileField(storage=get_report_artifacts_fs, null=True, blank=True)
+    started_time = models.DateTimeField(null=True, blank=True)
+    finished_time = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.job_id} - {self.dependencies}"
@@ -0,0 +1,226 @@
+"""
+Copyright (c) 2023-present Amidaware Inc.
+This file is subject to the EE License Agreement.
+For details, see: https://license.tacticalrmm.com/ee
+"""
+
+import mimetypes
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, cast
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from multiprocessing.pool import Pool
+
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+# kept for the life of the process so fonts are only discovered once
+_font_config: "Optional[FontConfiguration]" = None
+_stylesheets: "OrderedDict[str, CSS]" = OrderedDict()
+STYLESHEET_CACHE_SIZE = 20
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def get_font_config() -> "FontConfiguration":
+    global _font_config
+
+    if _font_config is None:
+        from weasyprint.text.fonts import FontConfiguration
+
+        _font_config = FontConfiguration()
+
+    return _font_config
+
+
+def get_stylesheet(css: str) -> "CSS":
+    from weasyprint import CSS
+
+    if css in _stylesheets:
+        _stylesheets.move_to_end(css)
+        return _stylesheets[css]
+
+    stylesheet = CSS(string=css, font_config=get_font_config())
+    _stylesheets[css] = stylesheet
+    if len(_stylesheets) > STYLESHEET_CACHE_SIZE:
+        _stylesheets.popitem(last=False)
+
+    return stylesheet
+
+
+def get_url_fetcher(assets: Dict[str, str]) -> Callable[..., Dict[str, Any]]:
+    """
+    Resolves asset://<id> urls to the asset files, assets maps each id to
+    its file path. Other urls are fetched as usual.
+    """
+    from weasyprint import default_url_fetcher
+
+    def url_fetcher(url: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        if not url.startswith("asset://"):
+            return default_url_fetcher(url, *args, **kwargs)
+
+        path = assets.get(urlsplit(url).netloc)
+        if path is None:
+            raise ValueError(f"Report asset {url} doesn't exist")
+
+        mime_type, _ = mimetypes.guess_type(path)
+        # weasyprint closes the file once it has been read
+        return {
+            "file_obj": open(path, "rb"),
+            "mime_type": mime_type,
+            "redirected_url": url,
+        }
+
+    return url_fetcher
+
+
+def render_pdf(
+    html: str, css: str = "", assets: Optional[Dict[str, str]] = None
+) -> bytes:
+    from weasyprint import HTML
+
+    pdf_bytes: bytes = HTML(
+        string=html, url_fetcher=get_url_fetcher(assets or {})
+    ).write_pdf(stylesheets=[get_stylesheet(css)], font_config=get_font_config())
+    return pdf_bytes
+
+
+def render_chart_image(figure_json: str) -> str:
+    import plotly.io as pio
+
+    # kaleido keeps its renderer process running between calls
+    fig = pio.from_json(figure_json)
+    return cast(str, fig.to_image(format="svg").decode("utf-8"))
+
+
+@contextmanager
+def memory_limit(memory_limit_mb: int) -> Iterator[None]:
+    """
+    Lets the enclosed code grow this process's address space by at most
+    memory_limit_mb, for rendering in processes that can't use the pool
+    """
+    if not memory_limit_mb:
+        yield
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    with open("/proc/self/statm") as f:
+        in_use = int(f.read().split()[0]) * resource.getpagesize()
+
+    limit = in_use + memory_limit_mb * 2**20
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def get_python_executable() -> str:
+    # under uWSGI sys.executable is the uwsgi binary, which can't run the
+    # spawned workers. Its home is the virtualenv, so use its interpreter
+    if os.path.basename(sys.executable).startswith("python"):
+        return sys.executable
+
+    return os.path.join(sys.exec_prefix, "bin", "python3")
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    if memory_limit_mb:
+        limit = memory_limit_mb * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    # warm up before the first job arrives. A failing initializer makes the
+    # pool respawn workers forever, so let the job report the error instead
+    with suppress(Exception):
+        get_stylesheet("")
+
+
+class RendererPool:
+    """
+    A pool of long lived rendering processes. Each process renders one job
+    at a time under an address space limit and is replaced after max_jobs
+    jobs. When a job runs past the timeout the pool is retired: new jobs go
+    to a fresh pool, the jobs already running in the old one finish, and it
+    is terminated, along with the stuck job, once nothing waits on it.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        timeout: float,
+        memory_limit_mb: int,
+        max_jobs: int,
+        executable: Optional[str] = None,
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs = max_jobs
+        self.executable = executable or get_python_executable()
+        self._pool: "Optional[Pool]" = None
+        # number of callers waiting on each pool, retired ones included
+        self._waiting: "Dict[Pool, int]" = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> "Pool":
+        if self._pool is None:
+            # spawned, not forked, so no db connections or threads are
+            # inherited from the web or celery process
+            context = multiprocessing.get_context("spawn")
+            context.set_executable(self.executable)
+            self._pool = context.Pool(
+                processes=self.workers,
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb,),
+                maxtasksperchild=self.max_jobs or None,
+            )
+
+        return self._pool
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            pool = self._get_pool()
+            self._waiting[pool] = self._waiting.get(pool, 0) + 1
+
+        try:
+            return pool.apply_async(func, args).get(self.timeout)
+        except multiprocessing.TimeoutError:
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise RenderTimeout(f"Rendering took longer than {self.timeout}s")
+        finally:
+            with self._lock:
+                self._waiting[pool] -= 1
+                retired = self._pool is not pool and not self._waiting[pool]
+                if retired:
+                    del self._waiting[pool]
+
+            if retired:
+                pool.terminate()
+                pool.join()
+
+    def close(self) -> None:
+        with self._lock:
+            pools = set(self._waiting)
+            if self._pool is not None:
+                pools.add(self._pool)
+            self._pool = None
+            self._waiting.clear()
+
+        for pool in pools:
+            pool.terminate()
+            pool.join()
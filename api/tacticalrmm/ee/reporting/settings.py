@@ -19,6 +19,88 @@ class Settings:
             "/opt/tactical/reporting/assets",
         )
 
+    @property
+    def REPORTING_ASSET_BLOBS_PATH(self) -> str:
+        # identical assets are hard linked to one copy kept here by checksum,
+        # this has to be on the same filesystem as the assets
+        return getattr(
+            self.settings,
+            "REPORTING_ASSET_BLOBS_PATH",
+            "/opt/tactical/reporting/blobs",
+        )
+
+    @property
+    def REPORTING_ARTIFACTS_BASE_PATH(self) -> str:
+        return getattr(
+            self.settings,
+            "REPORTING_ARTIFACTS_BASE_PATH",
+            "/opt/tactical/reporting/artifacts",
+        )
+
+    @property
+    def REPORTING_TEMPLATE_CACHE_SIZE(self) -> int:
+        return getattr(self.settings, "REPORTING_TEMPLATE_CACHE_SIZE", 100)
+
+    @property
+    def REPORTING_DATA_CACHE_TTL(self) -> int:
+        # seconds, 0 disables the data source result cache
+        return getattr(self.settings, "REPORTING_DATA_CACHE_TTL", 300)
+
+    @property
+    def REPORTING_GENERATION_THROTTLE(self) -> int:
+        # seconds between generation bumps of frequently written models
+        return getattr(self.settings, "REPORTING_GENERATION_THROTTLE", 30)
+
+    @property
+    def REPORTING_QUERY_MAX_COST(self) -> float:
+        # planner cost above which a data query is rejected, 0 disables
+        return getattr(self.settings, "REPORTING_QUERY_MAX_COST", 5_000_000)
+
+    @property
+    def REPORTING_QUERY_MAX_ROWS(self) -> int:
+        # list results are capped to this many rows, 0 disables
+        return getattr(self.settings, "REPORTING_QUERY_MAX_ROWS", 100_000)
+
+    @property
+    def REPORTING_QUERY_TIMEOUT(self) -> int:
+        # statement_timeout in ms for each data query, 0 disables
+        return getattr(self.settings, "REPORTING_QUERY_TIMEOUT", 60_000)
+
+    @property
+    def REPORTING_CHART_CACHE_TTL(self) -> int:
+        # seconds, 0 disables the rendered chart cache
+        return getattr(self.settings, "REPORTING_CHART_CACHE_TTL", 60 * 60)
+
+    @property
+    def REPORTING_ASSET_CACHE_TTL(self) -> int:
+        # seconds, 0 disables caching the encoded assets in template exports
+        return getattr(self.settings, "REPORTING_ASSET_CACHE_TTL", 60 * 60)
+
+    @property
+    def REPORTING_PDF_WORKERS(self) -> int:
+        # renderer processes per web worker, 0 renders in process
+        return getattr(self.settings, "REPORTING_PDF_WORKERS", 2)
+
+    @property
+    def REPORTING_PDF_TIMEOUT(self) -> int:
+        # seconds
+        return getattr(self.settings, "REPORTING_PDF_TIMEOUT", 300)
+
+    @property
+    def REPORTING_PDF_MEMORY_LIMIT(self) -> int:
+        # MB of address space per renderer process, 0 disables
+        return getattr(self.settings, "REPORTING_PDF_MEMORY_LIMIT", 2048)
+
+    @property
+    def REPORTING_PDF_MAX_JOBS(self) -> int:
+        # renders before a renderer process is replaced, 0 never replaces
+        return getattr(self.settings, "REPORTING_PDF_MAX_JOBS", 50)
+
+    @property
+    def REPORTING_JOB_RETENTION_DAYS(self) -> int:
+        # days before finished jobs and their artifacts are removed, 0 keeps them
+        return getattr(self.settings, "REPORTING_JOB_RETENTION_DAYS", 30)
+
     @property
     def REPORTING_BASE_URL(self) -> str:
         return getattr(
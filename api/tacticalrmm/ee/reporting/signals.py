@@ -0,0 +1,48 @@
+"""
+Copyright (c) 2023-present Amidaware Inc.
+This file is subject to the EE License Agreement.
+For details, see: https://license.tacticalrmm.com/ee
+"""
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_generation, bump_generation_throttled, model_generation
+from .constants import HIGH_CHURN_MODELS, REPORTING_MODELS
+from .models import ReportJobItem
+
+HIGH_CHURN_LABELS = {
+    f"{app}.{model_name}".lower() for model_name, app in HIGH_CHURN_MODELS
+}
+
+
+def bump_model_generation(sender, **kwargs) -> None:
+    # after the commit, or a concurrent read could cache the old rows under
+    # the new generation
+    name = model_generation(sender)
+    bump = (
+        bump_generation_throttled
+        if sender._meta.label_lower in HIGH_CHURN_LABELS
+        else bump_generation
+    )
+    transaction.on_commit(lambda: bump(name), using=kwargs.get("using"))
+
+
+# cached data source results are keyed on these, see cache.py
+for model_name, app in REPORTING_MODELS:
+    model = apps.get_model(app, model_name)
+    for signal in (post_save, post_delete):
+        signal.connect(
+            bump_model_generation,
+            sender=model,
+            dispatch_uid=f"reporting_generation_{model._meta.label_lower}",
+        )
+
+
+@receiver(post_delete, sender=ReportJobItem)
+def delete_report_job_artifact(sender, instance: ReportJobItem, **kwargs) -> None:
+    # also sent for items cascaded from a deleted job or template
+    if instance.file:
+        instance.file.delete(save=False)
@@ -4,19 +4,78 @@ This file is subject to the EE License Agreement.
 For details, see: https://license.tacticalrmm.com/ee
 """
 
+import hashlib
 import os
 import shutil
+import uuid
+from contextlib import suppress
+from typing import Any, Optional
 
 from django.core.files.storage import FileSystemStorage
 
+from tacticalrmm.logger import logger
+
 from .settings import settings
 
 
 class ReportAssetStorage(FileSystemStorage):
     """Report Asset file storage object. This keeps file system
-    operations confined to REPORT_ASSETS_PATH
+    operations confined to REPORT_ASSETS_PATH. File contents are also kept
+    once per checksum under blobs_location, with every asset holding the
+    same content being a hard link to that copy.
     """
 
+    def __init__(self, *, blobs_location: Optional[str] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.blobs_location = blobs_location
+
+    def checksum(self, name: str) -> str:
+        """Returns the sha256 hex digest of the file"""
+        sha256 = hashlib.sha256()
+        with self.open(name, "rb") as f:
+            for chunk in f.chunks():
+                sha256.update(chunk)
+
+        return sha256.hexdigest()
+
+    def blob_path(self, checksum: str) -> str:
+        assert self.blobs_location
+        return os.path.join(self.blobs_location, checksum[:2], checksum)
+
+    def deduplicate(self, *, name: str, checksum: str) -> None:
+        """Links the file to the stored copy of its content, storing it first
+        if this content hasn't been seen before
+        """
+        if not self.blobs_location:
+            return
+
+        path = self.path(name)
+        blob = self.blob_path(checksum)
+        try:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+            except FileExistsError:
+                # swap the file for a link to the existing copy in one step
+                tmp_path = f"{path}.{uuid.uuid4().hex}"
+                os.link(blob, tmp_path)
+                os.replace(tmp_path, path)
+        except OSError as error:
+            # the file keeps its own copy of the content
+            logger.error(f"Unable to deduplicate report asset {name}: {error}")
+
+    def prune_blobs(self) -> None:
+        """Removes stored copies that no asset links to anymore"""
+        if not self.blobs_location:
+            return
+
+        for root, _, files in os.walk(self.blobs_location):
+            for file in files:
+                path = os.path.join(root, file)
+                with suppress(FileNotFoundError):
+                    if os.stat(path).st_nlink == 1:
+                        os.remove(path)
+
     def isdir(self, *, path: str) -> bool:
         """Checks if path is a directory"""
         return os.path.isdir(self.path(name=path))
@@ -67,9 +126,18 @@ class ReportAssetStorage(FileSystemStorage):
 
 report_assets_fs = ReportAssetStorage(
     location=settings.REPORTING_ASSETS_BASE_PATH,
+    blobs_location=settings.REPORTING_ASSET_BLOBS_PATH,
     base_url=f"{settings.REPORTING_BASE_URL}/reporting/assets/",
 )
 
 
 def get_report_assets_fs():
     return report_assets_fs
+
+
+# generated report files, these are only served through the job download view
+report_artifacts_fs = FileSystemStorage(location=settings.REPORTING_ARTIFACTS_BASE_PATH)
+
+
+def get_report_artifacts_fs():
+    return report_artifacts_fs
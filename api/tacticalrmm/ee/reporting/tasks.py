@@ -0,0 +1,126 @@
+"""
+Copyright (c) 2023-present Amidaware Inc.
+This file is subject to the EE License Agreement.
+For details, see: https://license.tacticalrmm.com/ee
+"""
+
+from datetime import timedelta
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.core.files.base import ContentFile
+from django.utils import timezone as djangotime
+from django.utils.text import slugify
+from jinja2.exceptions import TemplateError
+
+from tacticalrmm.celery import app
+from tacticalrmm.logger import logger
+from tacticalrmm.prune import prune_older_than
+
+from .cache import bump_pending_generation
+from .models import ReportJob, ReportJobItem, ReportJobStatus
+from .settings import settings
+from .utils import render_report
+
+
+def artifact_name(item: ReportJobItem) -> str:
+    job = item.job
+    ext = "pdf" if job.format == "pdf" else "html"
+    label = "-".join(f"{k}-{v}" for k, v in sorted(item.dependencies.items()))
+    name = slugify(f"{job.template.name} {label}") or "report"
+    return f"{job.pk}/{item.pk}-{name}.{ext}"
+
+
+# celery workers render in process, so the renderer pool's timeout doesn't
+# apply. The hard limit leaves time to record the failure after the soft one
+@app.task(
+    soft_time_limit=settings.REPORTING_PDF_TIMEOUT,
+    time_limit=settings.REPORTING_PDF_TIMEOUT + 30,
+)
+def generate_report_job_item_task(pk: int) -> str:
+    try:
+        item = ReportJobItem.objects.select_related("job__template").get(pk=pk)
+    except ReportJobItem.DoesNotExist:
+        # the job was deleted while this was queued
+        return "deleted"
+
+    job = item.job
+    ReportJobItem.objects.filter(pk=pk).update(
+        status=ReportJobStatus.RUNNING, started_time=djangotime.now()
+    )
+    ReportJob.objects.filter(pk=job.pk, status=ReportJobStatus.PENDING).update(
+        status=ReportJobStatus.RUNNING
+    )
+
+    try:
+        report = render_report(
+            template=job.template,
+            format=job.format,
+            # rendering swaps the ids for model instances
+            dependencies=dict(item.dependencies),
+        )
+        content = report if isinstance(report, bytes) else report.encode()
+        item.file.save(artifact_name(item), ContentFile(content), save=False)
+        item.status = ReportJobStatus.COMPLETED
+    except SoftTimeLimitExceeded:
+        item.status = ReportJobStatus.FAILED
+        item.error = f"Rendering took longer than {settings.REPORTING_PDF_TIMEOUT}s"
+    except TemplateError as error:
+        item.status = ReportJobStatus.FAILED
+        item.error = (
+            f"Line {error.lineno}: {error.message}"
+            if hasattr(error, "lineno")
+            else str(error)
+        )
+    except Exception as error:
+        logger.error(f"Report job {job.pk} item {pk} failed: {error}")
+        item.status = ReportJobStatus.FAILED
+        item.error = str(error)
+
+    item.finished_time = djangotime.now()
+    item.save(update_fields=["status", "error", "file", "finished_time"])
+    job.finish_if_done()
+
+    return item.status
+
+
+@app.task
+def fail_stuck_report_job_items_task() -> int:
+    # an item still running well past the hard time limit lost its worker
+    # (killed or restarted), so nothing else will ever finish it
+    deadline = djangotime.now() - timedelta(seconds=settings.REPORTING_PDF_TIMEOUT + 90)
+    stuck = ReportJobItem.objects.filter(
+        status=ReportJobStatus.RUNNING, started_time__lt=deadline
+    )
+
+    failed = 0
+    for item in stuck.select_related("job"):
+        # skip items the worker finished since they were read
+        if ReportJobItem.objects.filter(
+            pk=item.pk, status=ReportJobStatus.RUNNING
+        ).update(
+            status=ReportJobStatus.FAILED,
+            error="Rendering was interrupted before it finished",
+            finished_time=djangotime.now(),
+        ):
+            failed += 1
+            item.job.finish_if_done()
+
+    return failed
+
+
+@app.task
+def bump_generation_task(name: str) -> None:
+    bump_pending_generation(name)
+
+
+@app.task
+def prune_report_jobs(older_than_days: int) -> str:
+    return str(
+        prune_older_than(
+            ReportJob.objects.filter(
+                status__in=(ReportJobStatus.COMPLETED, ReportJobStatus.FAILED)
+            ),
+            "finished_time",
+            djangotime.now() - timedelta(days=older_than_days),
+        )
+    )
@@ -4,20 +4,29 @@ This file is subject to the EE License Agreement.
 For details, see: https://license.tacticalrmm.com/ee
 """
 
-from unittest.mock import patch
+import json
+from unittest.mock import MagicMock, patch
 
 import pytest
 from agents.models import Agent
 from django.apps import apps
+from django.db import OperationalError, connection
 from model_bakery import baker
 
 from ..constants import REPORTING_MODELS
 from ..utils import (
     InvalidDBOperationException,
+    QueryCostExceeded,
     ResolveModelException,
     add_custom_fields,
     build_queryset,
+    explain_queryset,
+    iterate_rows,
+    process_data_sources,
     resolve_model,
+    statement_timeout,
+    stream_data_source,
+    stream_rows,
 )
 
 
@@ -406,6 +415,184 @@ class TestBuildingQueryset:
         assert isinstance(parsed_result, list)
 
 
+@patch("agents.models.Agent.objects.using", return_value=Agent.objects.using("default"))
+@pytest.mark.django_db()
+class TestStreamingDataSources:
+    @pytest.fixture
+    def setup_agents(self):
+        return [
+            baker.make("agents.Agent", hostname=f"Agent{i}", plat="windows")
+            for i in range(5)
+        ]
+
+    def test_stream_csv_matches_build_queryset(self, mock, setup_agents):
+        data_source = {
+            "model": Agent,
+            "only": ["hostname", "plat", "last_seen"],
+            "order_by": ["hostname"],
+            "csv": {"hostname": "Hostname"},
+        }
+
+        expected = build_queryset(data_source=dict(data_source))
+        with patch.dict("sys.modules", {"pandas": None}):
+            chunks = stream_data_source(data_source={**data_source, "model": "Agent"})
+            result = "".join(chunks)
+
+        assert result == expected
+
+    def test_stream_ndjson_with_custom_fields(self, mock, setup_agents):
+        field = baker.make("core.CustomField", name="custom_1", model="agent")
+        baker.make(
+            "agents.AgentCustomField",
+            agent=setup_agents[3],
+            field=field,
+            string_value="value",
+        )
+
+        rows = iterate_rows(
+            queryset=Agent.objects.order_by("hostname").values("id", "hostname"),
+            fields_to_add=["custom_1"],
+            model_name="agent",
+            chunk_size=2,
+        )
+        lines = list(stream_rows(rows=rows, format="ndjson", buffer_size=1))
+
+        assert len(lines) == 5
+        assert json.loads(lines[3])["custom_fields"] == {"custom_1": "value"}
+        assert json.loads(lines[0])["custom_fields"] == {"custom_1": None}
+
+    def test_stream_format_overrides_json_operation(self, mock, setup_agents):
+        chunks = stream_data_source(
+            data_source={"model": "Agent", "only": ["hostname"], "json": True},
+            format="csv",
+        )
+        assert "".join(chunks).split("\n")[0] == "hostname"
+
+    def test_stream_rejects_expensive_query(self, mock, settings, setup_agents):
+        settings.REPORTING_QUERY_MAX_COST = 0.001
+
+        with pytest.raises(QueryCostExceeded):
+            stream_data_source(data_source={"model": "Agent"})
+
+    def test_stream_fetches_under_timeout(self, mock, settings, setup_agents):
+        settings.REPORTING_QUERY_TIMEOUT = 50
+        timeouts = []
+        queryset = Agent.objects.order_by("hostname").values("id", "hostname")
+
+        def fetch(chunk_size):
+            # the timeout in effect each time a row is read from the cursor
+            for row in queryset.iterator(chunk_size=chunk_size):
+                with connection.cursor() as cursor:
+                    cursor.execute("SHOW statement_timeout")
+                    timeouts.append(cursor.fetchone()[0])
+                yield row
+
+        consumer = MagicMock(db="default", iterator=fetch)
+        rows = []
+        for row in iterate_rows(
+            queryset=consumer, fields_to_add=[], model_name="agent", chunk_size=2
+        ):
+            # not applied while the caller handles the rows
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW statement_timeout")
+                assert cursor.fetchone()[0] != "50ms"
+            rows.append(row)
+
+        assert len(rows) == 5
+        assert timeouts == ["50ms"] * 5
+
+    @pytest.mark.parametrize("operation", ["count", "get", "first"])
+    def test_stream_single_results_not_allowed(self, mock, operation):
+        with pytest.raises(InvalidDBOperationException):
+            stream_data_source(data_source={"model": "Agent", operation: True})
+
+
+@pytest.mark.django_db()
+class TestQueryGuard:
+    @pytest.fixture
+    def setup_agents(self):
+        return baker.make("agents.Agent", _quantity=5)
+
+    def test_explain_queryset(self, setup_agents):
+        cost, rows = explain_queryset(Agent.objects.values("hostname"))
+        assert cost > 0
+        assert rows > 0
+
+    def test_expensive_query_rejected(self, settings, setup_agents):
+        settings.REPORTING_QUERY_MAX_COST = 0.001
+
+        with pytest.raises(QueryCostExceeded):
+            build_queryset(data_source={"model": Agent})
+
+    def test_large_result_capped(self, settings, setup_agents):
+        settings.REPORTING_QUERY_MAX_ROWS = 2
+        stats = {}
+
+        result = build_queryset(data_source={"model": Agent}, stats=stats)
+
+        assert len(result) == 2
+        assert stats["limited"] == 2
+        assert stats["rows"] == 2
+
+    def test_large_result_capped_despite_low_estimate(self, settings, setup_agents):
+        settings.REPORTING_QUERY_MAX_ROWS = 2
+        stats = {}
+
+        # stale statistics
+        with patch("ee.reporting.utils.explain_queryset", return_value=(1.0, 1)):
+            result = build_queryset(data_source={"model": Agent}, stats=stats)
+
+        assert len(result) == 2
+        assert stats["limited"] == 2
+
+    def test_result_at_row_limit_not_limited(self, settings, setup_agents):
+        settings.REPORTING_QUERY_MAX_ROWS = 5
+        stats = {}
+
+        result = build_queryset(data_source={"model": Agent}, stats=stats)
+
+        assert len(result) == 5
+        assert "limited" not in stats
+
+    def test_guard_disabled(self, settings, setup_agents):
+        settings.REPORTING_QUERY_MAX_COST = 0
+        settings.REPORTING_QUERY_MAX_ROWS = 0
+
+        with patch("ee.reporting.utils.explain_queryset") as explain:
+            assert len(build_queryset(data_source={"model": Agent})) == 5
+
+        explain.assert_not_called()
+
+    def test_statement_timeout(self, settings):
+        settings.REPORTING_QUERY_TIMEOUT = 50
+
+        with pytest.raises(OperationalError):
+            with statement_timeout("default"), connection.cursor() as cursor:
+                cursor.execute("SELECT pg_sleep(1)")
+
+        with statement_timeout("default"), connection.cursor() as cursor:
+            cursor.execute("SHOW statement_timeout")
+            assert cursor.fetchone()[0] == "50ms"
+
+        # restored once the block exits
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW statement_timeout")
+            assert cursor.fetchone()[0] != "50ms"
+
+    def test_process_data_sources_records_stats(self, setup_agents):
+        query_stats = {}
+        variables = {"data_sources": {"agents": {"model": "Agent"}}}
+
+        process_data_sources(
+            variables=variables, use_cache=False, query_stats=query_stats
+        )
+
+        assert query_stats["agents"]["rows"] == 5
+        assert query_stats["agents"]["cached"] is False
+        assert "time_ms" in query_stats["agents"]
+        assert "estimated_cost" in query_stats["agents"]
+
+
 @pytest.mark.django_db
 class TestAddingCustomFields:
     @pytest.mark.parametrize(
@@ -505,3 +692,34 @@ class TestAddingCustomFields:
 
         # Assert that the default value is used
         assert result["custom_fields"]["field1"] == default_value
+
+    def test_add_custom_fields_query_count(self, django_assert_num_queries):
+        fields = [
+            baker.make("core.CustomField", name=f"field{i}", model="client")
+            for i in range(3)
+        ]
+        clients = baker.make("clients.Client", _quantity=10)
+        for client in clients:
+            for field in fields[:2]:
+                baker.make(
+                    "clients.ClientCustomField",
+                    client=client,
+                    field=field,
+                    string_value=f"{client.pk}-{field.pk}",
+                )
+
+        data = [{"id": client.pk} for client in clients]
+        # the fields and their values, however many rows and fields
+        with django_assert_num_queries(2):
+            add_custom_fields(
+                data=data,
+                fields_to_add=[field.name for field in fields],
+                model_name="client",
+            )
+
+        for row, client in zip(data, clients):
+            assert row["custom_fields"] == {
+                "field0": f"{client.pk}-{fields[0].pk}",
+                "field1": f"{client.pk}-{fields[1].pk}",
+                "field2": fields[2].default_value,
+            }
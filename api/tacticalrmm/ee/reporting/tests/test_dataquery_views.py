@@ -175,3 +175,33 @@ class TestQuerySchema:
     def test_unauthenticated_query_schema_view(self, unauthenticated_client):
         response = unauthenticated_client.delete("/reporting/queryschema/")
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestExportReportDataQuery:
+    def test_export_streams_ndjson(self, authenticated_client):
+        baker.make("clients.Client", name="Client A")
+
+        response = authenticated_client.post(
+            "/reporting/dataqueries/export/",
+            {"json_query": {"model": "Client", "only": ["name"]}, "format": "ndjson"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["content-type"] == "application/x-ndjson"
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        assert rows[0]["name"] == "Client A"
+
+    def test_export_invalid_query(self, authenticated_client):
+        response = authenticated_client.post(
+            "/reporting/dataqueries/export/",
+            {"json_query": {"model": "Client", "delete": True}},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,159 @@
+"""
+Copyright (c) 2023-present Amidaware Inc.
+This file is subject to the EE License Agreement.
+For details, see: https://license.tacticalrmm.com/ee
+"""
+
+import os
+import resource
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from .. import utils
+from ..renderer import (
+    RendererPool,
+    RenderTimeout,
+    get_python_executable,
+    get_url_fetcher,
+    memory_limit,
+)
+from ..utils import generate_pdf, get_renderer_pool
+
+
+@pytest.fixture
+def pool():
+    pool = RendererPool(workers=1, timeout=30, memory_limit_mb=1024, max_jobs=0)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def reset_renderer_pool():
+    utils._renderer_pool = None
+    yield
+    utils._renderer_pool = None
+
+
+class TestRendererPool:
+    def test_workers_are_reused(self, pool):
+        first = pool.run(os.getpid)
+        assert pool.run(os.getpid) == first
+        assert first != os.getpid()
+
+    def test_timeout_replaces_pool(self, pool):
+        pool.timeout = 1
+
+        with pytest.raises(RenderTimeout):
+            pool.run(time.sleep, 10)
+
+        assert pool._pool is None
+        # leave time for the new worker to start
+        pool.timeout = 30
+        assert pool.run(pow, 2, 3) == 8
+
+    def test_timeout_leaves_other_jobs_running(self):
+        pool = RendererPool(workers=2, timeout=30, memory_limit_mb=0, max_jobs=0)
+        try:
+            # start the workers first so the timings below don't include it
+            pool.run(pow, 2, 3)
+            pool.timeout = 6
+            old_pool = pool._pool
+            results = []
+
+            def run_other_job():
+                time.sleep(3)
+                results.append(pool.run(time.sleep, 4.5))
+
+            thread = threading.Thread(target=run_other_job)
+            thread.start()
+            with pytest.raises(RenderTimeout):
+                pool.run(time.sleep, 60)
+            thread.join()
+
+            # the other job finished in the retired pool, which was then shut down
+            assert results == [None]
+            assert old_pool not in pool._waiting
+            assert pool._pool is None
+        finally:
+            pool.close()
+
+    def test_memory_limit(self, pool):
+        with pytest.raises(MemoryError):
+            pool.run(bytearray, 2 * 2**30)
+
+        # the worker survives a failed job
+        assert pool.run(pow, 2, 3) == 8
+
+
+class TestGeneratePdf:
+    def test_routed_through_pool(self, settings, reset_renderer_pool):
+        settings.REPORTING_PDF_WORKERS = 2
+
+        with patch.object(RendererPool, "run", return_value=b"pdf") as run:
+            assert generate_pdf(html="<p>report</p>") == b"pdf"
+
+        run.assert_called_once_with(utils.render_pdf, "<p>report</p>", "", {})
+        assert get_renderer_pool() is utils._renderer_pool
+
+    def test_rendered_in_process_when_disabled(self, settings, reset_renderer_pool):
+        settings.REPORTING_PDF_WORKERS = 0
+
+        with patch("ee.reporting.utils.render_pdf", return_value=b"pdf") as render:
+            assert generate_pdf(html="<p>report</p>") == b"pdf"
+
+        render.assert_called_once_with("<p>report</p>", "", {})
+        assert get_renderer_pool() is None
+
+    def test_rendered_in_process_in_daemon_workers(self, settings, reset_renderer_pool):
+        settings.REPORTING_PDF_WORKERS = 2
+
+        with patch("ee.reporting.utils.multiprocessing.current_process") as current:
+            current.return_value.daemon = True
+            assert get_renderer_pool() is None
+
+
+class TestUrlFetcher:
+    def test_asset_urls_read_from_file(self, tmp_path):
+        path = tmp_path / "logo.png"
+        path.write_bytes(b"logo")
+        fetcher = get_url_fetcher({"4d3f4bce-7ea1-4ba1-9e80-b8d3c9f9e4b2": str(path)})
+
+        result = fetcher("asset://4d3f4bce-7ea1-4ba1-9e80-b8d3c9f9e4b2")
+
+        with result["file_obj"] as f:
+            assert f.read() == b"logo"
+        assert result["mime_type"] == "image/png"
+
+    def test_unknown_asset(self):
+        with pytest.raises(ValueError):
+            get_url_fetcher({})("asset://4d3f4bce-7ea1-4ba1-9e80-b8d3c9f9e4b2")
+
+    def test_other_urls_use_default_fetcher(self):
+        with patch("weasyprint.default_url_fetcher") as default:
+            get_url_fetcher({})("https://example.com/logo.png")
+
+        default.assert_called_once_with("https://example.com/logo.png")
+
+
+class TestInProcessLimits:
+    def test_memory_limit(self):
+        before = resource.getrlimit(resource.RLIMIT_AS)
+
+        with memory_limit(256):
+            with pytest.raises(MemoryError):
+                bytearray(2**30)
+
+        assert resource.getrlimit(resource.RLIMIT_AS) == before
+        assert len(bytearray(2**29)) == 2**29
+
+    def test_python_executable_under_uwsgi(self):
+        with patch("ee.reporting.renderer.sys") as sys:
+            sys.executable = "/usr/local/bin/uwsgi"
+            sys.exec_prefix = "/rmm/api/env"
+            assert get_python_executable() == "/rmm/api/env/bin/python3"
+
+            sys.executable = "/rmm/api/env/bin/python"
+            assert get_python_executable() == "/rmm/api/env/bin/python"
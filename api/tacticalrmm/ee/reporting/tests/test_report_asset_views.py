@@ -10,12 +10,14 @@ from unittest.mock import mock_open, patch
 
 import pytest
 from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from model_bakery import baker
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from ..models import ReportAsset
+from ..storage import ReportAssetStorage
 
 
 @pytest.fixture
@@ -31,6 +33,18 @@ def unauthenticated_client():
     return APIClient()
 
 
+@pytest.fixture
+def assets_fs(tmp_path):
+    (tmp_path / "assets").mkdir()
+    storage = ReportAssetStorage(
+        location=str(tmp_path / "assets"),
+        base_url="/reporting/assets/",
+        blobs_location=str(tmp_path / "blobs"),
+    )
+    with patch.object(ReportAsset._meta.get_field("file"), "storage", storage):
+        yield storage
+
+
 @pytest.mark.django_db
 class TestGetReportAssets:
     @patch("ee.reporting.views.report_assets_fs")
@@ -540,3 +554,90 @@ class TestAssetNginxRedirect:
         assert "There was a error processing the request" in response.content.decode(
             "utf-8"
         )
+
+
+@pytest.mark.django_db
+class TestAssetChecksum:
+    def test_identical_uploads_are_deduplicated(self, assets_fs):
+        first = ReportAsset(file=ContentFile(b"logo", name="first.png"))
+        first.save()
+        second = ReportAsset(file=ContentFile(b"logo", name="folder/second.png"))
+        second.save()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.checksum == second.checksum
+        assert (
+            os.stat(first.file.path).st_ino
+            == os.stat(second.file.path).st_ino
+            == os.stat(assets_fs.blob_path(first.checksum)).st_ino
+        )
+
+    def test_checksum_computed_for_existing_assets(self, assets_fs):
+        asset = ReportAsset(file=ContentFile(b"logo", name="logo.png"))
+        asset.save()
+        ReportAsset.objects.filter(pk=asset.pk).update(checksum="")
+
+        asset = ReportAsset.objects.get(pk=asset.pk)
+        checksum = asset.get_checksum()
+
+        assert checksum == assets_fs.checksum("logo.png")
+        assert ReportAsset.objects.get(pk=asset.pk).checksum == checksum
+
+    def test_delete_prunes_unused_blobs(self, authenticated_client, assets_fs):
+        asset = ReportAsset(file=ContentFile(b"logo", name="logo.png"))
+        asset.save()
+        asset.refresh_from_db()
+        blob = assets_fs.blob_path(asset.checksum)
+
+        with patch("ee.reporting.views.report_assets_fs", assets_fs):
+            response = authenticated_client.post(
+                "/reporting/assets/delete/", data={"paths": ["logo.png"]}
+            )
+
+        assert response.status_code == 200
+        assert not os.path.exists(blob)
+
+
+@pytest.mark.django_db
+class TestAssetCacheHeaders:
+    @pytest.fixture
+    def asset(self, assets_fs):
+        asset = ReportAsset(file=ContentFile(b"logo", name="logo.png"))
+        asset.save()
+        asset.refresh_from_db()
+        return asset
+
+    def test_versioned_url_is_immutable(self, unauthenticated_client, asset):
+        response = unauthenticated_client.get(
+            f"/reporting/assets/logo.png?id={asset.id}&v={asset.checksum[:16]}"
+        )
+
+        assert response.status_code == 200
+        assert response["ETag"] == f'"{asset.checksum}"'
+        assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+
+    def test_unversioned_url_is_revalidated(self, unauthenticated_client, asset):
+        response = unauthenticated_client.get(
+            f"/reporting/assets/logo.png?id={asset.id}&v=outdated"
+        )
+
+        assert response.status_code == 200
+        assert response["Cache-Control"] == "no-cache"
+
+    def test_if_none_match(self, unauthenticated_client, asset):
+        response = unauthenticated_client.get(
+            f"/reporting/assets/logo.png?id={asset.id}",
+            HTTP_IF_NONE_MATCH=f'"{asset.checksum}"',
+        )
+
+        assert response.status_code == 304
+        assert "X-Accel-Redirect" not in response
+
+        response = unauthenticated_client.get(
+            f"/reporting/assets/logo.png?id={asset.id}",
+            HTTP_IF_NONE_MATCH='"stale"',
+        )
+
+        assert response.status_code == 200
+        assert response["X-Accel-Redirect"] == "/assets/logo.png"
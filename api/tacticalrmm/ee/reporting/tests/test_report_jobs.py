@@ -0,0 +1,236 @@
+"""
+Copyright (c) 2023-present Amidaware Inc.
+This file is subject to the EE License Agreement.
+For details, see: https://license.tacticalrmm.com/ee
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone as djangotime
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import ReportJob, ReportJobItem, ReportJobStatus
+from ..tasks import (
+    fail_stuck_report_job_items_task,
+    generate_report_job_item_task,
+    prune_report_jobs,
+)
+
+
+@pytest.fixture
+def authenticated_client():
+    client = APIClient()
+    user = baker.make("accounts.User", is_superuser=True)
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def artifacts_fs(tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    with patch.object(ReportJobItem._meta.get_field("file"), "storage", storage):
+        yield storage
+
+
+@pytest.mark.django_db
+class TestReportJobViews:
+    def test_submit_job_for_each_client(
+        self, authenticated_client, django_capture_on_commit_callbacks
+    ):
+        template = baker.make("reporting.ReportTemplate")
+        clients = baker.make("clients.Client", _quantity=3)
+
+        with patch(
+            "ee.reporting.views.generate_report_job_item_task.delay"
+        ) as delay, django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(
+                f"/reporting/templates/{template.id}/jobs/",
+                {"format": "pdf", "each": "client", "shared_dependencies": {"a": 1}},
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["total"] == 3
+        assert response.data["status"] == ReportJobStatus.PENDING
+
+        items = ReportJobItem.objects.filter(job_id=response.data["id"])
+        assert sorted(item.dependencies["client"] for item in items) == sorted(
+            c.pk for c in clients
+        )
+        assert all(item.dependencies["a"] == 1 for item in items)
+        assert delay.call_count == 3
+
+    def test_submit_job_requires_dependencies(self, authenticated_client):
+        template = baker.make("reporting.ReportTemplate")
+
+        response = authenticated_client.post(
+            f"/reporting/templates/{template.id}/jobs/",
+            {"format": "html"},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_job_and_download(self, authenticated_client, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="Report {{ a }}")
+        job = baker.make("reporting.ReportJob", template=template, format="html")
+        item = baker.make("reporting.ReportJobItem", job=job, dependencies={"a": 5})
+
+        generate_report_job_item_task(item.pk)
+
+        response = authenticated_client.get(f"/reporting/jobs/{job.id}/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == ReportJobStatus.COMPLETED
+        assert response.data["completed"] == 1
+        assert response.data["items"][0]["has_file"]
+
+        response = authenticated_client.get(
+            f"/reporting/jobs/items/{item.id}/download/"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert b"Report 5" in b"".join(response.streaming_content)
+
+    def test_download_before_generated(self, authenticated_client):
+        item = baker.make("reporting.ReportJobItem")
+
+        response = authenticated_client.get(
+            f"/reporting/jobs/items/{item.id}/download/"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_delete_job_removes_artifacts(self, authenticated_client, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="Report")
+        job = baker.make("reporting.ReportJob", template=template, format="html")
+        item = baker.make("reporting.ReportJobItem", job=job)
+        generate_report_job_item_task(item.pk)
+        name = ReportJobItem.objects.get(pk=item.pk).file.name
+        assert artifacts_fs.exists(name)
+
+        response = authenticated_client.delete(f"/reporting/jobs/{job.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not ReportJob.objects.filter(pk=job.pk).exists()
+        assert not artifacts_fs.exists(name)
+
+    def test_delete_template_removes_artifacts(self, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="Report")
+        job = baker.make("reporting.ReportJob", template=template, format="html")
+        item = baker.make("reporting.ReportJobItem", job=job)
+        generate_report_job_item_task(item.pk)
+        name = ReportJobItem.objects.get(pk=item.pk).file.name
+        assert artifacts_fs.exists(name)
+
+        template.delete()
+
+        assert not ReportJob.objects.exists()
+        assert not artifacts_fs.exists(name)
+
+
+@pytest.mark.django_db
+class TestReportJobTask:
+    def test_job_finishes_after_last_item(self, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="Report")
+        job = baker.make("reporting.ReportJob", template=template, format="html")
+        first, second = baker.make("reporting.ReportJobItem", job=job, _quantity=2)
+
+        generate_report_job_item_task(first.pk)
+        job.refresh_from_db()
+        assert job.status == ReportJobStatus.RUNNING
+        assert job.finished_time is None
+
+        generate_report_job_item_task(second.pk)
+        job.refresh_from_db()
+        assert job.status == ReportJobStatus.COMPLETED
+        assert job.finished_time is not None
+
+    def test_template_error_fails_item(self, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="{{invalid}")
+        job = baker.make("reporting.ReportJob", template=template, format="html")
+        item = baker.make("reporting.ReportJobItem", job=job)
+
+        assert generate_report_job_item_task(item.pk) == ReportJobStatus.FAILED
+
+        item.refresh_from_db()
+        job.refresh_from_db()
+        assert item.error
+        assert not item.file
+        assert job.status == ReportJobStatus.FAILED
+
+    def test_time_limit_fails_item(self, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="Report")
+        job = baker.make("reporting.ReportJob", template=template, format="pdf")
+        item = baker.make("reporting.ReportJobItem", job=job)
+
+        with patch(
+            "ee.reporting.tasks.render_report", side_effect=SoftTimeLimitExceeded()
+        ):
+            assert generate_report_job_item_task(item.pk) == ReportJobStatus.FAILED
+
+        item.refresh_from_db()
+        assert "longer than" in item.error
+        job.refresh_from_db()
+        assert job.status == ReportJobStatus.FAILED
+
+    def test_deleted_item(self):
+        assert generate_report_job_item_task(0) == "deleted"
+
+    def test_stuck_items_are_failed(self):
+        job = baker.make(
+            "reporting.ReportJob", format="html", status=ReportJobStatus.RUNNING
+        )
+        stuck = baker.make(
+            "reporting.ReportJobItem",
+            job=job,
+            status=ReportJobStatus.RUNNING,
+            started_time=djangotime.now() - timedelta(hours=1),
+        )
+        running = baker.make(
+            "reporting.ReportJobItem",
+            job=job,
+            status=ReportJobStatus.RUNNING,
+            started_time=djangotime.now(),
+        )
+
+        assert fail_stuck_report_job_items_task() == 1
+        stuck.refresh_from_db()
+        assert stuck.status == ReportJobStatus.FAILED
+        assert stuck.error
+        job.refresh_from_db()
+        assert job.status == ReportJobStatus.RUNNING
+
+        ReportJobItem.objects.filter(pk=running.pk).update(
+            started_time=djangotime.now() - timedelta(hours=1)
+        )
+        assert fail_stuck_report_job_items_task() == 1
+        job.refresh_from_db()
+        assert job.status == ReportJobStatus.FAILED
+        assert job.finished_time is not None
+
+    def test_prune_report_jobs(self, artifacts_fs):
+        template = baker.make("reporting.ReportTemplate", template_md="Report")
+        old, recent, running = baker.make(
+            "reporting.ReportJob", template=template, format="html", _quantity=3
+        )
+        for job in (old, recent, running):
+            generate_report_job_item_task(
+                baker.make("reporting.ReportJobItem", job=job).pk
+            )
+        name = ReportJobItem.objects.get(job=old).file.name
+
+        ReportJob.objects.filter(pk=old.pk).update(
+            finished_time=djangotime.now() - timedelta(days=40)
+        )
+        ReportJob.objects.filter(pk=running.pk).update(
+            status=ReportJobStatus.RUNNING,
+            finished_time=djangotime.now() - timedelta(days=40),
+        )
+
+        prune_report_jobs(30)
+
+        assert set(ReportJob.objects.all()) == {recent, running}
+        assert not artifacts_fs.exists(name)
@@ -175,7 +175,7 @@ class TestReportTemplateGenerateView:
         data = {"format": "html", "dependencies": {"client": 1}}
 
         with patch(
-            "ee.reporting.views.generate_html", return_value=(sample_html, None)
+            "ee.reporting.utils.generate_html", return_value=(sample_html, None)
         ) as mock_generate_html:
             url = f"/reporting/templates/{report_template.id}/run/"
             response = authenticated_client.post(url, data, format="json")
@@ -194,8 +194,28 @@ class TestReportTemplateGenerateView:
             ),
             variables=report_template.template_variables,
             dependencies={"client": 1},
+            use_cache=True,
+            query_stats={},
         )
 
+    def test_generate_report_truncated(self, authenticated_client, settings):
+        settings.REPORTING_QUERY_MAX_ROWS = 1
+        baker.make("clients.Client", _quantity=2)
+        template = baker.make(
+            "reporting.ReportTemplate",
+            template_md="{{ data_sources.clients|length }}",
+            template_variables="data_sources:\n  clients:\n    model: client\n",
+        )
+
+        response = authenticated_client.post(
+            f"/reporting/templates/{template.id}/run/",
+            {"format": "html", "dependencies": {}},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Report-Truncated"] == "clients=1"
+
     def test_unauthenticated_generate_report_view(
         self, unauthenticated_client, report_template
     ):
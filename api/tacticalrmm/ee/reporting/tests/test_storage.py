@@ -4,6 +4,8 @@ This file is subject to the EE License Agreement.
 For details, see: https://license.tacticalrmm.com/ee
 """
 
+import hashlib
+import os
 from pathlib import Path
 
 import pytest
@@ -266,3 +268,47 @@ def test_move_directory_traversal(tmp_path: Path) -> None:
     with pytest.raises(SuspiciousFileOperation):
         # absolute
         storage.move(source="/etc", destination="/newpath")
+
+
+def test_checksum(tmp_path: Path) -> None:
+    storage = ReportAssetStorage(location=tmp_path)
+    (tmp_path / "file").write_bytes(b"content")
+
+    assert storage.checksum("file") == hashlib.sha256(b"content").hexdigest()
+
+
+def test_deduplicate_links_identical_files(tmp_path: Path) -> None:
+    blobs = tmp_path / "blobs"
+    storage = ReportAssetStorage(location=tmp_path / "assets", blobs_location=blobs)
+    (tmp_path / "assets").mkdir()
+    first = tmp_path / "assets" / "first"
+    second = tmp_path / "assets" / "second"
+    first.write_bytes(b"content")
+    second.write_bytes(b"content")
+    checksum = storage.checksum("first")
+
+    storage.deduplicate(name="first", checksum=checksum)
+    storage.deduplicate(name="second", checksum=checksum)
+
+    blob = Path(storage.blob_path(checksum))
+    assert blob.parent.parent == blobs
+    assert first.stat().st_ino == second.stat().st_ino == blob.stat().st_ino
+    assert second.read_bytes() == b"content"
+    assert len(list((tmp_path / "assets").iterdir())) == 2
+
+
+def test_prune_blobs(tmp_path: Path) -> None:
+    storage = ReportAssetStorage(
+        location=tmp_path / "assets", blobs_location=tmp_path / "blobs"
+    )
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "file").write_bytes(b"content")
+    checksum = storage.checksum("file")
+    storage.deduplicate(name="file", checksum=checksum)
+
+    storage.prune_blobs()
+    assert os.path.exists(storage.blob_path(checksum))
+
+    storage.delete("file")
+    storage.prune_blobs()
+    assert not os.path.exists(storage.blob_path(checksum))
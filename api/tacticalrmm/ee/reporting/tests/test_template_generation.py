@@ -4,10 +4,14 @@ This file is subject to the EE License Agreement.
 For details, see: https://license.tacticalrmm.com/ee
 """
 
+from unittest.mock import patch
+
 import pytest
+from django.core.cache.backends.locmem import LocMemCache
 from model_bakery import baker
 
-from ..utils import db_template_loader, generate_html
+from ..models import ReportHTMLTemplate
+from ..utils import db_template_loader, env, generate_html
 
 
 @pytest.mark.django_db
@@ -111,3 +115,52 @@ class TestJinjaDBLoader:
 
         result = db_template_loader(template_name)
         assert result == "Test HTML"  # HTML has priority
+
+
+@pytest.mark.django_db
+class TestTemplateCache:
+    @pytest.fixture(autouse=True)
+    def generation_cache(self):
+        cache = LocMemCache("reporting", {})
+        cache.clear()
+        with patch("ee.reporting.cache.cache", cache):
+            yield cache
+
+    def test_compiled_template_is_reused(self):
+        template = "# cached {{ name }}"
+        with patch.object(env, "from_string", wraps=env.from_string) as from_string:
+            for name in ("one", "two"):
+                result, _ = generate_html(
+                    template=template,
+                    template_type="markdown",
+                    variables=f"name: {name}",
+                )
+                assert f"cached {name}" in result
+
+        from_string.assert_called_once()
+
+    def test_base_template_changes_are_picked_up(self):
+        base = baker.make(
+            "reporting.ReportHTMLTemplate",
+            name="cached base",
+            html="<p>{% block content %}{% endblock %}</p>",
+        )
+        template = "{% block content %}body{% endblock %}"
+        kwargs = {
+            "template": template,
+            "template_type": "html",
+            "html_template": base.id,
+        }
+
+        assert generate_html(**kwargs)[0] == "<p>body</p>"
+
+        with patch.object(
+            ReportHTMLTemplate.objects, "get", wraps=ReportHTMLTemplate.objects.get
+        ) as get:
+            assert generate_html(**kwargs)[0] == "<p>body</p>"
+        # neither the report nor the base template was loaded again
+        get.assert_not_called()
+
+        base.html = "<div>{% block content %}{% endblock %}</div>"
+        base.save()
+        assert generate_html(**kwargs)[0] == "<div>body</div>"
@@ -7,9 +7,16 @@ For details, see: https://license.tacticalrmm.com/ee
 from unittest.mock import patch
 
 import pytest
+from agents.models import Agent
+from django.core.cache.backends.locmem import LocMemCache
 from model_bakery import baker
 
+from ..renderer import render_chart_image
+from ..tasks import bump_generation_task
 from ..utils import (
+    build_queryset,
+    generate_chart,
+    get_data_source_models,
     prep_variables_for_template,
     process_chart_variables,
     process_data_sources,
@@ -177,6 +184,118 @@ class TestProcessDataSourceVariables:
             assert result["data_sources"]["source2"] == "some_string_value"
 
 
+@pytest.mark.django_db
+class TestDataSourceCache:
+    @pytest.fixture(autouse=True)
+    def data_cache(self, settings):
+        settings.REPORTING_DATA_CACHE_TTL = 300
+        cache = LocMemCache("reporting-data", {})
+        cache.clear()
+        with patch("ee.reporting.cache.cache", cache), patch(
+            "ee.reporting.utils.cache", cache
+        ):
+            yield cache
+
+    def render(self, **kwargs):
+        variables = {
+            "data_sources": {
+                "agents": {"model": "agent", "only": ["hostname"], **kwargs}
+            }
+        }
+        return process_data_sources(variables=variables)["data_sources"]["agents"]
+
+    def render_clients(self):
+        variables = {"data_sources": {"clients": {"model": "client", "only": ["name"]}}}
+        return process_data_sources(variables=variables)["data_sources"]["clients"]
+
+    def test_results_are_reused_until_the_model_changes(
+        self, django_capture_on_commit_callbacks
+    ):
+        baker.make("clients.Client", name="first")
+
+        with patch("ee.reporting.utils.build_queryset", wraps=build_queryset) as build:
+            assert [i["name"] for i in self.render_clients()] == ["first"]
+            assert [i["name"] for i in self.render_clients()] == ["first"]
+            assert build.call_count == 1
+
+            # saving a client bumps its generation once the transaction commits
+            with django_capture_on_commit_callbacks(execute=True):
+                baker.make("clients.Client", name="second")
+                assert len(self.render_clients()) == 1
+
+            assert len(self.render_clients()) == 2
+            assert build.call_count == 2
+
+    def test_high_churn_models_are_throttled(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        settings.REPORTING_GENERATION_THROTTLE = 30
+        agent = baker.make_recipe("agents.agent", hostname="first")
+        assert [i["hostname"] for i in self.render()] == ["first"]
+
+        # the first save bumps straight away
+        agent.hostname = "renamed"
+        with django_capture_on_commit_callbacks(execute=True):
+            agent.save()
+        assert [i["hostname"] for i in self.render()] == ["renamed"]
+
+        # later saves within the window queue a single bump for its end
+        with patch(
+            "ee.reporting.tasks.bump_generation_task.apply_async"
+        ) as apply_async:
+            for hostname in ("again", "and again"):
+                agent.hostname = hostname
+                with django_capture_on_commit_callbacks(execute=True):
+                    agent.save()
+
+        apply_async.assert_called_once_with(("model_agents.agent",), countdown=30)
+        assert [i["hostname"] for i in self.render()] == ["renamed"]
+
+        bump_generation_task(*apply_async.call_args.args[0])
+        assert [i["hostname"] for i in self.render()] == ["and again"]
+
+    def test_cached_results_keep_row_limit(self, settings):
+        settings.REPORTING_QUERY_MAX_ROWS = 1
+        baker.make_recipe("agents.agent", _quantity=2)
+
+        self.render()
+        query_stats = {}
+        process_data_sources(
+            variables={
+                "data_sources": {"agents": {"model": "agent", "only": ["hostname"]}}
+            },
+            query_stats=query_stats,
+        )
+
+        assert query_stats["agents"] == {"cached": True, "limited": 1}
+
+    def test_bypass(self):
+        baker.make_recipe("agents.agent")
+
+        with patch("ee.reporting.utils.build_queryset", wraps=build_queryset) as build:
+            self.render(cache=False)
+            self.render(cache=False)
+            process_data_sources(
+                variables={"data_sources": {"a": {"model": "agent"}}}, use_cache=False
+            )
+            assert build.call_count == 3
+
+    def test_related_models_are_part_of_the_key(self):
+        data_source = {
+            "model": Agent,
+            "filter": {"site__client__name": "x"},
+            "custom_fields": ["field"],
+        }
+        labels = [m._meta.label_lower for m in get_data_source_models(data_source)]
+        assert labels == [
+            "agents.agent",
+            "agents.agentcustomfield",
+            "clients.client",
+            "clients.site",
+            "core.customfield",
+        ]
+
+
 class TestProcessChartVariables:
     def test_process_chart_no_replace_data_frame(self):
         # Scenario where path doesn't exist in variables
@@ -297,3 +416,56 @@ class TestPrepVariablesFunction:
             result = prep_variables_for_template(variables="charts: some_chart")
             assert "chart_key" in result
             assert result["chart_key"] == "chart_value"
+
+
+class TestChartCache:
+    @pytest.fixture(autouse=True)
+    def chart_cache(self, settings):
+        settings.REPORTING_CHART_CACHE_TTL = 300
+        cache = LocMemCache("reporting-charts", {})
+        cache.clear()
+        with patch("ee.reporting.utils.cache", cache):
+            yield cache
+
+    def chart(self, format="html", y=(3, 4)):
+        return generate_chart(
+            type="bar",
+            format=format,
+            options={
+                "data_frame": [{"x": 1, "y": y[0]}, {"x": 2, "y": y[1]}],
+                "x": "x",
+                "y": "y",
+            },
+            layout={"title": "Chart"},
+        )
+
+    def test_chart_reused_until_data_changes(self):
+        import plotly.express as px
+
+        with patch.object(px, "bar", wraps=px.bar) as bar:
+            first = self.chart()
+            assert self.chart() == first
+            assert bar.call_count == 1
+
+            assert self.chart(y=(5, 6)) != first
+            assert bar.call_count == 2
+
+    def test_cache_disabled(self, settings):
+        import plotly.express as px
+
+        settings.REPORTING_CHART_CACHE_TTL = 0
+        with patch.object(px, "bar", wraps=px.bar) as bar:
+            self.chart()
+            self.chart()
+            assert bar.call_count == 2
+
+    def test_images_rendered_in_renderer_pool(self):
+        with patch("ee.reporting.utils.get_renderer_pool") as get_pool:
+            get_pool.return_value.run.return_value = "<svg></svg>"
+            assert self.chart(format="image") == "<svg></svg>"
+            assert self.chart(format="image") == "<svg></svg>"
+
+        get_pool.return_value.run.assert_called_once()
+        func, figure_json = get_pool.return_value.run.call_args.args
+        assert func is render_chart_image
+        assert '"type":"bar"' in figure_json
@@ -5,11 +5,18 @@ For details, see: https://license.tacticalrmm.com/ee
 """
 
 import base64
+from unittest.mock import patch
 
 import pytest
+from django.core.cache.backends.locmem import LocMemCache
 from model_bakery import baker
 
-from ..utils import base64_encode_assets, decode_base64_asset, normalize_asset_url
+from ..utils import (
+    base64_encode_assets,
+    decode_base64_asset,
+    get_asset_paths,
+    normalize_asset_url,
+)
 
 
 @pytest.mark.django_db
@@ -59,6 +66,23 @@ class TestBase64EncodeDecodeAssets:
         assert len(result) == 1
         assert result[0]["id"] == asset.id
 
+    def test_base64_encode_assets_cached_by_checksum(self, settings):
+        settings.REPORTING_ASSET_CACHE_TTL = 300
+        asset = baker.make("reporting.ReportAsset", _create_files=True)
+        asset.refresh_from_db()
+        template = f"Some content with link asset://{asset.id}"
+        cache = LocMemCache("reporting-assets", {})
+
+        with patch("ee.reporting.utils.cache", cache):
+            result = base64_encode_assets(template)
+            assert cache.get(f"reporting_asset_base64_{asset.checksum}") == (
+                result[0]["file"]
+            )
+
+            with patch("django.db.models.fields.files.FieldFile.open") as open:
+                assert base64_encode_assets(template) == result
+            open.assert_not_called()
+
     def test_decode_base64_asset_valid_input(self):
         original_data = b"Hello, world!"
         encoded_data = base64.b64encode(original_data).decode("utf-8")
@@ -91,8 +115,18 @@ class TestNormalizeAssets:
 
         result = normalize_asset_url(text, "pdf")
 
-        assert f"file://{asset.file.path}" in result
-        assert f"asset://{asset.id}" not in result
+        # resolved by the renderer
+        assert result == text
+        assert get_asset_paths(text) == {str(asset.id): asset.file.path}
+
+    def test_normalize_asset_url_html_is_versioned(self):
+        asset = baker.make("reporting.ReportAsset", _create_files=True)
+        asset.refresh_from_db()
+        text = f"Some content with link asset://{asset.id} and more content"
+
+        result = normalize_asset_url(text, "html")
+
+        assert f"?id={asset.id}&v={asset.checksum[:16]}" in result
 
     def test_normalize_asset_url_invalid_asset(self):
         invalid_id = "11111111-1111-1111-1111-111111111111"  # UUID that's not in the DB
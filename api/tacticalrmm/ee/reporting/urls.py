@@ -13,10 +13,14 @@ urlpatterns = [
     path("templates/", views.GetAddReportTemplate.as_view()),
     path("templates/<int:pk>/", views.GetEditDeleteReportTemplate.as_view()),
     path("templates/<int:pk>/run/", views.GenerateReport.as_view()),
+    path("templates/<int:pk>/jobs/", views.GetAddReportJobs.as_view()),
     path("templates/<int:pk>/export/", views.ExportReportTemplate.as_view()),
     path("templates/preview/", views.GenerateReportPreview.as_view()),
     path("templates/preview/analysis/", views.GetAllowedValues.as_view()),
     path("templates/import/", views.ImportReportTemplate.as_view()),
+    # batch report jobs
+    path("jobs/<uuid:pk>/", views.GetDeleteReportJob.as_view()),
+    path("jobs/items/<int:pk>/download/", views.DownloadReportJobItem.as_view()),
     # shared templates
     path("templates/shared/", views.SharedTemplatesRepo.as_view()),
     # report assets
@@ -32,6 +36,7 @@ urlpatterns = [
     path("htmltemplates/<int:pk>/", views.GetEditDeleteReportHTMLTemplate.as_view()),
     # report data queries
     path("dataqueries/", views.GetAddReportDataQuery.as_view()),
+    path("dataqueries/export/", views.ExportReportDataQuery.as_view()),
     path("dataqueries/<int:pk>/", views.GetEditDeleteReportDataQuery.as_view()),
     # serving assets
     path("assets/<path:path>", views.NginxRedirect.as_view()),
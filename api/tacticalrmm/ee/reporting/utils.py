@@ -4,27 +4,64 @@ This file is subject to the EE License Agreement.
 For details, see: https://license.tacticalrmm.com/ee
 """
 
+import csv
 import datetime
+import hashlib
 import inspect
+import io
 import json
+import multiprocessing
 import re
+import time
+from contextlib import contextmanager, suppress
 from enum import Enum
-from typing import Any, Dict, List, Literal, Optional, Tuple, Type, Union, cast
+from itertools import islice
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 from zoneinfo import ZoneInfo
 
 import yaml
 from django.apps import apps
-from jinja2 import Environment, FunctionLoader
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DatabaseError, connections, transaction
+from jinja2 import Environment, FunctionLoader, Template
+from jinja2.utils import LRUCache
 from rest_framework.serializers import ValidationError
-from weasyprint import CSS, HTML
-from weasyprint.text.fonts import FontConfiguration
 
+from tacticalrmm.routers import (
+    iterate_on_replica,
+    replica_in_use,
+    replica_lag,
+    use_replica,
+)
 from tacticalrmm.utils import get_db_value
 
 from . import custom_filters
-from .constants import REPORTING_MODELS
+from .cache import get_chart_cache_key, get_data_source_cache_key, get_generation
+from .constants import (
+    ASSET_ENCODED_CACHE_MAX_SIZE,
+    ASSET_ENCODED_CACHE_PREFIX,
+    ASSET_VERSION_LENGTH,
+    REPORTING_MODELS,
+    STREAM_CHUNK_SIZE,
+    TEMPLATES_GENERATION,
+)
 from .markdown.config import Markdown
 from .models import ReportAsset, ReportDataQuery, ReportHTMLTemplate, ReportTemplate
+from .renderer import RendererPool, memory_limit, render_chart_image, render_pdf
+from .settings import settings
 from tacticalrmm.utils import RE_DB_VALUE
 
 RE_ASSET_URL = re.compile(
@@ -52,10 +89,20 @@ def db_template_loader(template_name: str) -> Optional[str]:
     return None
 
 
+def _load_db_template(template_name: str) -> Optional[Tuple[str, None, Any]]:
+    source = db_template_loader(template_name)
+    if source is None:
+        return None
+
+    # jinja keeps the compiled template until a template is saved or deleted
+    generation = get_generation(TEMPLATES_GENERATION)
+    return source, None, lambda: get_generation(TEMPLATES_GENERATION) == generation
+
+
 # sets up Jinja environment wiht the db loader template
 # comment tags needed to be editted because they conflicted with css properties
 env = Environment(
-    loader=FunctionLoader(db_template_loader),
+    loader=FunctionLoader(_load_db_template),
     comment_start_string="{=",
     comment_end_string="=}",
     extensions=["jinja2.ext.do", "jinja2.ext.loopcontrols"],
@@ -75,27 +122,21 @@ for name, func in inspect.getmembers(custom_filters, inspect.isfunction):
     env.filters[name] = func
 
 
-def generate_pdf(*, html: str, css: str = "") -> bytes:
-    font_config = FontConfiguration()
+# compiled report templates keyed by a hash of their content
+compiled_templates = LRUCache(settings.REPORTING_TEMPLATE_CACHE_SIZE)
 
-    pdf_bytes: bytes = HTML(string=html).write_pdf(
-        stylesheets=[CSS(string=css, font_config=font_config)], font_config=font_config
-    )
 
-    return pdf_bytes
+def get_compiled_template(
+    *, template: str, template_type: str, html_template: Optional[int] = None
+) -> Template:
+    generation = get_generation(TEMPLATES_GENERATION)
+    key = hashlib.sha256(
+        f"{generation}\0{template_type}\0{html_template}\0{template}".encode()
+    ).hexdigest()
 
-
-def generate_html(
-    *,
-    template: str,
-    template_type: str,
-    css: str = "",
-    html_template: Optional[int] = None,
-    variables: str = "",
-    dependencies: Optional[Dict[str, int]] = None,
-) -> Tuple[str, Dict[str, Any]]:
-    if dependencies is None:
-        dependencies = {}
+    tm = compiled_templates.get(key)
+    if tm is not None:
+        return tm
 
     # validate the template
     env.parse(template)
@@ -116,14 +157,114 @@ def generate_html(
             pass
 
     tm = env.from_string(template_string)
+    compiled_templates[key] = tm
+    return tm
+
+
+_renderer_pool: Optional[RendererPool] = None
+
+
+def get_renderer_pool() -> Optional[RendererPool]:
+    """
+    Returns the process wide renderer pool, or None to render in this
+    process, which is what daemonic celery workers do since they can't
+    start child processes. Those renders are held to the memory limit in
+    process and to the report job task's time limits.
+    """
+    global _renderer_pool
+
+    if not settings.REPORTING_PDF_WORKERS or multiprocessing.current_process().daemon:
+        return None
+
+    if _renderer_pool is None:
+        _renderer_pool = RendererPool(
+            workers=settings.REPORTING_PDF_WORKERS,
+            timeout=settings.REPORTING_PDF_TIMEOUT,
+            memory_limit_mb=settings.REPORTING_PDF_MEMORY_LIMIT,
+            max_jobs=settings.REPORTING_PDF_MAX_JOBS,
+        )
+
+    return _renderer_pool
+
+
+def generate_pdf(*, html: str, css: str = "") -> bytes:
+    # the renderer reads asset:// urls straight from the asset files
+    assets = get_asset_paths(html)
+
+    pool = get_renderer_pool()
+    if pool is None:
+        with memory_limit(settings.REPORTING_PDF_MEMORY_LIMIT):
+            return render_pdf(html, css, assets)
+
+    pdf_bytes: bytes = pool.run(render_pdf, html, css, assets)
+    return pdf_bytes
+
+
+def generate_html(
+    *,
+    template: str,
+    template_type: str,
+    css: str = "",
+    html_template: Optional[int] = None,
+    variables: str = "",
+    dependencies: Optional[Dict[str, int]] = None,
+    use_cache: bool = True,
+    query_stats: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    if dependencies is None:
+        dependencies = {}
+
+    tm = get_compiled_template(
+        template=template, template_type=template_type, html_template=html_template
+    )
 
     variables_dict = prep_variables_for_template(
-        variables=variables, dependencies=dependencies
+        variables=variables,
+        dependencies=dependencies,
+        use_cache=use_cache,
+        query_stats=query_stats,
     )
 
     return (tm.render(css=css, **variables_dict), variables_dict)
 
 
+def render_report(
+    *,
+    template: ReportTemplate,
+    format: Literal["pdf", "html", "plaintext"],
+    dependencies: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    query_stats: Optional[Dict[str, Any]] = None,
+) -> Union[str, bytes]:
+    """Renders a saved report template, returning pdf bytes or the html/text"""
+    html_report, _ = generate_html(
+        template=template.template_md,
+        template_type=template.type,
+        css=template.template_css or "",
+        html_template=template.template_html_id,
+        variables=template.template_variables,
+        dependencies=dependencies,
+        use_cache=use_cache,
+        query_stats=query_stats,
+    )
+
+    html_report = normalize_asset_url(html_report, format)
+
+    if format == "pdf":
+        return generate_pdf(html=html_report)
+
+    return html_report
+
+
+def get_truncated_data_sources(query_stats: Dict[str, Any]) -> Dict[str, int]:
+    """Returns the row limit of each data source that was cut off by it"""
+    return {
+        key: stats["limited"]
+        for key, stats in query_stats.items()
+        if stats.get("limited")
+    }
+
+
 def make_dataqueries_inline(*, variables: str) -> str:
     try:
         variables_obj = yaml.safe_load(variables) or {}
@@ -148,6 +289,8 @@ def prep_variables_for_template(
     variables: str,
     dependencies: Optional[Dict[str, Any]] = None,
     limit_query_results: Optional[int] = None,
+    use_cache: bool = True,
+    query_stats: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     if not dependencies:
         dependencies = {}
@@ -163,7 +306,10 @@ def prep_variables_for_template(
     # replace the data_sources with the actual data from DB. This will be passed to the template
     # in the form of {{data_sources.data_source_name}}
     variables_dict = process_data_sources(
-        variables=variables_dict, limit_query_results=limit_query_results
+        variables=variables_dict,
+        limit_query_results=limit_query_results,
+        use_cache=use_cache,
+        query_stats=query_stats,
     )
 
     # generate and replace charts in the variables
@@ -227,7 +373,22 @@ class InvalidDBOperationException(Exception):
     pass
 
 
-def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None) -> Any:
+def build_queryset(
+    *,
+    data_source: Dict[str, Any],
+    limit: Optional[int] = None,
+    stream: bool = False,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """
+    Runs a resolved data source. The query is explained first and run under
+    REPORTING_QUERY_TIMEOUT, see guard_queryset, and unless streaming, list
+    results are capped at REPORTING_QUERY_MAX_ROWS. stats, if passed, is
+    filled with the estimates, the number of rows returned and "limited"
+    when the result was cut off.
+    """
+    if stats is None:
+        stats = {}
     local_data_source = data_source
     Model = local_data_source.pop("model")
     count = False
@@ -242,7 +403,7 @@ def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None)
     fields_to_add = []
 
     # create a base reporting queryset
-    queryset = Model.objects.using("default")
+    queryset = Model.objects.all()
     model_name = Model.__name__.lower()
     for operation, values in local_data_source.items():
         # Usage in the build_queryset function:
@@ -257,10 +418,12 @@ def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None)
             from core.models import CustomField
 
             if model_name in ("client", "site", "agent"):
-                fields = CustomField.objects.filter(model=model_name)
-                fields_to_add = [
-                    field for field in values if fields.filter(name=field).exists()
-                ]
+                existing = set(
+                    CustomField.objects.filter(
+                        model=model_name, name__in=values
+                    ).values_list("name", flat=True)
+                )
+                fields_to_add = [field for field in values if field in existing]
 
         elif operation == "limit":
             limit = values
@@ -292,7 +455,10 @@ def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None)
         queryset = queryset.all()
 
     if count:
-        return queryset.count()
+        guard_queryset(queryset, stats=stats)
+        with statement_timeout(queryset.db):
+            stats["rows"] = 1
+            return queryset.count()
 
     if limit and not first and not get:
         queryset = queryset[:limit]
@@ -316,10 +482,12 @@ def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None)
         queryset = queryset.values()
 
     if get or first:
-        if get:
-            queryset = queryset.get()
-        elif first:
-            queryset = queryset.first()
+        with statement_timeout(queryset.db):
+            if get:
+                queryset = queryset.get()
+            elif first:
+                queryset = queryset.first()
+        stats["rows"] = 0 if queryset is None else 1
 
         if fields_to_add:
             queryset = add_custom_fields(
@@ -341,9 +509,34 @@ def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None)
             return df.to_csv(index=False)
         else:
             return queryset
+    elif stream:
+        guard_queryset(queryset, stats=stats)
+        rows = iterate_rows(
+            queryset=queryset, fields_to_add=fields_to_add, model_name=model_name
+        )
+        return stream_rows(
+            rows=rows,
+            format="csv" if isCsv else "ndjson",
+            csv_columns=csv_columns,
+        )
     else:
+        guard_queryset(queryset, stats=stats)
+
+        # one extra row tells whether the result was cut off, the planner's
+        # estimate can't be trusted with stale statistics
+        max_rows = settings.REPORTING_QUERY_MAX_ROWS
+        if max_rows:
+            queryset = queryset[: max_rows + 1]
+
+        with statement_timeout(queryset.db):
+            queryset = list(queryset)
+
+        if max_rows and len(queryset) > max_rows:
+            queryset = queryset[:max_rows]
+            stats["limited"] = max_rows
+        stats["rows"] = len(queryset)
+
         # add custom fields for list results
-        queryset = list(queryset)
 
         if fields_to_add:
             queryset = add_custom_fields(
@@ -364,6 +557,173 @@ def build_queryset(*, data_source: Dict[str, Any], limit: Optional[int] = None)
             return queryset
 
 
+class QueryCostExceeded(Exception):
+    pass
+
+
+def explain_queryset(queryset: Any) -> Tuple[float, int]:
+    """Returns the planner's total cost and row estimate for a queryset"""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]["Plan"]["Total Cost"], plan[0]["Plan"]["Plan Rows"]
+
+
+def guard_queryset(queryset: Any, *, stats: Optional[Dict[str, Any]] = None) -> None:
+    """Rejects a query the planner estimates above REPORTING_QUERY_MAX_COST"""
+    max_cost = settings.REPORTING_QUERY_MAX_COST
+    if not max_cost:
+        return
+
+    cost, rows = explain_queryset(queryset)
+    if stats is not None:
+        stats["estimated_cost"] = cost
+        stats["estimated_rows"] = rows
+
+    if cost > max_cost:
+        raise QueryCostExceeded(
+            f"Data query estimated cost {cost:.0f} is over the limit of "
+            f"{max_cost:.0f}. Add filters or a limit to the data source."
+        )
+
+
+@contextmanager
+def statement_timeout(using: str, *, session: bool = False) -> Iterator[None]:
+    """
+    Runs the enclosed queries with REPORTING_QUERY_TIMEOUT (ms) applied.
+    session sets it on the connection instead of in a savepoint, for server
+    side cursors that have to outlive the enclosed block.
+    """
+    timeout = settings.REPORTING_QUERY_TIMEOUT
+    if not timeout:
+        yield
+        return
+
+    if session:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT current_setting('statement_timeout')")
+            previous = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, false)", [str(timeout)]
+            )
+            try:
+                yield
+            finally:
+                # in a failed transaction the rollback puts it back instead
+                with suppress(DatabaseError):
+                    cursor.execute(
+                        "SELECT set_config('statement_timeout', %s, false)",
+                        [previous],
+                    )
+        return
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute("SELECT current_setting('statement_timeout')")
+        previous = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT set_config('statement_timeout', %s, true)", [str(timeout)]
+        )
+        yield
+        # a released savepoint keeps the setting, put it back for the caller
+        cursor.execute("SELECT set_config('statement_timeout', %s, true)", [previous])
+
+
+def iterate_rows(
+    *,
+    queryset: Any,
+    fields_to_add: List[str],
+    model_name: Literal["client", "site", "agent"],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the rows of a values() queryset through a server side cursor,
+    fetching and adding custom fields a chunk at a time. Each fetch runs
+    under REPORTING_QUERY_TIMEOUT.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        # the cursor is opened on the first fetch, so queryset.db is read
+        # here where the caller's routing (e.g. the replica) applies
+        with statement_timeout(queryset.db, session=True):
+            chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        if fields_to_add:
+            chunk = add_custom_fields(
+                data=chunk, fields_to_add=fields_to_add, model_name=model_name
+            )
+        yield from chunk
+
+
+def stream_rows(
+    *,
+    rows: Iterable[Dict[str, Any]],
+    format: Literal["csv", "ndjson"],
+    csv_columns: Optional[Dict[str, str]] = None,
+    buffer_size: int = 64 * 1024,
+) -> Iterator[str]:
+    """
+    Writes rows as csv or newline delimited json, yielding roughly
+    buffer_size characters at a time. The csv matches the non streaming
+    export: no id column and columns renamed with csv_columns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    header_written = False
+
+    for row in rows:
+        if format == "ndjson":
+            buffer.write(json.dumps(row, default=str) + "\n")
+        else:
+            row.pop("id", None)
+            if not header_written:
+                columns = csv_columns or {}
+                writer.writerow([columns.get(name, name) for name in row])
+                header_written = True
+            writer.writerow(row.values())
+
+        if buffer.tell() >= buffer_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_data_source(
+    *,
+    data_source: Dict[str, Any],
+    format: Optional[Literal["csv", "ndjson"]] = None,
+) -> Iterator[str]:
+    """
+    Runs a data source and yields its rows as csv or ndjson without loading
+    the whole result. The format defaults to the data source's csv/json
+    operation. The chunks can be passed to a StreamingHttpResponse or
+    written to a file.
+    """
+    data_source = resolve_model(data_source=data_source)
+    if format == "csv":
+        data_source.pop("json", None)
+        data_source.setdefault("csv", True)
+    elif format == "ndjson":
+        data_source.pop("csv", None)
+
+    for operation in ("count", "get", "first"):
+        if operation in data_source:
+            raise InvalidDBOperationException(
+                f"DB operation: {operation} can't be streamed"
+            )
+
+    return iterate_on_replica(build_queryset(data_source=data_source, stream=True))
+
+
 def add_custom_fields(
     *,
     data: Union[Dict[str, Any], List[Dict[str, Any]]],
@@ -386,105 +746,98 @@ def add_custom_fields(
     else:
         CustomFieldModel = SiteCustomField
 
-    custom_fields = CustomField.objects.filter(name__in=fields_to_add, model=model_name)
+    custom_fields = list(
+        CustomField.objects.filter(name__in=fields_to_add, model=model_name)
+    )
+    defaults = {field.id: field.default_value for field in custom_fields}
 
-    if dict_value:
-        custom_field_data = list(
-            CustomFieldModel.objects.select_related("field").filter(
-                field__name__in=fields_to_add, **{f"{model_name}_id": data["id"]}
-            )
+    rows = [data] if dict_value else data
+    object_column = f"{model_name}_id"
+
+    # one query for every value, looked up by (object id, field id) per row
+    values = {
+        (getattr(cf, object_column), cf.field_id): cf.value
+        for cf in CustomFieldModel.objects.select_related("field").filter(
+            field_id__in=list(defaults),
+            **{f"{object_column}__in": [row["id"] for row in rows]},
         )
-        # hold custom field data on the returned object
-        data["custom_fields"]: Dict[str, Any] = {}
+    }
 
-        for custom_field in custom_fields:
-            find_custom_field_data = next(
-                (cf for cf in custom_field_data if cf.field_id == custom_field.id),
-                None,
-            )
+    for row in rows:
+        row["custom_fields"] = {
+            field.name: values.get((row["id"], field.id), defaults[field.id])
+            for field in custom_fields
+        }
 
-            if find_custom_field_data is not None:
-                data["custom_fields"][custom_field.name] = find_custom_field_data.value
-            else:
-                data["custom_fields"][custom_field.name] = custom_field.default_value
+    return data
 
-        return data
-    else:
-        ids = [row["id"] for row in data]
-        custom_field_data = list(
-            CustomFieldModel.objects.select_related("field").filter(
-                field__name__in=fields_to_add, **{f"{model_name}_id__in": ids}
-            )
-        )
 
-        for row in data:
-            row["custom_fields"]: Dict[str, Any] = {}
-
-            for custom_field in custom_fields:
-                find_custom_field_data = next(
-                    (
-                        cf
-                        for cf in custom_field_data
-                        if cf.field_id == custom_field.id
-                        and getattr(cf, f"{model_name}_id") == row["id"]
-                    ),
-                    None,
-                )
+def get_assets(text: str) -> Dict[str, ReportAsset]:
+    """Returns the assets linked in text by id, in the order they appear"""
+    ids = list(dict.fromkeys(id for _, id in RE_ASSET_URL.findall(text)))
+    if not ids:
+        return {}
+
+    assets = {str(asset.id): asset for asset in ReportAsset.objects.filter(id__in=ids)}
+    return {id: assets[id] for id in ids if id in assets}
 
-                if find_custom_field_data is not None:
-                    row["custom_fields"][
-                        custom_field.name
-                    ] = find_custom_field_data.value
-                else:
-                    row["custom_fields"][custom_field.name] = custom_field.default_value
 
-        return data
+def get_asset_paths(text: str) -> Dict[str, str]:
+    return {id: asset.file.path for id, asset in get_assets(text).items()}
 
 
 def normalize_asset_url(text: str, type: Literal["pdf", "html", "plaintext"]) -> str:
+    # pdfs keep the asset:// urls, the renderer resolves them
+    if type == "pdf":
+        return text
+
     new_text = text
-    for url, id in RE_ASSET_URL.findall(text):
-        try:
-            asset = ReportAsset.objects.get(id=id)
-            if type == "html":
-                new_text = new_text.replace(
-                    f"asset://{id}", f"{asset.file.url}?id={id}"
-                )
-            else:
-                new_text = new_text.replace(f"{url}", f"file://{asset.file.path}")
-        except ReportAsset.DoesNotExist:
-            pass
+    for id, asset in get_assets(text).items():
+        if type == "html":
+            # the version changes with the contents, so browsers can cache
+            # the asset for as long as the url stays the same
+            version = asset.get_checksum()[:ASSET_VERSION_LENGTH]
+            new_text = new_text.replace(
+                f"asset://{id}", f"{asset.file.url}?id={id}&v={version}"
+            )
+        else:
+            new_text = new_text.replace(f"asset://{id}", f"file://{asset.file.path}")
 
     return new_text
 
 
-def base64_encode_assets(template: str) -> List[Dict[str, Any]]:
+def encode_asset(asset: ReportAsset) -> str:
     import base64
 
-    assets = []
-    added_ids = []
-    for _, id in RE_ASSET_URL.findall(template):
-        if id not in added_ids:
-            try:
-                asset = ReportAsset.objects.get(pk=id)
+    checksum = asset.get_checksum()
+    key = f"{ASSET_ENCODED_CACHE_PREFIX}{checksum}"
+    if checksum and settings.REPORTING_ASSET_CACHE_TTL:
+        encoded: Optional[str] = cache.get(key)
+        if encoded is not None:
+            return encoded
 
-                encoded_base64_str = base64.b64encode(asset.file.file.read()).decode(
-                    "utf-8"
-                )
-                assets.append(
-                    {
-                        "id": asset.id,
-                        "name": asset.file.name,
-                        "file": encoded_base64_str,
-                    }
-                )
-                added_ids.append(
-                    str(asset.id)
-                )  # need to convert uuid to str for easy comparison
-            except ReportAsset.DoesNotExist:
-                continue
+    with asset.file.open("rb") as f:
+        encoded = base64.b64encode(f.read()).decode("utf-8")
 
-    return assets
+    if (
+        checksum
+        and settings.REPORTING_ASSET_CACHE_TTL
+        and asset.file.size <= ASSET_ENCODED_CACHE_MAX_SIZE
+    ):
+        cache.set(key, encoded, settings.REPORTING_ASSET_CACHE_TTL)
+
+    return encoded
+
+
+def base64_encode_assets(template: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": asset.id,
+            "name": asset.file.name,
+            "file": encode_asset(asset),
+        }
+        for asset in get_assets(template).values()
+    ]
 
 
 def decode_base64_asset(asset: str) -> bytes:
@@ -493,18 +846,115 @@ def decode_base64_asset(asset: str) -> bytes:
     return base64.b64decode(asset.encode("utf-8"))
 
 
+# operations whose values are field paths that may cross relations
+RELATION_PATH_OPERATIONS = (
+    "only",
+    "defer",
+    "values",
+    "order_by",
+    "select_related",
+    "prefetch_related",
+)
+
+CUSTOM_FIELD_MODELS = {
+    "agent": ("agents", "AgentCustomField"),
+    "client": ("clients", "ClientCustomField"),
+    "site": ("clients", "SiteCustomField"),
+}
+
+
+def get_data_source_models(data_source: Dict[str, Any]) -> List[Any]:
+    """
+    The models a resolved data source reads from, following the relations
+    named in its lookups. Used to key cached results on model generations.
+    """
+    Model = data_source["model"]
+    models = {Model}
+
+    paths: List[str] = []
+    for operation, values in data_source.items():
+        if operation in ("filter", "exclude", "get") and isinstance(values, dict):
+            paths.extend(values)
+        elif operation in RELATION_PATH_OPERATIONS:
+            paths.extend(values if isinstance(values, list) else [values])
+
+    for path in paths:
+        current = Model
+        for part in str(path).lstrip("-").split("__"):
+            try:
+                related = current._meta.get_field(part).related_model
+            except FieldDoesNotExist:
+                break
+
+            if related is None:
+                break
+
+            current = related
+            models.add(current)
+
+    model_name = Model.__name__.lower()
+    if data_source.get("custom_fields") and model_name in CUSTOM_FIELD_MODELS:
+        models.add(apps.get_model("core", "CustomField"))
+        models.add(apps.get_model(*CUSTOM_FIELD_MODELS[model_name]))
+
+    return sorted(models, key=lambda m: m._meta.label_lower)
+
+
+_MISSING = object()
+
+
 def process_data_sources(
-    *, variables: Dict[str, Any], limit_query_results: Optional[int] = None
+    *,
+    variables: Dict[str, Any],
+    limit_query_results: Optional[int] = None,
+    use_cache: bool = True,
+    query_stats: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     data_sources = variables.get("data_sources")
+    ttl = settings.REPORTING_DATA_CACHE_TTL
 
     if isinstance(data_sources, dict):
         for key, value in data_sources.items():
             if isinstance(value, dict):
+                # "cache: false" on a data source always runs the query
+                cache_result = value.pop("cache", True) is not False
                 modified_datasource = resolve_model(data_source=value)
-                queryset = build_queryset(
-                    data_source=modified_datasource, limit=limit_query_results
-                )
+
+                cache_key = None
+                if use_cache and cache_result and ttl > 0:
+                    cache_key = get_data_source_cache_key(
+                        data_source=modified_datasource,
+                        models=get_data_source_models(modified_datasource),
+                        limit=limit_query_results,
+                    )
+                    cached = cache.get(cache_key, _MISSING)
+                    if cached is not _MISSING:
+                        data_sources[key], limited = cached
+                        if query_stats is not None:
+                            query_stats[key] = {"cached": True}
+                            if limited:
+                                query_stats[key]["limited"] = limited
+                        continue
+
+                stats: Dict[str, Any] = {"cached": False}
+                start = time.monotonic()
+                with use_replica():
+                    # a lagging replica may not have the write that bumped
+                    # the generation yet, so don't cache what it returns
+                    if replica_in_use() and replica_lag():
+                        cache_key = None
+
+                    queryset = build_queryset(
+                        data_source=modified_datasource,
+                        limit=limit_query_results,
+                        stats=stats,
+                    )
+                stats["time_ms"] = round((time.monotonic() - start) * 1000, 1)
+                if query_stats is not None:
+                    query_stats[key] = stats
+                if cache_key:
+                    cache.set(cache_key, (queryset, stats.get("limited")), ttl)
+
                 data_sources[key] = queryset
 
     return variables
@@ -611,7 +1061,16 @@ def generate_chart(
     traces: Optional[Dict[str, Any]] = None,
     layout: Optional[Dict[str, Any]] = None,
 ) -> str:
-    # TODO figure out why plotly affects perf
+    ttl = settings.REPORTING_CHART_CACHE_TTL
+    key = get_chart_cache_key(
+        type=type, format=format, options=options, traces=traces, layout=layout
+    )
+    if ttl:
+        chart = cache.get(key)
+        if chart is not None:
+            return cast(str, chart)
+
+    # plotly is slow to import and to build figures, only pay for it on a miss
     import plotly.express as px
 
     fig = getattr(px, type)(**options)
@@ -622,10 +1081,21 @@ def generate_chart(
     if layout:
         fig.update_layout(**layout)
 
+    chart = None
     if format == "html":
-        return cast(str, fig.to_html(full_html=False, include_plotlyjs="cdn"))
+        chart = fig.to_html(full_html=False, include_plotlyjs="cdn")
     elif format == "image":
-        return cast(str, fig.to_image(format="svg").decode("utf-8"))
+        # kaleido stays warm in the renderer processes
+        pool = get_renderer_pool()
+        if pool is None:
+            chart = render_chart_image(fig.to_json())
+        else:
+            chart = pool.run(render_chart_image, fig.to_json())
+
+    if ttl and chart is not None:
+        cache.set(key, chart, ttl)
+
+    return cast(str, chart)
 
 
 # import report functions
@@ -8,6 +8,7 @@ import json
 import os
 import shutil
 import uuid
+from itertools import chain
 from typing import Any, Dict, List, Literal, Optional, Union
 
 import requests
@@ -19,8 +20,15 @@ from django.core.exceptions import (
 )
 from django.core.files.base import ContentFile
 from django.db import transaction
-from django.http import FileResponse, HttpResponse, JsonResponse
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 from jinja2.exceptions import TemplateError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.request import Request
@@ -33,15 +41,27 @@ from rest_framework.serializers import (
     JSONField,
     ListField,
     ModelSerializer,
+    ReadOnlyField,
     Serializer,
+    SerializerMethodField,
     ValidationError,
 )
 from rest_framework.views import APIView
 from tacticalrmm.utils import notify_error
 
-from .models import ReportAsset, ReportDataQuery, ReportHTMLTemplate, ReportTemplate
+from .constants import ASSET_VERSION_LENGTH, TRUNCATED_HEADER
+from .models import (
+    ReportAsset,
+    ReportDataQuery,
+    ReportHTMLTemplate,
+    ReportJob,
+    ReportJobItem,
+    ReportJobStatus,
+    ReportTemplate,
+)
 from .permissions import GenerateReportPerms, ReportingPerms
 from .storage import report_assets_fs
+from .tasks import generate_report_job_item_task
 from .utils import (
     _import_assets,
     _import_base_template,
@@ -49,11 +69,26 @@ from .utils import (
     base64_encode_assets,
     generate_html,
     generate_pdf,
+    get_truncated_data_sources,
     normalize_asset_url,
     prep_variables_for_template,
+    render_report,
+    stream_data_source,
 )
 
 
+def add_truncated_header(
+    response: Union[Response, FileResponse], query_stats: Dict[str, Any]
+) -> Union[Response, FileResponse]:
+    truncated = get_truncated_data_sources(query_stats)
+    if truncated:
+        response[TRUNCATED_HEADER] = ", ".join(
+            f"{key}={limit}" for key, limit in truncated.items()
+        )
+
+    return response
+
+
 def path_exists(value: str) -> None:
     if not report_assets_fs.exists(value):
         raise ValidationError("Path does not exist on the file system")
@@ -126,28 +161,25 @@ class GenerateReport(APIView):
             return notify_error("Report format is incorrect.")
 
         try:
-            html_report, _ = generate_html(
-                template=template.template_md,
-                template_type=template.type,
-                css=template.template_css or "",
-                html_template=(
-                    template.template_html.id if template.template_html else None
-                ),
-                variables=template.template_variables,
+            query_stats: Dict[str, Any] = {}
+            report = render_report(
+                template=template,
+                format=format,
                 dependencies=request.data["dependencies"],
+                use_cache=not request.data.get("bypass_cache", False),
+                query_stats=query_stats,
             )
 
-            html_report = normalize_asset_url(html_report, format)
-
             if format != "pdf":
-                return Response(html_report)
+                return add_truncated_header(Response(report), query_stats)
             else:
-                pdf_bytes = generate_pdf(html=html_report)
-
-                return FileResponse(
-                    ContentFile(pdf_bytes),
-                    content_type="application/pdf",
-                    filename=f"{template.name}.pdf",
+                return add_truncated_header(
+                    FileResponse(
+                        ContentFile(report),
+                        content_type="application/pdf",
+                        filename=f"{template.name}.pdf",
+                    ),
+                    query_stats,
                 )
 
         except TemplateError as error:
@@ -171,6 +203,7 @@ class GenerateReportPreview(APIView):
         dependencies: Dict[str, Any]
         format: Literal["html", "pdf", "plaintext"]
         debug: bool
+        bypass_cache: bool
 
     class InputSerializer(Serializer[InputRequest]):
         template_md = CharField()
@@ -181,10 +214,12 @@ class GenerateReportPreview(APIView):
         dependencies = JSONField()
         format = ChoiceField(choices=["html", "pdf", "plaintext"])
         debug = BooleanField(default=False)
+        bypass_cache = BooleanField(default=False)
 
     def post(self, request: Request) -> Union[FileResponse, Response]:
         try:
             report_data = self._parse_and_validate_request_data(request.data)
+            query_stats: Dict[str, Any] = {}
             html_report, variables = generate_html(
                 template=report_data["template_md"],
                 template_type=report_data["type"],
@@ -192,12 +227,17 @@ class GenerateReportPreview(APIView):
                 html_template=report_data.get("template_html"),
                 variables=report_data["template_variables"],
                 dependencies=report_data["dependencies"],
+                use_cache=not report_data["bypass_cache"],
+                query_stats=query_stats,
             )
 
             if report_data["debug"]:
-                return self._process_debug_response(html_report, variables)
-            return self._generate_response_based_on_format(
-                html_report, report_data["format"]
+                return self._process_debug_response(html_report, variables, query_stats)
+            return add_truncated_header(
+                self._generate_response_based_on_format(
+                    html_report, report_data["format"]
+                ),
+                query_stats,
             )
         except TemplateError as error:
             return self._handle_template_error(error)
@@ -210,7 +250,10 @@ class GenerateReportPreview(APIView):
         return serializer.validated_data
 
     def _process_debug_response(
-        self, html_report: str, variables: Dict[str, Any]
+        self,
+        html_report: str,
+        variables: Dict[str, Any],
+        query_stats: Optional[Dict[str, Any]] = None,
     ) -> Response:
         if variables:
             from django.forms.models import model_to_dict
@@ -225,7 +268,14 @@ class GenerateReportPreview(APIView):
                     )
                     variables[model_name] = serialized_model
 
-        return Response({"template": html_report, "variables": variables})
+        return Response(
+            {
+                "template": html_report,
+                "variables": variables,
+                "query_stats": query_stats or {},
+                "truncated": get_truncated_data_sources(query_stats or {}),
+            }
+        )
 
     def _generate_response_based_on_format(
         self, html_report: str, format: Literal["html", "pdf", "plaintext"]
@@ -251,6 +301,165 @@ class GenerateReportPreview(APIView):
         return notify_error(error_message)
 
 
+class ReportJobItemSerializer(ModelSerializer[ReportJobItem]):
+    has_file = SerializerMethodField()
+
+    class Meta:
+        model = ReportJobItem
+        exclude = ("file",)
+
+    def get_has_file(self, obj: ReportJobItem) -> bool:
+        return bool(obj.file)
+
+
+class ReportJobSerializer(ModelSerializer[ReportJob]):
+    template_name = ReadOnlyField(source="template.name")
+    total = SerializerMethodField()
+    completed = SerializerMethodField()
+    failed = SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = "__all__"
+
+    def _count(self, obj: ReportJob, status: Optional[str] = None) -> int:
+        # counted in python so a prefetched items list is reused
+        return sum(
+            1 for item in obj.items.all() if status is None or item.status == status
+        )
+
+    def get_total(self, obj: ReportJob) -> int:
+        return self._count(obj)
+
+    def get_completed(self, obj: ReportJob) -> int:
+        return self._count(obj, ReportJobStatus.COMPLETED)
+
+    def get_failed(self, obj: ReportJob) -> int:
+        return self._count(obj, ReportJobStatus.FAILED)
+
+
+class GetAddReportJobs(APIView):
+    permission_classes = [IsAuthenticated, GenerateReportPerms]
+
+    class InputRequest:
+        format: Literal["html", "pdf", "plaintext"]
+        dependencies: List[Dict[str, Any]]
+        each: Literal["client", "site", "agent"]
+        shared_dependencies: Dict[str, Any]
+
+    class InputSerializer(Serializer[InputRequest]):
+        format = ChoiceField(choices=["html", "pdf", "plaintext"])
+        dependencies = ListField(child=JSONField(), required=False)
+        each = ChoiceField(choices=["client", "site", "agent"], required=False)
+        shared_dependencies = JSONField(required=False, default=dict)
+
+        def validate(self, attrs):
+            if not attrs.get("dependencies") and not attrs.get("each"):
+                raise ValidationError("Either dependencies or each is required")
+            return attrs
+
+    def get(self, request: Request, pk: int) -> Response:
+        jobs = (
+            ReportJob.objects.filter(template_id=pk)
+            .select_related("template")
+            .prefetch_related("items")
+            .order_by("-created_time")
+        )
+        return Response(ReportJobSerializer(jobs, many=True).data)
+
+    def post(self, request: Request, pk: int) -> Response:
+        template = get_object_or_404(ReportTemplate, pk=pk)
+
+        serializer = self.InputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        dependency_sets = data.get("dependencies") or []
+        if data.get("each"):
+            dependency_sets += self._each_dependencies(request, data["each"])
+
+        shared = data["shared_dependencies"]
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                template=template,
+                format=data["format"],
+                created_by=request.user.username,
+            )
+            items = ReportJobItem.objects.bulk_create(
+                [
+                    ReportJobItem(job=job, dependencies={**shared, **dependencies})
+                    for dependencies in dependency_sets
+                ]
+            )
+
+        # items are queued after commit so the workers can see them
+        def queue_items() -> None:
+            for item in items:
+                generate_report_job_item_task.delay(item.pk)
+
+        transaction.on_commit(queue_items)
+
+        return Response(ReportJobSerializer(job).data)
+
+    def _each_dependencies(
+        self, request: Request, each: Literal["client", "site", "agent"]
+    ) -> List[Dict[str, Any]]:
+        from agents.models import Agent
+        from clients.models import Client, Site
+
+        if each == "agent":
+            ids = Agent.objects.filter_by_role(request.user).values_list(  # type: ignore
+                "agent_id", flat=True
+            )
+        else:
+            model = Client if each == "client" else Site
+            ids = model.objects.filter_by_role(request.user).values_list(  # type: ignore
+                "pk", flat=True
+            )
+
+        return [{each: id} for id in ids]
+
+
+class GetDeleteReportJob(APIView):
+    permission_classes = [IsAuthenticated, GenerateReportPerms]
+
+    def get(self, request: Request, pk: str) -> Response:
+        job = get_object_or_404(
+            ReportJob.objects.select_related("template").prefetch_related("items"),
+            pk=pk,
+        )
+        return Response(
+            {
+                **ReportJobSerializer(job).data,
+                "items": ReportJobItemSerializer(job.items.all(), many=True).data,
+            }
+        )
+
+    def delete(self, request: Request, pk: str) -> Response:
+        get_object_or_404(ReportJob, pk=pk).delete()
+
+        return Response()
+
+
+class DownloadReportJobItem(APIView):
+    permission_classes = [IsAuthenticated, GenerateReportPerms]
+
+    def get(self, request: Request, pk: int) -> Union[FileResponse, Response]:
+        item = get_object_or_404(ReportJobItem.objects.select_related("job"), pk=pk)
+
+        if not item.file:
+            return notify_error("This report has not been generated.")
+
+        return FileResponse(
+            item.file.open("rb"),
+            as_attachment=True,
+            filename=item.file.name.split("/")[-1],
+            content_type=(
+                "application/pdf" if item.job.format == "pdf" else "text/html"
+            ),
+        )
+
+
 class ExportReportTemplate(APIView):
     permission_classes = [IsAuthenticated, GenerateReportPerms]
 
@@ -601,6 +810,7 @@ class DeleteAssets(APIView):
                     except ObjectDoesNotExist:
                         report_assets_fs.delete(path)
 
+            report_assets_fs.prune_blobs()
             return Response()
 
         except OSError as error:
@@ -811,6 +1021,41 @@ class GetEditDeleteReportDataQuery(APIView):
         return Response()
 
 
+class ExportReportDataQuery(APIView):
+    permission_classes = [IsAuthenticated, GenerateReportPerms]
+
+    class InputRequest:
+        json_query: Dict[str, Any]
+        format: Literal["csv", "ndjson"]
+
+    class InputSerializer(Serializer[InputRequest]):
+        json_query = JSONField()
+        format = ChoiceField(choices=["csv", "ndjson"], default="csv")
+
+    def post(self, request: Request) -> Union[StreamingHttpResponse, Response]:
+        serializer = self.InputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        format = serializer.validated_data["format"]
+
+        try:
+            chunks = stream_data_source(
+                data_source=serializer.validated_data["json_query"], format=format
+            )
+            # run the query now so errors are returned before streaming starts
+            first = next(chunks, "")
+        except Exception as error:
+            return notify_error(str(error))
+
+        response = StreamingHttpResponse(
+            chain([first], chunks),
+            content_type="text/csv" if format == "csv" else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="export.{"csv" if format == "csv" else "ndjson"}"'
+        )
+        return response
+
+
 class NginxRedirect(APIView):
     permission_classes = (AllowAny,)
 
@@ -820,15 +1065,32 @@ class NginxRedirect(APIView):
             asset_uuid = uuid.UUID(id, version=4)
             asset = get_object_or_404(ReportAsset, id=asset_uuid)
             new_path = path.split("?")[0]
-            if asset.file.name == new_path:
-                response = HttpResponse(status=200)
-                response["X-Accel-Redirect"] = "/assets/" + new_path
-                return response
-            else:
+            if asset.file.name != new_path:
                 raise PermissionDenied()
         except ValueError:
             return notify_error("There was a error processing the request")
 
+        checksum = asset.get_checksum()
+        etag = quote_etag(checksum) if checksum else None
+        if etag and etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response: HttpResponse = HttpResponseNotModified()
+        else:
+            response = HttpResponse(status=200)
+            response["X-Accel-Redirect"] = "/assets/" + new_path
+
+        if etag:
+            response["ETag"] = etag
+
+        # urls from normalize_asset_url carry a version of the contents and
+        # change whenever they do, anything else has to be revalidated
+        version = request.query_params.get("v")
+        if checksum and version == checksum[:ASSET_VERSION_LENGTH]:
+            response["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response["Cache-Control"] = "no-cache"
+
+        return response
+
 
 class QuerySchema(APIView):
     permission_classes = [IsAuthenticated, ReportingPerms]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logs", "0026_entry_time_default"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["entry_time", "id"], name="logs_auditl_entry_t_124000_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["agent_id", "entry_time"], name="logs_auditl_agent_i_695e93_idx"
+            ),
+        ),
+    ]
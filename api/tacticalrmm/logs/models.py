@@ -1,9 +1,25 @@
+import copy
 from abc import abstractmethod
-from typing import TYPE_CHECKING, Any, Dict, Literal, Optional, Tuple, Union, cast
+from functools import partial
+from time import monotonic
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED
+from django.utils import timezone as djangotime
 
 from core.utils import get_core_settings
+from logs.writer import queue_log
 from tacticalrmm.constants import (
     AuditActionType,
     AuditObjType,
@@ -21,16 +37,41 @@ if TYPE_CHECKING:
     from core.models import URLAction
 
 
+DEBUG_LEVEL_TTL = 30
+
+# (expires, level), cached per process since every DebugLog call checks it
+_debug_level: "Tuple[float, str]" = (0.0, "")
+
+
 def get_debug_level() -> str:
-    return get_core_settings().agent_debug_level
+    global _debug_level
+
+    expires, level = _debug_level
+    if monotonic() >= expires:
+        level = get_core_settings().agent_debug_level
+        _debug_level = (monotonic() + DEBUG_LEVEL_TTL, level)
+
+    return level
+
+
+def clear_debug_level() -> None:
+    global _debug_level
+    _debug_level = (0.0, "")
 
 
 class AuditLog(models.Model):
+    class Meta:
+        indexes = [
+            # keyset pagination and time windows in the audit log viewer
+            models.Index(fields=["entry_time", "id"]),
+            models.Index(fields=["agent_id", "entry_time"]),
+        ]
+
     id = models.BigAutoField(primary_key=True)
     username = models.CharField(max_length=255)
     agent = models.CharField(max_length=255, null=True, blank=True)
     agent_id = models.CharField(max_length=255, blank=True, null=True)
-    entry_time = models.DateTimeField(auto_now_add=True)
+    entry_time = models.DateTimeField(default=djangotime.now, editable=False)
     action = models.CharField(max_length=100, choices=AuditActionType.choices)
     object_type = models.CharField(max_length=100, choices=AuditObjType.choices)
     before_value = models.JSONField(null=True, blank=True)
@@ -43,18 +84,28 @@ class AuditLog(models.Model):
 
     def save(self, *args: Any, **kwargs: Any) -> None:
         if not self.pk and self.message:
-            # truncate message field if longer than 255 characters
-            self.message = (
-                (self.message[:253] + "..") if len(self.message) > 255 else self.message
-            )
+            self.message = self.truncate_message(self.message)
 
         return super().save(*args, **kwargs)
 
+    @staticmethod
+    def truncate_message(message: str) -> str:
+        # truncate message field if longer than 255 characters
+        return (message[:253] + "..") if len(message) > 255 else message
+
+    @classmethod
+    def write(cls, **kwargs: Any) -> None:
+        # bulk_create skips save() so truncate here as well
+        if kwargs.get("message"):
+            kwargs["message"] = cls.truncate_message(kwargs["message"])
+
+        queue_log(cls, **kwargs)
+
     @staticmethod
     def audit_mesh_session(
         username: str, agent: "Agent", debug_info: Dict[Any, Any] = {}
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             agent=agent.hostname,
             agent_id=agent.agent_id,
@@ -72,7 +123,7 @@ class AuditLog(models.Model):
         shell: str,
         debug_info: Dict[Any, Any] = {},
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             agent=agent.hostname,
             agent_id=agent.agent_id,
@@ -92,7 +143,7 @@ class AuditLog(models.Model):
         name: str = "",
         debug_info: Dict[Any, Any] = {},
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=object_type,
             agent=before["hostname"] if object_type == AuditObjType.AGENT else None,
@@ -112,7 +163,7 @@ class AuditLog(models.Model):
         name: str = "",
         debug_info: Dict[Any, Any] = {},
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=object_type,
             agent=after["hostname"] if object_type == AuditObjType.AGENT else None,
@@ -131,7 +182,7 @@ class AuditLog(models.Model):
         name: str = "",
         debug_info: Dict[Any, Any] = {},
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=object_type,
             agent=before["hostname"] if object_type == AuditObjType.AGENT else None,
@@ -149,7 +200,7 @@ class AuditLog(models.Model):
         agent: Optional["Agent"],
         debug_info: Dict[Any, Any] = {},
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             agent=agent.hostname if agent else "Tactical RMM Server",
             agent_id=agent.agent_id if agent else "N/A",
             username=username,
@@ -169,7 +220,7 @@ class AuditLog(models.Model):
 
         debug_info["script_body"] = script_body
 
-        AuditLog.objects.create(
+        AuditLog.write(
             agent=agent.hostname if agent else "Tactical RMM Server",
             agent_id=agent.agent_id if agent else "N/A",
             username=username,
@@ -181,7 +232,7 @@ class AuditLog(models.Model):
 
     @staticmethod
     def audit_user_failed_login(username: str, debug_info: Dict[Any, Any] = {}) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=AuditObjType.USER,
             action=AuditActionType.FAILED_LOGIN,
@@ -193,7 +244,7 @@ class AuditLog(models.Model):
     def audit_user_failed_twofactor(
         username: str, debug_info: Dict[Any, Any] = {}
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=AuditObjType.USER,
             action=AuditActionType.FAILED_LOGIN,
@@ -205,7 +256,7 @@ class AuditLog(models.Model):
     def audit_user_login_successful(
         username: str, debug_info: Dict[Any, Any] = {}
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=AuditObjType.USER,
             action=AuditActionType.LOGIN,
@@ -217,7 +268,7 @@ class AuditLog(models.Model):
     def audit_user_login_successful_sso(
         username: str, provider: str, debug_info: Dict[Any, Any] = {}
     ) -> None:
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=AuditObjType.USER,
             action=AuditActionType.LOGIN,
@@ -236,7 +287,7 @@ class AuditLog(models.Model):
 
         name = instance.hostname if isinstance(instance, Agent) else instance.name
         classname = type(instance).__name__
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             agent=name if isinstance(instance, Agent) else None,
             agent_id=instance.agent_id if isinstance(instance, Agent) else None,
@@ -278,7 +329,7 @@ class AuditLog(models.Model):
         else:
             name = "None"
         classname = type(instance).__name__
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             agent=name if isinstance(instance, Agent) else None,
             agent_id=instance.agent_id if isinstance(instance, Agent) else None,
@@ -323,7 +374,7 @@ class AuditLog(models.Model):
         if agents:
             affected["agent_hostnames"] = list(agents)
 
-        AuditLog.objects.create(
+        AuditLog.write(
             username=username,
             object_type=AuditObjType.BULK,
             action=AuditActionType.BULK_ACTION,
@@ -337,7 +388,7 @@ class DebugLog(models.Model):
     objects = PermissionQuerySet.as_manager()
 
     id = models.BigAutoField(primary_key=True)
-    entry_time = models.DateTimeField(auto_now_add=True)
+    entry_time = models.DateTimeField(default=djangotime.now, editable=False)
     agent = models.ForeignKey(
         "agents.Agent",
         related_name="debuglogs",
@@ -353,6 +404,10 @@ class DebugLog(models.Model):
     )
     message = models.TextField(null=True, blank=True)
 
+    @classmethod
+    def write(cls, agent: "Optional[Agent]" = None, **kwargs: Any) -> None:
+        queue_log(cls, agent_id=agent.pk if agent else None, **kwargs)
+
     @classmethod
     def info(
         cls,
@@ -361,7 +416,7 @@ class DebugLog(models.Model):
         log_type: str = DebugLogType.SYSTEM_ISSUES,
     ) -> None:
         if get_debug_level() == DebugLogLevel.INFO:
-            cls.objects.create(
+            cls.write(
                 log_level=DebugLogLevel.INFO,
                 agent=agent,
                 log_type=log_type,
@@ -376,7 +431,7 @@ class DebugLog(models.Model):
         log_type: str = DebugLogType.SYSTEM_ISSUES,
     ) -> None:
         if get_debug_level() in (DebugLogLevel.INFO, DebugLogLevel.WARN):
-            cls.objects.create(
+            cls.write(
                 log_level=DebugLogLevel.INFO,
                 agent=agent,
                 log_type=log_type,
@@ -395,7 +450,7 @@ class DebugLog(models.Model):
             DebugLogLevel.WARN,
             DebugLogLevel.ERROR,
         ):
-            cls.objects.create(
+            cls.write(
                 log_level=DebugLogLevel.ERROR,
                 agent=agent,
                 log_type=log_type,
@@ -415,7 +470,7 @@ class DebugLog(models.Model):
             DebugLogLevel.ERROR,
             DebugLogLevel.CRITICAL,
         ):
-            cls.objects.create(
+            cls.write(
                 log_level=DebugLogLevel.CRITICAL,
                 agent=agent,
                 log_type=log_type,
@@ -494,58 +549,149 @@ class BaseAuditModel(models.Model):
     def serialize(class_name: models.Model) -> Dict[str, Any]:
         pass
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # keep the loaded values so saves can diff against them without refetching
+        instance._take_snapshot(
+            name for name, value in zip(field_names, values) if value is not DEFERRED
+        )
+        return instance
+
+    def _take_snapshot(self, attnames: Iterable[str]) -> None:
+        snapshot = getattr(self, "_loaded_values", {})
+        for attname in attnames:
+            value = getattr(self, attname)
+            # json fields can be changed in place, so they need their own copy
+            snapshot[attname] = (
+                copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            )
+        self._loaded_values = snapshot
+
+    def get_original(self) -> "Optional[BaseAuditModel]":
+        """
+        Returns the instance as it was when loaded from the db, or None if it's new.
+        Built from the values kept by from_db, fields that weren't loaded stay deferred.
+        """
+        if not self.pk or self._state.adding:
+            return None
+
+        loaded = getattr(self, "_loaded_values", None)
+        fields = self._meta.concrete_fields
+        if loaded is None or any(
+            f.attname not in loaded and f.attname in self.__dict__ for f in fields
+        ):
+            # not loaded from the db, or a deferred field was set since, so only
+            # the db knows what it was
+            return type(self).objects.get(pk=self.pk)
+
+        return type(self).from_db(
+            self._state.db,
+            [f.attname for f in fields],
+            [loaded.get(f.attname, DEFERRED) for f in fields],
+        )
+
     def save(self, old_model: Optional[models.Model] = None, *args, **kwargs) -> None:
         username = get_username()
+        before = None
         if username:
-            object_class = type(self)
-            object_name = object_class.__name__.lower()
-            after_value = object_class.serialize(self)
-
             # populate created_by and modified_by fields on instance
             if not getattr(self, "created_by", None):
                 self.created_by = username
             if hasattr(self, "modified_by"):
                 self.modified_by = username
 
-            # dont create entry for agent add since that is done in view
-            if not self.pk and username:
-                AuditLog.audit_object_add(
+            if self.pk and not self._state.adding:
+                before = old_model or self.get_original()
+
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        self._take_snapshot(
+            f.attname
+            for f in self._meta.concrete_fields
+            if f.attname in self.__dict__
+            and (update_fields is None or f.name in update_fields)
+        )
+
+        if username:
+            # serialize and write the entry once the save is committed
+            transaction.on_commit(
+                partial(
+                    _audit_object_saved,
                     username,
-                    object_name,
-                    after_value,
+                    before,
+                    copy.copy(self),
                     self.__str__(),
-                    debug_info=get_debug_info(),
+                    get_debug_info(),
                 )
-            else:
-                if old_model:
-                    before_value = object_class.serialize(old_model)
-                else:
-                    before_value = object_class.serialize(
-                        object_class.objects.get(pk=self.pk)
-                    )
-                # only create an audit entry if the values have changed
-                if before_value != after_value and username:
-                    AuditLog.audit_object_changed(
-                        username,
-                        object_class.__name__.lower(),
-                        before_value,
-                        after_value,
-                        self.__str__(),
-                        debug_info=get_debug_info(),
-                    )
-
-        super().save(*args, **kwargs)
+            )
 
     def delete(self, *args, **kwargs) -> Tuple[int, Dict[str, int]]:
+        # delete() clears the pk, serialize a copy that still has it
+        deleted = copy.copy(self)
         super().delete(*args, **kwargs)
 
         username = get_username()
         if username:
-            object_class = type(self)
-            AuditLog.audit_object_delete(
-                username,
-                object_class.__name__.lower(),
-                object_class.serialize(self),
-                self.__str__(),
-                debug_info=get_debug_info(),
+            transaction.on_commit(
+                partial(
+                    _audit_object_deleted,
+                    username,
+                    deleted,
+                    self.__str__(),
+                    get_debug_info(),
+                )
             )
+
+
+# fields that change on every save, ignored when deciding if anything was modified
+AUDIT_MODEL_FIELDS = ("created_by", "created_time", "modified_by", "modified_time")
+
+
+def _audit_object_saved(
+    username: str,
+    before: Optional[BaseAuditModel],
+    after: BaseAuditModel,
+    name: str,
+    debug_info: Dict[str, Any],
+) -> None:
+    object_class = type(after)
+    object_name = object_class.__name__.lower()
+    after_value = object_class.serialize(after)
+
+    # dont create entry for agent add since that is done in view
+    if before is None:
+        AuditLog.audit_object_add(
+            username, object_name, after_value, name, debug_info=debug_info
+        )
+        return
+
+    before_value = object_class.serialize(before)
+    # only create an audit entry if the values have changed
+    if any(
+        before_value.get(k) != after_value.get(k)
+        for k in before_value.keys() | after_value.keys()
+        if k not in AUDIT_MODEL_FIELDS
+    ):
+        AuditLog.audit_object_changed(
+            username,
+            object_name,
+            before_value,
+            after_value,
+            name,
+            debug_info=debug_info,
+        )
+
+
+def _audit_object_deleted(
+    username: str, deleted: BaseAuditModel, name: str, debug_info: Dict[str, Any]
+) -> None:
+    object_class = type(deleted)
+    AuditLog.audit_object_delete(
+        username,
+        object_class.__name__.lower(),
+        object_class.serialize(deleted),
+        name,
+        debug_info=debug_info,
+    )
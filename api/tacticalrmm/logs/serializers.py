@@ -12,6 +12,11 @@ class AuditLogSerializer(serializers.ModelSerializer):
         from agents.models import Agent
         from clients.serializers import SiteMinimumSerializer
 
+        # the view looks up the sites for a whole page at once
+        sites = self.context.get("sites")
+        if sites is not None:
+            return sites.get(obj.agent_id)
+
         if obj.agent_id and Agent.objects.filter(agent_id=obj.agent_id).exists():
             return SiteMinimumSerializer(
                 Agent.objects.get(agent_id=obj.agent_id).site
@@ -1,25 +1,37 @@
 from django.utils import timezone as djangotime
 
 from tacticalrmm.celery import app
+from tacticalrmm.prune import prune_older_than
 
 
 @app.task
 def prune_debug_log(older_than_days: int) -> str:
     from .models import DebugLog
 
-    DebugLog.objects.filter(
-        entry_time__lt=djangotime.now() - djangotime.timedelta(days=older_than_days)
-    ).delete()
-
-    return "ok"
+    return str(
+        prune_older_than(
+            DebugLog.objects.all(),
+            "entry_time",
+            djangotime.now() - djangotime.timedelta(days=older_than_days),
+        )
+    )
 
 
 @app.task
 def prune_audit_log(older_than_days: int) -> str:
     from .models import AuditLog
 
-    AuditLog.objects.filter(
-        entry_time__lt=djangotime.now() - djangotime.timedelta(days=older_than_days)
-    ).delete()
+    return str(
+        prune_older_than(
+            AuditLog.objects.all(),
+            "entry_time",
+            djangotime.now() - djangotime.timedelta(days=older_than_days),
+        )
+    )
+
+
+@app.task
+def flush_log_queue_task() -> int:
+    from .writer import flush_log_queue
 
-    return "ok"
+    return flush_log_queue()
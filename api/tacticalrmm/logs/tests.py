@@ -1,6 +1,7 @@
 from itertools import cycle
 from unittest.mock import patch
 
+from django.test import override_settings
 from django.utils import timezone as djangotime
 from model_bakery import baker, seq
 
@@ -162,6 +163,47 @@ class TestAuditViews(TacticalTestCase):
 
         self.check_not_authenticated("patch", url)
 
+    def test_get_audit_logs_keyset(self):
+        from .models import AuditLog
+
+        url = "/logs/audit/"
+        self.create_audit_records()
+        pagination = {
+            "rowsPerPage": 25,
+            "sortBy": "entry_time",
+            "descending": True,
+            "cursor": None,
+        }
+
+        seen = []
+        while True:
+            r = self.client.patch(url, {"pagination": pagination}, format="json")
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.data["total"], 86)
+            seen += [i["id"] for i in r.data["audit_logs"]]
+            if not r.data["next"]:
+                break
+            pagination["cursor"] = r.data["next"]
+
+        expected = list(
+            AuditLog.objects.order_by("-entry_time", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+        # jump to a point in time
+        middle = AuditLog.objects.get(pk=expected[40])
+        pagination["cursor"] = None
+        pagination["startTime"] = middle.entry_time.isoformat()
+        r = self.client.patch(url, {"pagination": pagination}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(
+            all(i["entry_time"] <= middle.entry_time for i in r.data["audit_logs"])
+        )
+
+        pagination["startTime"] = "not a date"
+        r = self.client.patch(url, {"pagination": pagination}, format="json")
+        self.assertEqual(r.status_code, 400)
+
     def test_get_pending_actions(self):
         url = "/logs/pendingactions/"
         agent1 = baker.make_recipe("agents.online_agent")
@@ -520,3 +562,168 @@ class TestLogTasks(TacticalTestCase):
         prune_audit_log(30)
 
         self.assertEqual(AuditLog.objects.count(), 6)
+
+
+@patch("logs.models.get_debug_info", return_value={})
+@patch("logs.models.get_username", return_value="bob")
+class TestBaseAuditModel(TacticalTestCase):
+    def test_save_diffs_against_loaded_values(self, get_username, get_debug_info):
+        from scripts.models import Script
+
+        from .models import AuditLog
+
+        with self.captureOnCommitCallbacks(execute=True):
+            script = baker.make("scripts.Script", name="first", args=["-a"])
+        self.assertEqual(AuditLog.objects.get().action, "add")
+
+        script = Script.objects.get(pk=script.pk)
+        script.name = "second"
+        script.args.append("-b")
+        with self.captureOnCommitCallbacks(execute=True):
+            # only the update, the original comes from what was loaded
+            with self.assertNumQueries(1):
+                script.save()
+
+        entry = AuditLog.objects.filter(action="modify").get()
+        self.assertEqual(entry.before_value["name"], "first")
+        self.assertEqual(entry.before_value["args"], ["-a"])
+        self.assertEqual(entry.after_value["name"], "second")
+
+        # saving again without changes doesn't log anything
+        with self.captureOnCommitCallbacks(execute=True):
+            script.save()
+        self.assertEqual(AuditLog.objects.filter(action="modify").count(), 1)
+
+        pk = script.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            script.delete()
+        self.assertEqual(AuditLog.objects.get(action="delete").before_value["id"], pk)
+
+    def test_original_with_deferred_fields(self, get_username, get_debug_info):
+        from scripts.models import Script
+
+        script = baker.make("scripts.Script", name="first", description="desc")
+        script = Script.objects.only("pk", "name").get(pk=script.pk)
+        original = script.get_original()
+        self.assertEqual(original.name, "first")
+        self.assertEqual(original.get_deferred_fields(), script.get_deferred_fields())
+
+        # a deferred field that was set can only be diffed against the db
+        script.description = "changed"
+        with self.assertNumQueries(1):
+            self.assertEqual(script.get_original().description, "desc")
+
+
+class FakeListCache:
+    def __init__(self):
+        self.items = []
+
+    def list_push(self, key, value):
+        self.items.append(value)
+        return len(self.items)
+
+    def list_push_front(self, key, values):
+        self.items[:0] = values
+        return len(self.items)
+
+    def list_pop_many(self, key, count):
+        ret, self.items = self.items[:count], self.items[count:]
+        return ret
+
+
+@override_settings(LOG_WRITER_SYNC=False)
+class TestLogWriter(TacticalTestCase):
+    def setUp(self):
+        self.setup_coresettings()
+        self.cache = FakeListCache()
+        patcher = patch("logs.writer.cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_queue_and_flush(self):
+        from .models import AuditLog, DebugLog
+        from .writer import flush_log_queue
+
+        agent = baker.make_recipe("agents.agent")
+        AuditLog.audit_user_failed_login("bob" * 80)
+        DebugLog.error("queued", agent=agent)
+        self.assertEqual(len(self.cache.items), 2)
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertFalse(DebugLog.objects.exists())
+
+        # an insert per model plus the agent lookup for DebugLog, inside a
+        # savepoint
+        with self.assertNumQueries(5):
+            self.assertEqual(flush_log_queue(), 2)
+
+        entry = AuditLog.objects.get()
+        self.assertEqual(len(entry.message), 255)
+        self.assertEqual(DebugLog.objects.get().agent, agent)
+        self.assertEqual(flush_log_queue(), 0)
+
+    @patch("logs.writer.LOG_WRITER_BATCH_SIZE", 3)
+    def test_flush_when_batch_is_full(self):
+        from .models import DebugLog
+
+        for i in range(3):
+            DebugLog.critical(f"message {i}")
+
+        self.assertEqual(self.cache.items, [])
+        self.assertEqual(DebugLog.objects.count(), 3)
+
+    def test_rows_for_deleted_agents_are_skipped(self):
+        from .models import DebugLog
+        from .writer import flush_log_queue
+
+        agent = baker.make_recipe("agents.agent")
+        DebugLog.error("gone", agent=agent)
+        DebugLog.error("kept")
+        agent.delete()
+
+        self.assertEqual(flush_log_queue(), 1)
+        self.assertEqual(DebugLog.objects.get().message, "kept")
+
+    def test_write_immediately_without_queue(self):
+        from .models import DebugLog
+
+        self.cache.list_push = lambda key, value: None
+        DebugLog.error("now")
+        self.assertEqual(DebugLog.objects.count(), 1)
+
+    def test_failed_batch_is_kept(self):
+        from django.db import OperationalError
+
+        from .models import DebugLog
+        from .writer import flush_log_queue
+
+        DebugLog.error("first")
+        DebugLog.error("second")
+        queued = list(self.cache.items)
+
+        with patch("logs.writer._insert", side_effect=OperationalError("db down")):
+            self.assertEqual(flush_log_queue(), 0)
+
+        self.assertEqual(self.cache.items, queued)
+        self.assertFalse(DebugLog.objects.exists())
+
+        self.assertEqual(flush_log_queue(), 2)
+        self.assertEqual(self.cache.items, [])
+        self.assertEqual(
+            list(DebugLog.objects.order_by("id").values_list("message", flat=True)),
+            ["first", "second"],
+        )
+
+    def test_bad_row_is_dropped_alone(self):
+        from .models import DebugLog
+        from .writer import flush_log_queue
+
+        DebugLog.error("kept")
+        DebugLog.error("x", log_type="not a real log type" * 20)
+        DebugLog.error("also kept")
+
+        self.assertEqual(flush_log_queue(), 2)
+        self.assertEqual(self.cache.items, [])
+        self.assertEqual(
+            set(DebugLog.objects.values_list("message", flat=True)),
+            {"kept", "also kept"},
+        )
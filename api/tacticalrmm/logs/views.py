@@ -1,19 +1,30 @@
 import asyncio
+import hashlib
 from datetime import datetime as dt
 
+from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone as djangotime
+from django.utils.dateparse import parse_datetime
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from agents.models import Agent
-from tacticalrmm.constants import AGENT_DEFER, PAAction
+from clients.serializers import SiteMinimumSerializer
+from tacticalrmm.constants import (
+    AGENT_DEFER,
+    AUDIT_LOG_COUNT_CACHE_PREFIX,
+    AUDIT_LOG_ESTIMATE_MIN,
+    PAAction,
+)
 from tacticalrmm.helpers import notify_error
+from tacticalrmm.pagination import KeysetPagination, estimated_count
 from tacticalrmm.permissions import _audit_log_filter, _has_perm_on_agent
+from tacticalrmm.routers import read_from_replica
 from tacticalrmm.utils import get_default_timezone
 
 from .models import AuditLog, DebugLog, PendingAction
@@ -21,20 +32,39 @@ from .permissions import AuditLogPerms, DebugLogPerms, PendingActionPerms
 from .serializers import AuditLogSerializer, DebugLogSerializer, PendingActionSerializer
 
 
+class AuditLogPagination(KeysetPagination):
+    ordering_fields = ("entry_time", "id")
+
+
 class GetAuditLogs(APIView):
     permission_classes = [IsAuthenticated, AuditLogPerms]
 
-    def patch(self, request):
-        from agents.models import Agent
-        from clients.models import Client
+    def get_total(self, request, audit_logs, filtered: bool) -> int:
+        # the planner estimate is close enough for the unfiltered table and
+        # avoids counting millions of rows
+        if not filtered:
+            estimate = estimated_count(AuditLog)
+            if estimate >= AUDIT_LOG_ESTIMATE_MIN:
+                return estimate
+
+        # totals are cached briefly per user and filter set so paging
+        # doesn't count the filtered rows on every request
+        params = sorted(
+            (k, str(v)) for k, v in request.data.items() if k != "pagination"
+        )
+        key = hashlib.md5(f"{request.user.pk}{params}".encode()).hexdigest()
+        cache_key = f"{AUDIT_LOG_COUNT_CACHE_PREFIX}{key}"
 
-        pagination = request.data["pagination"]
+        total = cache.get(cache_key)
+        if total is None:
+            total = audit_logs.count()
+            cache.set(cache_key, total, 60)
 
-        order_by = (
-            f"-{pagination['sortBy']}"
-            if pagination["descending"]
-            else f"{pagination['sortBy']}"
-        )
+        return total
+
+    @read_from_replica
+    def patch(self, request):
+        pagination = request.data["pagination"]
 
         agentFilter = Q()
         clientFilter = Q()
@@ -47,11 +77,12 @@ class GetAuditLogs(APIView):
             agentFilter = Q(agent_id__in=request.data["agentFilter"])
 
         elif "clientFilter" in request.data:
-            clients = Client.objects.filter(pk__in=request.data["clientFilter"])
-            agents = Agent.objects.filter(site__client__in=clients).values_list(
-                "agent_id"
-            )
-            clientFilter = Q(agent_id__in=agents)
+            # resolve to agent ids up front so the lookup can use the
+            # (agent_id, entry_time) index instead of joining a subquery
+            agents = Agent.objects.filter(
+                site__client_id__in=request.data["clientFilter"]
+            ).values_list("agent_id", flat=True)
+            clientFilter = Q(agent_id__in=list(agents))
 
         if "userFilter" in request.data:
             userFilter = Q(username__in=request.data["userFilter"])
@@ -69,26 +100,81 @@ class GetAuditLogs(APIView):
                 - djangotime.timedelta(days=request.data["timeFilter"]),
             )
 
-        audit_logs = (
-            AuditLog.objects.filter(agentFilter | clientFilter)
-            .filter(userFilter)
-            .filter(actionFilter)
-            .filter(objectFilter)
-            .filter(timeFilter)
-            .filter(_audit_log_filter(request.user))
-        ).order_by(order_by)
-
-        paginator = Paginator(audit_logs, pagination["rowsPerPage"])
-        ctx = {"default_tz": get_default_timezone()}
-
-        return Response(
-            {
-                "audit_logs": AuditLogSerializer(
-                    paginator.get_page(pagination["page"]), many=True, context=ctx
-                ).data,
-                "total": paginator.count,
-            }
+        filters = (
+            (agentFilter | clientFilter)
+            & userFilter
+            & actionFilter
+            & objectFilter
+            & timeFilter
+            & _audit_log_filter(request.user)
         )
+        audit_logs = AuditLog.objects.filter(filters)
+        total = self.get_total(request, audit_logs, filtered=bool(filters))
+
+        sort_by = pagination.get("sortBy") or "entry_time"
+        order_by = f"-{sort_by}" if pagination.get("descending") else sort_by
+
+        # keyset mode, used when the client sends a cursor (null for the
+        # first page). Pages cost the same wherever they are in the table.
+        next_cursor = None
+        if "cursor" in pagination:
+            paginator = AuditLogPagination()
+            start = pagination.get("startTime")
+            if start:
+                # jump straight to a point in time
+                start_time = parse_datetime(str(start))
+                if not start_time:
+                    return notify_error("Invalid startTime")
+
+                if djangotime.is_naive(start_time):
+                    start_time = djangotime.make_aware(start_time)
+
+                lookup = "lte" if order_by.startswith("-") else "gte"
+                audit_logs = audit_logs.filter(**{f"entry_time__{lookup}": start_time})
+
+            page = paginator.paginate(
+                audit_logs,
+                ordering=(
+                    order_by
+                    if order_by.lstrip("-") in paginator.ordering_fields
+                    else "-entry_time"
+                ),
+                cursor=pagination["cursor"],
+                page_size=min(
+                    max(int(pagination.get("rowsPerPage") or 0), 1),
+                    paginator.max_page_size,
+                ),
+            )
+            next_cursor = paginator.next
+        else:
+            paginator = Paginator(
+                audit_logs.order_by(
+                    order_by, "-pk" if order_by.startswith("-") else "pk"
+                ),
+                pagination["rowsPerPage"],
+            )
+            paginator.count = total
+            page = paginator.get_page(pagination["page"])
+
+        # look up the sites of the agents on this page in one query
+        sites = {
+            agent.agent_id: SiteMinimumSerializer(agent.site).data
+            for agent in Agent.objects.filter(
+                agent_id__in={i.agent_id for i in page if i.agent_id}
+            )
+            .defer(*AGENT_DEFER)
+            .select_related("site__client")
+        }
+        ctx = {"default_tz": get_default_timezone(), "sites": sites}
+
+        ret = {
+            "audit_logs": AuditLogSerializer(page, many=True, context=ctx).data,
+            "total": total,
+        }
+        if "cursor" in pagination:
+            ret["next"] = next_cursor
+
+        return Response(ret)
 
 
 class PendingActions(APIView):
@@ -100,19 +186,15 @@ class PendingActions(APIView):
                 Agent.objects.defer(*AGENT_DEFER).prefetch_related("pendingactions"),
                 agent_id=agent_id,
             )
-            actions = (
-                PendingAction.objects.filter(agent=agent)
-                .select_related("agent__site", "agent__site__client")
-                .defer("agent__services", "agent__wmi_detail")
+            actions = PendingAction.objects.filter(agent=agent).select_related(
+                "agent__site", "agent__site__client"
             )
         else:
-            actions = (
-                PendingAction.objects.filter_by_role(request.user)  # type: ignore
-                .select_related(
-                    "agent__site",
-                    "agent__site__client",
-                )
-                .defer("agent__services", "agent__wmi_detail")
+            actions = PendingAction.objects.filter_by_role(
+                request.user
+            ).select_related(  # type: ignore
+                "agent__site",
+                "agent__site__client",
             )
 
         return Response(PendingActionSerializer(actions, many=True).data)
@@ -139,6 +221,7 @@ class PendingActions(APIView):
 class GetDebugLog(APIView):
     permission_classes = [IsAuthenticated, DebugLogPerms]
 
+    @read_from_replica
     def patch(self, request):
         agentFilter = Q()
         logTypeFilter = Q()
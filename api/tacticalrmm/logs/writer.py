@@ -0,0 +1,125 @@
+"""
+Batched writer for AuditLog and DebugLog rows.
+
+Entries are pickled onto a redis list and inserted with bulk_create, either
+inline once the list reaches LOG_WRITER_BATCH_SIZE or by the periodic
+flush_log_queue_task. Set LOG_WRITER_SYNC to insert each entry immediately,
+which is what the tests use. A batch that can't be inserted is put back at
+the head of the queue for the next flush.
+"""
+
+import pickle
+from collections import defaultdict
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError, transaction
+from django.utils import timezone as djangotime
+
+from tacticalrmm.constants import LOG_WRITER_BATCH_SIZE, LOG_WRITER_QUEUE_KEY
+from tacticalrmm.logger import logger
+
+if TYPE_CHECKING:
+    from django.db.models import Model
+
+
+def queue_log(model: "type[Model]", **fields: Any) -> None:
+    if getattr(settings, "LOG_WRITER_SYNC", False):
+        model.objects.create(**fields)
+        return
+
+    # stamp now, the row is inserted later
+    fields.setdefault("entry_time", djangotime.now())
+
+    length: Optional[int] = None
+    with suppress(Exception):
+        length = cache.list_push(
+            LOG_WRITER_QUEUE_KEY, pickle.dumps((model._meta.label, fields))
+        )
+
+    if length is None:
+        # no queue available, don't drop the entry
+        model.objects.create(**fields)
+    elif length >= LOG_WRITER_BATCH_SIZE:
+        flush_log_queue()
+
+
+def _insert(model: "type[Model]", rows: "list[dict[str, Any]]") -> int:
+    # drop rows pointing at objects deleted since they were queued, e.g. a
+    # DebugLog for an agent that was removed, so the batch doesn't fail
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+
+        ids = {row[field.attname] for row in rows if row.get(field.attname)}
+        if ids:
+            existing = set(
+                field.related_model.objects.filter(pk__in=ids).values_list(
+                    "pk", flat=True
+                )
+            )
+            rows = [
+                row
+                for row in rows
+                if not row.get(field.attname) or row[field.attname] in existing
+            ]
+
+    model.objects.bulk_create([model(**row) for row in rows])
+    return len(rows)
+
+
+def _insert_batch(items: list[bytes]) -> int:
+    rows: "defaultdict[str, list[dict[str, Any]]]" = defaultdict(list)
+    for item in items:
+        label, fields = pickle.loads(item)
+        rows[label].append(fields)
+
+    # all or nothing, so a batch that is put back isn't partly inserted
+    with transaction.atomic():
+        return sum(
+            _insert(apps.get_model(label), model_rows)
+            for label, model_rows in rows.items()
+        )
+
+
+def _requeue(items: list[bytes], error: Exception) -> None:
+    logger.error(
+        f"Unable to write {len(items)} queued log entries, will retry: {error}"
+    )
+    cache.list_push_front(LOG_WRITER_QUEUE_KEY, items)
+
+
+def flush_log_queue(max_batches: int = 20) -> int:
+    inserted = 0
+    for _ in range(max_batches):
+        items = cache.list_pop_many(LOG_WRITER_QUEUE_KEY, LOG_WRITER_BATCH_SIZE)
+        if not items:
+            break
+
+        try:
+            inserted += _insert_batch(items)
+        except (OperationalError, InterfaceError) as e:
+            # db is unavailable, keep the entries for the next flush
+            _requeue(items, e)
+            break
+        except Exception:
+            # one bad row shouldn't hold up the queue, retry the batch row by
+            # row and drop only the rows that fail
+            for i, item in enumerate(items):
+                try:
+                    inserted += _insert_batch([item])
+                except (OperationalError, InterfaceError) as e:
+                    _requeue(items[i:], e)
+                    return inserted
+                except Exception as e:
+                    logger.error(
+                        f"Dropping queued log entry that can't be written: {e}"
+                    )
+
+        if len(items) < LOG_WRITER_BATCH_SIZE:
+            break
+
+    return inserted
@@ -0,0 +1,135 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# diffs the services json reported by an agent into services_agentservice.
+# unchanged rows are left alone so only real state changes cause writes
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION services_agentservice_sync(target integer, svcs jsonb) RETURNS void AS $$
+BEGIN
+    IF svcs IS NULL OR jsonb_typeof(svcs) <> 'array' THEN
+        DELETE FROM services_agentservice WHERE agent_id = target;
+        RETURN;
+    END IF;
+
+    DELETE FROM services_agentservice s
+    WHERE s.agent_id = target
+        AND NOT EXISTS (
+            SELECT 1 FROM jsonb_array_elements(svcs) e
+            WHERE jsonb_typeof(e) = 'object' AND left(e->>'name', 255) = s.name
+        );
+
+    INSERT INTO services_agentservice
+        (agent_id, name, display_name, status, start_type, username, pid)
+    SELECT DISTINCT ON (left(e->>'name', 255))
+        target,
+        left(e->>'name', 255),
+        coalesce(e->>'display_name', ''),
+        left(coalesce(e->>'status', ''), 255),
+        left(coalesce(e->>'start_type', ''), 255),
+        coalesce(e->>'username', ''),
+        CASE
+            WHEN jsonb_typeof(e->'pid') = 'number'
+                AND (e->>'pid')::numeric BETWEEN 0 AND 2147483647
+            THEN (e->>'pid')::numeric::integer
+        END
+    FROM jsonb_array_elements(svcs) e
+    WHERE jsonb_typeof(e) = 'object' AND coalesce(e->>'name', '') <> ''
+    ON CONFLICT (agent_id, name) DO UPDATE SET
+        display_name = EXCLUDED.display_name,
+        status = EXCLUDED.status,
+        start_type = EXCLUDED.start_type,
+        username = EXCLUDED.username,
+        pid = EXCLUDED.pid
+    WHERE (
+        services_agentservice.display_name,
+        services_agentservice.status,
+        services_agentservice.start_type,
+        services_agentservice.username,
+        services_agentservice.pid
+    ) IS DISTINCT FROM (
+        EXCLUDED.display_name,
+        EXCLUDED.status,
+        EXCLUDED.start_type,
+        EXCLUDED.username,
+        EXCLUDED.pid
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION services_agentservice_trigger() RETURNS trigger AS $$
+BEGIN
+    PERFORM services_agentservice_sync(NEW.agent_id, NEW.services);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER agents_agentinventory_services_insert
+    AFTER INSERT ON agents_agentinventory
+    FOR EACH ROW EXECUTE FUNCTION services_agentservice_trigger();
+
+CREATE TRIGGER agents_agentinventory_services_update
+    AFTER UPDATE ON agents_agentinventory
+    FOR EACH ROW WHEN (OLD.services IS DISTINCT FROM NEW.services)
+    EXECUTE FUNCTION services_agentservice_trigger();
+
+SELECT services_agentservice_sync(agent_id, services) FROM agents_agentinventory;
+"""
+
+DROP_FUNCTION = """
+DROP TRIGGER IF EXISTS agents_agentinventory_services_insert ON agents_agentinventory;
+DROP TRIGGER IF EXISTS agents_agentinventory_services_update ON agents_agentinventory;
+DROP FUNCTION IF EXISTS services_agentservice_trigger();
+DROP FUNCTION IF EXISTS services_agentservice_sync(integer, jsonb);
+"""
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("agents", "0063_agent_table_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentService",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=255)),
+                ("display_name", models.TextField(blank=True, default="")),
+                ("status", models.CharField(blank=True, default="", max_length=255)),
+                (
+                    "start_type",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("username", models.TextField(blank=True, default="")),
+                ("pid", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "agent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="winservices",
+                        to="agents.agent",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["name", "status"], name="services_ag_name_8c78a0_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="agentservice",
+            constraint=models.UniqueConstraint(
+                fields=("agent", "name"), name="unique_agent_service"
+            ),
+        ),
+        migrations.RunSQL(sql=SYNC_FUNCTION, reverse_sql=DROP_FUNCTION),
+    ]
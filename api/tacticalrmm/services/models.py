@@ -0,0 +1,34 @@
+from django.db import models
+
+from agents.models import Agent
+from tacticalrmm.models import PermissionQuerySet
+
+
+class AgentService(models.Model):
+    # one row per windows service per agent, kept in sync with the services
+    # json on agents_agentinventory by a database trigger (see migration 0001)
+    objects = PermissionQuerySet.as_manager()
+
+    id = models.BigAutoField(primary_key=True)
+    agent = models.ForeignKey(
+        Agent, related_name="winservices", on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255)
+    display_name = models.TextField(blank=True, default="")
+    status = models.CharField(max_length=255, blank=True, default="")
+    start_type = models.CharField(max_length=255, blank=True, default="")
+    username = models.TextField(blank=True, default="")
+    pid = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["agent", "name"], name="unique_agent_service"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["name", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.agent.hostname} - {self.name}"
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+
+from .models import AgentService
+
+
+class AgentServiceSerializer(serializers.ModelSerializer):
+    agent_id = serializers.ReadOnlyField(source="agent.agent_id")
+    hostname = serializers.ReadOnlyField(source="agent.hostname")
+    client = serializers.ReadOnlyField(source="agent.client.name")
+    site = serializers.ReadOnlyField(source="agent.site.name")
+
+    class Meta:
+        model = AgentService
+        fields = (
+            "agent_id",
+            "hostname",
+            "client",
+            "site",
+            "name",
+            "display_name",
+            "status",
+            "start_type",
+            "username",
+            "pid",
+        )
@@ -3,8 +3,11 @@ from unittest.mock import patch
 from model_bakery import baker
 
 from agents.models import Agent
+from tacticalrmm.constants import AgentMonType
 from tacticalrmm.test import TacticalTestCase
 
+from .models import AgentService
+
 base_url = "/services"
 
 
@@ -191,6 +194,80 @@ class TestServiceViews(TacticalTestCase):
         self.check_not_authenticated("put", url)
 
 
+class TestAgentServiceIndex(TacticalTestCase):
+    def setUp(self):
+        self.authenticate()
+        self.setup_coresettings()
+
+    def test_services_synced_from_inventory(self):
+        agent = baker.make_recipe("agents.agent_with_services")
+        services = AgentService.objects.filter(agent=agent).order_by("name")
+        self.assertEqual(
+            list(services.values_list("name", "status", "start_type", "pid")),
+            [
+                ("ALG", "stopped", "manual", 812),
+                ("AeLookupSvc", "stopped", "manual", 880),
+            ],
+        )
+
+        ids = dict(services.values_list("name", "id"))
+        new_services = [dict(i) for i in agent.services]
+        new_services[0]["status"] = "running"
+        del new_services[1]
+        new_services.append({"name": "wuauserv", "status": "running", "pid": None})
+        agent.services = new_services
+        agent.save()
+
+        self.assertEqual(
+            list(services.values_list("name", "status")),
+            [("AeLookupSvc", "running"), ("wuauserv", "running")],
+        )
+        # rows are updated in place, not recreated
+        self.assertEqual(services.get(name="AeLookupSvc").pk, ids["AeLookupSvc"])
+
+        agent.services = None
+        agent.save()
+        self.assertFalse(services.exists())
+
+    def test_get_fleet_services(self):
+        url = f"{base_url}/"
+        servers = baker.make_recipe(
+            "agents.agent_with_services",
+            monitoring_type=AgentMonType.SERVER,
+            _quantity=3,
+        )
+        baker.make_recipe(
+            "agents.agent_with_services", monitoring_type=AgentMonType.WORKSTATION
+        )
+        servers[0].services = [{"name": "ALG", "status": "running"}]
+        servers[0].save()
+
+        r = self.client.get(url, {"name": "ALG"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data), 4)
+
+        r = self.client.get(
+            url,
+            {
+                "name": "ALG",
+                "status": "stopped",
+                "monitoring_type": AgentMonType.SERVER,
+            },
+        )
+        self.assertEqual(
+            {i["agent_id"] for i in r.data},
+            {servers[1].agent_id, servers[2].agent_id},
+        )
+
+        r = self.client.get(url, {"name": "ALG", "monitoring_type": "blah"})
+        self.assertEqual(r.status_code, 400)
+
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 400)
+
+        self.check_not_authenticated("get", url)
+
+
 class TestServicePermissions(TacticalTestCase):
     def setUp(self):
         self.setup_coresettings()
@@ -231,3 +308,23 @@ class TestServicePermissions(TacticalTestCase):
             user.role.can_view_clients.set([unauthorized_agent.client])
 
             self.client.logout()
+
+    def test_fleet_services_permissions(self):
+        agent = baker.make_recipe("agents.agent_with_services")
+        unauthorized_agent = baker.make_recipe("agents.agent_with_services")  # noqa
+        url = f"{base_url}/?name=ALG"
+
+        self.check_authorized_superuser("get", url)
+
+        user = self.create_user_with_roles([])
+        self.client.force_authenticate(user=user)
+        self.check_not_authorized("get", url)
+
+        user.role.can_manage_winsvcs = True
+        user.role.save()
+        r = self.check_authorized("get", url)
+        self.assertEqual(len(r.data), 2)
+
+        user.role.can_view_clients.set([agent.client])
+        r = self.check_authorized("get", url)
+        self.assertEqual([i["agent_id"] for i in r.data], [agent.agent_id])
@@ -8,9 +8,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from agents.models import Agent
+from tacticalrmm.constants import AgentMonType
 from tacticalrmm.helpers import notify_error
 
+from .models import AgentService
 from .permissions import WinSvcsPerms
+from .serializers import AgentServiceSerializer
 
 
 def process_nats_response(data: Union[str, Dict]) -> Tuple[bool, bool, str]:
@@ -29,6 +32,35 @@ def process_nats_response(data: Union[str, Dict]) -> Tuple[bool, bool, str]:
     return success, natserror, errormsg
 
 
+class GetFleetServices(APIView):
+    permission_classes = [IsAuthenticated, WinSvcsPerms]
+
+    # which agents have a given service, optionally in a given state
+    def get(self, request):
+        name = request.query_params.get("name", "")
+        if not name:
+            return notify_error("A service name is required")
+
+        services = AgentService.objects.filter_by_role(request.user).filter(  # type: ignore
+            name=name
+        )
+        for field in ("status", "start_type"):
+            if field in request.query_params:
+                services = services.filter(**{field: request.query_params[field]})
+
+        monitoring_type = request.query_params.get("monitoring_type", None)
+        if monitoring_type:
+            if monitoring_type not in AgentMonType.values:
+                return notify_error("monitoring type does not exist")
+
+            services = services.filter(agent__monitoring_type=monitoring_type)
+
+        services = services.select_related("agent__site__client").order_by(
+            "agent__hostname"
+        )
+        return Response(AgentServiceSerializer(services, many=True).data)
+
+
 class GetServices(APIView):
     permission_classes = [IsAuthenticated, WinSvcsPerms]
 
@@ -45,7 +77,7 @@ class GetServices(APIView):
             return notify_error("Unable to contact the agent")
 
         agent.services = r
-        agent.save(update_fields=["services"])
+        agent.save_inventory()
         return Response(agent.services)
 
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ChocoSoftware, InstalledSoftware
+from .models import AgentSoftware, ChocoSoftware, InstalledSoftware, SoftwareCatalog
 
 
 class ChocoAdmin(admin.ModelAdmin):
@@ -9,3 +9,5 @@ class ChocoAdmin(admin.ModelAdmin):
 
 admin.site.register(ChocoSoftware, ChocoAdmin)
 admin.site.register(InstalledSoftware)
+admin.site.register(SoftwareCatalog)
+admin.site.register(AgentSoftware)
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 
-from software.models import InstalledSoftware
+from software.models import AgentSoftware
 
 
 class Command(BaseCommand):
@@ -10,17 +10,18 @@ class Command(BaseCommand):
         parser.add_argument("name", type=str)
 
     def handle(self, *args, **kwargs):
-        search = kwargs["name"].lower()
+        search = kwargs["name"]
 
-        all_sw = InstalledSoftware.objects.select_related(
-            "agent", "agent__site", "agent__site__client"
+        installs = (
+            AgentSoftware.objects.filter(software__name__icontains=search)
+            .select_related("agent__site__client", "software")
+            .order_by("agent_id")
+            .distinct("agent_id")
         )
-        for instance in all_sw.iterator(chunk_size=20):
-            for sw in instance.software:
-                if search in sw["name"].lower():
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Found {sw['name']} installed on: {instance.agent.client.name}\\{instance.agent.site.name}\\{instance.agent.hostname}"
-                        )
-                    )
-                    break
+        for install in installs.iterator(chunk_size=500):
+            agent = install.agent
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Found {install.software.name} installed on: {agent.client.name}\\{agent.site.name}\\{agent.hostname}"
+                )
+            )
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+DETAIL_FIELDS = ("install_date", "size", "source", "location", "uninstall")
+
+
+def populate_software_catalog(apps, schema_editor):
+    InstalledSoftware = apps.get_model("software", "InstalledSoftware")
+    SoftwareCatalog = apps.get_model("software", "SoftwareCatalog")
+    AgentSoftware = apps.get_model("software", "AgentSoftware")
+
+    catalog = {}
+    for installed in InstalledSoftware.objects.iterator(chunk_size=100):
+        if not isinstance(installed.software, list):
+            continue
+
+        links = {}
+        for sw in installed.software:
+            if not isinstance(sw, dict):
+                continue
+
+            key = (
+                str(sw.get("name") or ""),
+                str(sw.get("version") or ""),
+                str(sw.get("publisher") or ""),
+            )
+            if not key[0] or key in links:
+                continue
+
+            if key not in catalog:
+                catalog[key] = SoftwareCatalog.objects.create(
+                    name=key[0], version=key[1], publisher=key[2]
+                ).pk
+
+            links[key] = AgentSoftware(
+                agent_id=installed.agent_id,
+                software_id=catalog[key],
+                **{f: str(sw.get(f) or "") for f in DETAIL_FIELDS},
+            )
+
+        AgentSoftware.objects.bulk_create(links.values(), ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("software", "0004_alter_installedsoftware_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentSoftware",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("install_date", models.TextField(blank=True, default="")),
+                ("size", models.TextField(blank=True, default="")),
+                ("source", models.TextField(blank=True, default="")),
+                ("location", models.TextField(blank=True, default="")),
+                ("uninstall", models.TextField(blank=True, default="")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SoftwareCatalog",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("name", models.TextField()),
+                ("version", models.TextField(blank=True, default="")),
+                ("publisher", models.TextField(blank=True, default="")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="softwarecatalog",
+            constraint=models.UniqueConstraint(
+                fields=("name", "version", "publisher"), name="unique_software_catalog"
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentsoftware",
+            name="agent",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="software",
+                to="agents.agent",
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentsoftware",
+            name="software",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="installs",
+                to="software.softwarecatalog",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="agentsoftware",
+            constraint=models.UniqueConstraint(
+                fields=("agent", "software"), name="unique_agent_software"
+            ),
+        ),
+        migrations.RunPython(populate_software_catalog, migrations.RunPython.noop),
+    ]
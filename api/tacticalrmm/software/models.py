@@ -21,3 +21,49 @@ class InstalledSoftware(models.Model):
 
     def __str__(self):
         return self.agent.hostname
+
+
+class SoftwareCatalog(models.Model):
+    # one row per distinct name/version/publisher seen across the fleet
+    objects = PermissionQuerySet.as_manager()
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.TextField()
+    version = models.TextField(blank=True, default="")
+    publisher = models.TextField(blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "version", "publisher"],
+                name="unique_software_catalog",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} {self.version}"
+
+
+class AgentSoftware(models.Model):
+    objects = PermissionQuerySet.as_manager()
+
+    id = models.BigAutoField(primary_key=True)
+    agent = models.ForeignKey(Agent, related_name="software", on_delete=models.CASCADE)
+    software = models.ForeignKey(
+        SoftwareCatalog, related_name="installs", on_delete=models.CASCADE
+    )
+    install_date = models.TextField(blank=True, default="")
+    size = models.TextField(blank=True, default="")
+    source = models.TextField(blank=True, default="")
+    location = models.TextField(blank=True, default="")
+    uninstall = models.TextField(blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["agent", "software"], name="unique_agent_software"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.agent.hostname} - {self.software}"
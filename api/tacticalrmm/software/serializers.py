@@ -1,9 +1,42 @@
 from rest_framework import serializers
 
-from .models import InstalledSoftware
+from .models import AgentSoftware, InstalledSoftware, SoftwareCatalog
 
 
 class InstalledSoftwareSerializer(serializers.ModelSerializer):
     class Meta:
         model = InstalledSoftware
         fields = "__all__"
+
+
+class SoftwareCatalogSerializer(serializers.ModelSerializer):
+    agent_count = serializers.ReadOnlyField()
+
+    class Meta:
+        model = SoftwareCatalog
+        fields = ("id", "name", "version", "publisher", "agent_count")
+
+
+class AgentSoftwareSerializer(serializers.ModelSerializer):
+    agent_id = serializers.ReadOnlyField(source="agent.agent_id")
+    hostname = serializers.ReadOnlyField(source="agent.hostname")
+    client = serializers.ReadOnlyField(source="agent.client.name")
+    site = serializers.ReadOnlyField(source="agent.site.name")
+    name = serializers.ReadOnlyField(source="software.name")
+    version = serializers.ReadOnlyField(source="software.version")
+    publisher = serializers.ReadOnlyField(source="software.publisher")
+
+    class Meta:
+        model = AgentSoftware
+        fields = (
+            "agent_id",
+            "hostname",
+            "client",
+            "site",
+            "name",
+            "version",
+            "publisher",
+            "install_date",
+            "size",
+            "location",
+        )
@@ -3,12 +3,15 @@ import os
 from unittest.mock import patch
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from model_bakery import baker
 
 from tacticalrmm.test import TacticalTestCase
 
-from .models import ChocoSoftware
+from .models import AgentSoftware, ChocoSoftware, InstalledSoftware, SoftwareCatalog
 from .serializers import InstalledSoftwareSerializer
+from .utils import sync_agent_software
 
 base_url = "/software"
 
@@ -136,6 +139,138 @@ class TestSoftwareViews(TacticalTestCase):
         self.check_not_authenticated("put", url)
 
 
+class TestSoftwareCatalog(TacticalTestCase):
+    def setUp(self):
+        self.authenticate()
+        self.setup_coresettings()
+        with open(
+            os.path.join(settings.BASE_DIR, "tacticalrmm/test_data/software1.json")
+        ) as f:
+            self.sw = json.load(f)
+
+    def test_sync_agent_software(self):
+        agent = baker.make_recipe("agents.agent")
+        other_agent = baker.make_recipe("agents.agent")
+
+        sync_agent_software(agent, self.sw)
+        self.assertEqual(InstalledSoftware.objects.get(agent=agent).software, self.sw)
+        count = AgentSoftware.objects.filter(agent=agent).count()
+        self.assertEqual(
+            count, len({(i["name"], i["version"], i["publisher"]) for i in self.sw})
+        )
+        self.assertEqual(SoftwareCatalog.objects.count(), count)
+
+        # catalog entries are shared between agents
+        sync_agent_software(other_agent, self.sw[:10])
+        self.assertEqual(SoftwareCatalog.objects.count(), count)
+
+        # unchanged list does not write anything
+        with self.assertNumQueries(2):
+            sync_agent_software(other_agent, self.sw[:10])
+
+        # upgraded, removed and changed software
+        new_list = [dict(i) for i in self.sw[:10]]
+        new_list[0]["version"] = "99.0"
+        new_list[1]["size"] = "1 TB"
+        del new_list[2]
+        sync_agent_software(other_agent, new_list)
+
+        installs = AgentSoftware.objects.filter(agent=other_agent).select_related(
+            "software"
+        )
+        self.assertEqual(installs.count(), 9)
+        self.assertTrue(
+            installs.filter(
+                software__name=new_list[0]["name"], software__version="99.0"
+            ).exists()
+        )
+        self.assertEqual(installs.get(software__name=new_list[1]["name"]).size, "1 TB")
+        self.assertFalse(installs.filter(software__name=self.sw[2]["name"]).exists())
+        # first agent is untouched
+        self.assertEqual(AgentSoftware.objects.filter(agent=agent).count(), count)
+
+    def test_sync_agent_software_races_orphan_prune(self):
+        from . import utils
+
+        agent = baker.make_recipe("agents.agent")
+        sw = {"name": "orphan", "version": "1", "publisher": "x"}
+        baker.make(SoftwareCatalog, **sw)
+        create = utils._create_catalog_rows
+        calls = []
+
+        def create_then_prune(keys):
+            create(keys)
+            if not calls:
+                # the prune removed the existing row after the insert skipped it
+                SoftwareCatalog.objects.filter(name="orphan").delete()
+            calls.append(keys)
+
+        with patch.object(utils, "_create_catalog_rows", create_then_prune):
+            with CaptureQueriesContext(connection) as ctx:
+                sync_agent_software(agent, [sw])
+
+        self.assertEqual(len(calls), 2)
+        link = AgentSoftware.objects.select_related("software").get(agent=agent)
+        self.assertEqual(link.software.name, "orphan")
+        self.assertTrue(any("FOR KEY SHARE" in q["sql"] for q in ctx.captured_queries))
+
+    def test_get_software_catalog(self):
+        url = f"{base_url}/catalog/"
+        agents = baker.make_recipe("agents.agent", _quantity=3)
+        for agent in agents:
+            sync_agent_software(agent, self.sw)
+
+        upgraded = [dict(i) for i in self.sw]
+        upgraded[0]["version"] = "99.0"
+        sync_agent_software(agents[0], upgraded)
+
+        r = self.client.get(url, {"name": self.sw[0]["name"][:4].lower()})
+        self.assertEqual(r.status_code, 200)
+        versions = {
+            i["version"]: i["agent_count"]
+            for i in r.data
+            if i["name"] == self.sw[0]["name"]
+        }
+        self.assertEqual(versions, {self.sw[0]["version"]: 2, "99.0": 1})
+
+        r = self.client.get(
+            f"{base_url}/catalog/agents/",
+            {"name": self.sw[0]["name"], "version": "99.0"},
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([i["agent_id"] for i in r.data], [agents[0].agent_id])
+
+        r = self.client.get(f"{base_url}/catalog/agents/", {"name": self.sw[0]["name"]})
+        self.assertEqual(len(r.data), 3)
+
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 400)
+
+        self.check_not_authenticated("get", url)
+
+    def test_get_software_catalog_permissions(self):
+        agent = baker.make_recipe("agents.agent")
+        unauthorized_agent = baker.make_recipe("agents.agent")
+        sync_agent_software(agent, self.sw[:5])
+        sync_agent_software(unauthorized_agent, self.sw[:5])
+        name = self.sw[0]["name"]
+
+        user = self.create_user_with_roles(["can_list_software"])
+        self.client.force_authenticate(user=user)
+        user.role.can_view_clients.set([agent.client])
+
+        r = self.client.get(f"{base_url}/catalog/", {"name": name})
+        self.assertEqual(r.data[0]["agent_count"], 1)
+
+        r = self.client.get(f"{base_url}/catalog/agents/", {"name": name})
+        self.assertEqual([i["agent_id"] for i in r.data], [agent.agent_id])
+
+        user.role.can_list_software = False
+        user.role.save()
+        r = self.client.get(f"{base_url}/catalog/agents/", {"name": name})
+        self.assertEqual(r.status_code, 403)
+
+
 class TestSoftwarePermissions(TacticalTestCase):
     def setUp(self):
         self.setup_coresettings()
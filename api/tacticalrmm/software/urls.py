@@ -4,6 +4,8 @@ from . import views
 
 urlpatterns = [
     path("chocos/", views.chocos),
+    path("catalog/", views.GetSoftwareCatalog.as_view()),
+    path("catalog/agents/", views.GetSoftwareAgents.as_view()),
     path("", views.GetSoftware.as_view()),
     path("<agent:agent_id>/", views.GetSoftware.as_view()),
 ]
@@ -0,0 +1,117 @@
+from typing import TYPE_CHECKING, Any
+
+from django.db import transaction
+
+from .models import AgentSoftware, InstalledSoftware, SoftwareCatalog
+
+if TYPE_CHECKING:
+    from agents.models import Agent
+
+SOFTWARE_DETAIL_FIELDS = ("install_date", "size", "source", "location", "uninstall")
+
+
+def _software_key(sw: "dict[str, Any]") -> "tuple[str, str, str]":
+    return (
+        str(sw.get("name") or ""),
+        str(sw.get("version") or ""),
+        str(sw.get("publisher") or ""),
+    )
+
+
+def _create_catalog_rows(keys: "list[tuple[str, str, str]]") -> None:
+    SoftwareCatalog.objects.bulk_create(
+        [
+            SoftwareCatalog(name=name, version=version, publisher=publisher)
+            for name, version, publisher in keys
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _lock_catalog_rows(
+    keys: "list[tuple[str, str, str]]",
+) -> "dict[tuple[str, str, str], int]":
+    # FOR KEY SHARE keeps the orphan prune (core.tasks) from deleting a row
+    # until the links to it are committed, without blocking other agents
+    rows = SoftwareCatalog.objects.raw(
+        f"SELECT id, name, version, publisher FROM {SoftwareCatalog._meta.db_table} "
+        "WHERE name = ANY(%s) FOR KEY SHARE",
+        [list({key[0] for key in keys})],
+    )
+    return {(i.name, i.version, i.publisher): i.pk for i in rows}
+
+
+def sync_agent_software(agent: "Agent", software: "list[dict[str, Any]]") -> None:
+    """
+    Stores the software list reported by an agent. The raw list is kept on
+    InstalledSoftware for the per agent api, and the normalized catalog/link
+    tables are updated by diffing against what is already stored, so an
+    unchanged list results in no writes at all.
+    """
+    s = agent.installedsoftware_set.first()  # type: ignore
+    if s is None:
+        InstalledSoftware(agent=agent, software=software).save()
+    elif s.software != software:
+        s.software = software
+        s.save(update_fields=["software"])
+
+    incoming: "dict[tuple[str, str, str], dict[str, Any]]" = {}
+    for sw in software if isinstance(software, list) else []:
+        if not isinstance(sw, dict):
+            continue
+
+        key = _software_key(sw)
+        if key[0] and key not in incoming:
+            incoming[key] = sw
+
+    current = {
+        (i.software.name, i.software.version, i.software.publisher): i
+        for i in AgentSoftware.objects.filter(agent=agent).select_related("software")
+    }
+
+    removed = [i.pk for key, i in current.items() if key not in incoming]
+    added = [key for key in incoming if key not in current]
+    changed = []
+    for key, link in current.items():
+        if key not in incoming:
+            continue
+
+        details = {f: str(incoming[key].get(f) or "") for f in SOFTWARE_DETAIL_FIELDS}
+        if any(getattr(link, f) != v for f, v in details.items()):
+            for f, v in details.items():
+                setattr(link, f, v)
+            changed.append(link)
+
+    if not (removed or changed or added):
+        return
+
+    with transaction.atomic():
+        if removed:
+            AgentSoftware.objects.filter(pk__in=removed).delete()
+
+        if changed:
+            AgentSoftware.objects.bulk_update(changed, fields=SOFTWARE_DETAIL_FIELDS)
+
+        if added:
+            _create_catalog_rows(added)
+            catalog = _lock_catalog_rows(added)
+            missing = [key for key in added if key not in catalog]
+            if missing:
+                # removed by the orphan prune between the insert and the lock,
+                # rows created by this transaction can't be
+                _create_catalog_rows(missing)
+                catalog.update(_lock_catalog_rows(missing))
+            AgentSoftware.objects.bulk_create(
+                [
+                    AgentSoftware(
+                        agent=agent,
+                        software_id=catalog[key],
+                        **{
+                            f: str(incoming[key].get(f) or "")
+                            for f in SOFTWARE_DETAIL_FIELDS
+                        },
+                    )
+                    for key in added
+                ],
+                ignore_conflicts=True,
+            )
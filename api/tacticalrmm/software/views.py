@@ -1,6 +1,7 @@
 import asyncio
 from typing import Any
 
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view
 from rest_framework.permissions import IsAuthenticated
@@ -12,9 +13,14 @@ from logs.models import PendingAction
 from tacticalrmm.constants import PAAction
 from tacticalrmm.helpers import notify_error
 
-from .models import ChocoSoftware, InstalledSoftware
+from .models import AgentSoftware, ChocoSoftware, InstalledSoftware, SoftwareCatalog
 from .permissions import SoftwarePerms
-from .serializers import InstalledSoftwareSerializer
+from .serializers import (
+    AgentSoftwareSerializer,
+    InstalledSoftwareSerializer,
+    SoftwareCatalogSerializer,
+)
+from .utils import sync_agent_software
 
 
 @api_view(["GET"])
@@ -82,11 +88,52 @@ class GetSoftware(APIView):
         if r in ("timeout", "natsdown"):
             return notify_error("Unable to contact the agent")
 
-        if not InstalledSoftware.objects.filter(agent=agent).exists():
-            InstalledSoftware(agent=agent, software=r).save()
-        else:
-            s = agent.installedsoftware_set.first()  # type: ignore
-            s.software = r
-            s.save(update_fields=["software"])
-
+        sync_agent_software(agent, r)
         return Response("ok")
+
+
+class GetSoftwareCatalog(APIView):
+    permission_classes = [IsAuthenticated, SoftwarePerms]
+
+    # distinct software across the fleet, with the number of visible agents it's installed on
+    def get(self, request):
+        name = request.query_params.get("name", "")
+        if not name:
+            return notify_error("A software name is required")
+
+        catalog = SoftwareCatalog.objects.filter(name__istartswith=name)
+        if "version" in request.query_params:
+            catalog = catalog.filter(version=request.query_params["version"])
+
+        agents = Agent.objects.filter_by_role(request.user)  # type: ignore
+        catalog = (
+            catalog.annotate(
+                agent_count=Count("installs", filter=Q(installs__agent__in=agents))
+            )
+            .filter(agent_count__gt=0)
+            .order_by("name", "version", "publisher")
+        )
+        return Response(SoftwareCatalogSerializer(catalog, many=True).data)
+
+
+class GetSoftwareAgents(APIView):
+    permission_classes = [IsAuthenticated, SoftwarePerms]
+
+    # agents that have a given software (and optionally version) installed
+    def get(self, request):
+        name = request.query_params.get("name", "")
+        if not name:
+            return notify_error("A software name is required")
+
+        installs = AgentSoftware.objects.filter_by_role(request.user).filter(  # type: ignore
+            software__name=name
+        )
+        if "version" in request.query_params:
+            installs = installs.filter(
+                software__version=request.query_params["version"]
+            )
+
+        installs = installs.select_related("agent__site__client", "software").order_by(
+            "agent__hostname"
+        )
+        return Response(AgentSoftwareSerializer(installs, many=True).data)
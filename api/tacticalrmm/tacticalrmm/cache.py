@@ -11,11 +11,57 @@ class TacticalRedisCache(RedisCache):
         if keys:
             self._cache.delete_many(keys)
 
+    def counter_incr(self, key: str, version: Optional[int] = None) -> int:
+        # unlike incr(), a missing key starts at 0, in a single round trip
+        key = self.make_and_validate_key(key, version=version)
+        return self._cache.get_client(key, write=True).incr(key)
+
+    def list_push(self, key: str, value: bytes, version: Optional[int] = None) -> int:
+        key = self.make_and_validate_key(key, version=version)
+        return self._cache.get_client(key, write=True).rpush(key, value)
+
+    def list_push_front(
+        self, key: str, values: list[bytes], version: Optional[int] = None
+    ) -> int:
+        # LPUSH prepends one at a time, so reverse to keep the order
+        key = self.make_and_validate_key(key, version=version)
+        return self._cache.get_client(key, write=True).lpush(key, *reversed(values))
+
+    def list_pop_many(
+        self, key: str, count: int, version: Optional[int] = None
+    ) -> list[bytes]:
+        # LPOP with a count needs redis 6.2, so trim inside MULTI instead
+        key = self.make_and_validate_key(key, version=version)
+        with self._cache.get_client(key, write=True).pipeline() as pipe:
+            pipe.lrange(key, 0, count - 1)
+            pipe.ltrim(key, count, -1)
+            items, _ = pipe.execute()
+
+        return items
+
     # just for debugging
     def show_everything(self, version: Optional[int] = None) -> list[bytes]:
         return self._cache.get_client().keys(f":{version or 1}:*")
 
 
 class TacticalDummyCache(DummyCache):
+    def counter_incr(self, key: str, version: Optional[int] = None) -> int:
+        return 0
+
     def delete_many_pattern(self, pattern: str, version: Optional[int] = None) -> None:
         return None
+
+    def list_push(
+        self, key: str, value: bytes, version: Optional[int] = None
+    ) -> Optional[int]:
+        return None
+
+    def list_push_front(
+        self, key: str, values: list[bytes], version: Optional[int] = None
+    ) -> Optional[int]:
+        return None
+
+    def list_pop_many(
+        self, key: str, count: int, version: Optional[int] = None
+    ) -> list[bytes]:
+        return []
@@ -69,6 +69,14 @@ app.conf.beat_schedule = {
         "task": "core.tasks.resolve_alerts_task",
         "schedule": timedelta(seconds=80.0),
     },
+    "flush-log-queue-task": {
+        "task": "logs.tasks.flush_log_queue_task",
+        "schedule": timedelta(seconds=10.0),
+    },
+    "fail-stuck-report-jobs-task": {
+        "task": "ee.reporting.tasks.fail_stuck_report_job_items_task",
+        "schedule": crontab(minute="*/5", hour="*"),
+    },
 }
 
 
@@ -20,11 +20,17 @@ class MeshAgentIdent(Enum):
 
 CORESETTINGS_CACHE_KEY = "core_settings"
 ROLE_CACHE_PREFIX = "role_"
+ROLE_PERMS_CACHE_PREFIX = "roleperms_"
+AGENT_SITE_CACHE_PREFIX = "agent_site_"
 AGENT_TBL_PEND_ACTION_CNT_CACHE_PREFIX = "agent_tbl_pendingactions_"
+AGENT_TBL_COUNT_CACHE_PREFIX = "agent_tbl_count_"
+AUDIT_LOG_COUNT_CACHE_PREFIX = "audit_log_count_"
+PRUNE_CURSOR_CACHE_PREFIX = "prune_cursor_"
 
 AGENT_STATUS_ONLINE = "online"
 AGENT_STATUS_OFFLINE = "offline"
 AGENT_STATUS_OVERDUE = "overdue"
+AGENT_STATUSES = (AGENT_STATUS_ONLINE, AGENT_STATUS_OFFLINE, AGENT_STATUS_OVERDUE)
 
 REDIS_LOCK_EXPIRE = 60 * 60 * 2  # Lock expires in 2 hours
 RESOLVE_ALERTS_LOCK = "resolve-alerts-lock-key"
@@ -32,9 +38,23 @@ SYNC_SCHED_TASK_LOCK = "sync-sched-tasks-lock-key"
 AGENT_OUTAGES_LOCK = "agent-outages-task-lock-key"
 ORPHANED_WIN_TASK_LOCK = "orphaned-win-task-lock-key"
 SYNC_MESH_PERMS_TASK_LOCK = "sync-mesh-perms-lock-key"
+NATS_RELOAD_PENDING_KEY = "nats-reload-pending-key"
+NATS_RELOAD_RECENT_KEY = "nats-reload-recent-key"
+LOG_WRITER_QUEUE_KEY = "log-writer-queue"
 
 TRMM_WS_MAX_SIZE = getattr(settings, "TRMM_WS_MAX_SIZE", 100 * 2**20)
 TRMM_MAX_REQUEST_SIZE = getattr(settings, "TRMM_MAX_REQUEST_SIZE", 10 * 2**20)
+LOG_WRITER_BATCH_SIZE = getattr(settings, "LOG_WRITER_BATCH_SIZE", 500)
+# below this many rows an exact count of the audit log is cheap enough
+AUDIT_LOG_ESTIMATE_MIN = getattr(settings, "AUDIT_LOG_ESTIMATE_MIN", 100_000)
+# batched deletes of old history/log rows, see tacticalrmm/prune.py
+PRUNE_BATCH_SIZE = getattr(settings, "PRUNE_BATCH_SIZE", 5000)
+PRUNE_BATCH_PAUSE = getattr(settings, "PRUNE_BATCH_PAUSE", 0.2)
+PRUNE_MAX_SECONDS = getattr(settings, "PRUNE_MAX_SECONDS", 30 * 60)
+# read only database alias, see tacticalrmm/routers.py
+READ_REPLICA_ALIAS = getattr(settings, "READ_REPLICA_ALIAS", "replica")
+READ_REPLICA_MAX_LAG = getattr(settings, "READ_REPLICA_MAX_LAG", 30)
+READ_REPLICA_CHECK_INTERVAL = 10
 
 
 class GoArch(models.TextChoices):
@@ -268,8 +288,6 @@ class URLActionRestMethod(models.TextChoices):
 
 # Agent db fields that are not needed for most queries, speeds up query
 AGENT_DEFER = (
-    "wmi_detail",
-    "services",
     "created_by",
     "created_time",
     "modified_by",
@@ -277,13 +295,36 @@ AGENT_DEFER = (
 )
 
 AGENT_TABLE_DEFER = (
-    "services",
     "created_by",
     "created_time",
     "modified_by",
     "modified_time",
 )
 
+# Agent fields stored on the AgentInventory model
+AGENT_INVENTORY_FIELDS = (
+    "wmi_detail",
+    "services",
+    "disks",
+)
+
+# Agent fields needed to render fleet search results
+AGENT_SEARCH_FIELDS = (
+    "pk",
+    "agent_id",
+    "hostname",
+    "description",
+    "plat",
+    "monitoring_type",
+    "last_seen",
+    "overdue_time",
+    "offline_time",
+    "logged_in_username",
+    "public_ip",
+    "site__name",
+    "site__client__name",
+)
+
 ONLINE_AGENTS = (
     "pk",
     "agent_id",
@@ -0,0 +1,144 @@
+import base64
+import json
+from typing import TYPE_CHECKING, Any, Optional
+
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+if TYPE_CHECKING:
+    from django.db.models import Model, QuerySet
+    from rest_framework.request import Request
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on a single sort column with the primary key as
+    the tie breaker. Unlike offset pagination the cost of fetching a page does
+    not grow with its position, as long as (column, id) is indexed.
+
+    The cursor is an opaque string holding the sort value and pk of the last
+    row of the previous page. Nulls sort last ascending and first descending,
+    matching postgres so the same index serves both directions.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    ordering_fields: "tuple[str, ...]" = ("pk",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request: "Request") -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request: "Request") -> str:
+        ordering = request.query_params.get(self.ordering_query_param, "")
+        if ordering.lstrip("-") in self.ordering_fields:
+            return ordering
+
+        return self.ordering_fields[0]
+
+    def get_count(self, queryset: "QuerySet", request: "Request") -> int:
+        return queryset.count()
+
+    def decode_cursor(self, model: "type[Model]", field: str, cursor: str) -> Any:
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if value is not None:
+                value = model._meta.get_field(field).to_python(value)
+            return value, int(pk)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance: "Model", field: str) -> str:
+        # str() keeps full microsecond precision for datetimes
+        position = [getattr(instance, field), instance.pk]
+        return base64.urlsafe_b64encode(
+            json.dumps(position, default=str).encode()
+        ).decode()
+
+    def seek(
+        self, field: str, value: Any, pk: int, descending: bool, nullable: bool
+    ) -> Q:
+        op = "lt" if descending else "gt"
+        after_pk = Q(**{f"pk__{op}": pk})
+
+        if value is None:
+            if descending:
+                return (Q(**{f"{field}__isnull": True}) & after_pk) | Q(
+                    **{f"{field}__isnull": False}
+                )
+            return Q(**{f"{field}__isnull": True}) & after_pk
+
+        ret = Q(**{f"{field}__{op}": value}) | (Q(**{field: value}) & after_pk)
+        if nullable and not descending:
+            ret |= Q(**{f"{field}__isnull": True})
+        return ret
+
+    def paginate_queryset(
+        self, queryset: "QuerySet", request: "Request", view: Any = None
+    ) -> "list[Model]":
+        self.count = self.get_count(queryset, request)
+        return self.paginate(
+            queryset,
+            ordering=self.get_ordering(request),
+            cursor=request.query_params.get(self.cursor_query_param),
+            page_size=self.get_page_size(request),
+        )
+
+    def paginate(
+        self,
+        queryset: "QuerySet",
+        *,
+        ordering: str,
+        cursor: Optional[str],
+        page_size: int,
+    ) -> "list[Model]":
+        descending = ordering.startswith("-")
+        field = ordering.lstrip("-")
+        if field == "pk":
+            field = queryset.model._meta.pk.name
+
+        queryset = queryset.order_by(ordering, "-pk" if descending else "pk")
+
+        if cursor:
+            value, pk = self.decode_cursor(queryset.model, field, cursor)
+            nullable = queryset.model._meta.get_field(field).null
+            queryset = queryset.filter(
+                self.seek(field, value, pk, descending, nullable)
+            )
+
+        results = list(queryset[: page_size + 1])
+        self.next = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next = self.encode_cursor(results[-1], field)
+
+        return results
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response({"count": self.count, "next": self.next, "results": data})
+
+
+def estimated_count(model: "type[Model]") -> int:
+    """
+    The planner's row estimate for a whole table, kept up to date by
+    autovacuum/analyze. Returns -1 if the table has never been analyzed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+
+    return int(row[0]) if row else -1
@@ -1,13 +1,14 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, NamedTuple
 
+from django.core.cache import cache
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 
 from agents.models import Agent
-from tacticalrmm.constants import AGENT_DEFER
+from tacticalrmm.constants import AGENT_SITE_CACHE_PREFIX, ROLE_PERMS_CACHE_PREFIX
 
 if TYPE_CHECKING:
-    from accounts.models import User
+    from accounts.models import Role, User
 
 
 def _has_perm(request, perm: str) -> bool:
@@ -23,9 +24,78 @@ def _has_perm(request, perm: str) -> bool:
     return request.user.role and getattr(request.user.role, perm)
 
 
-def _has_perm_on_agent(user: "User", agent_id: str) -> bool:
-    from agents.models import Agent
+class RolePerms(NamedTuple):
+    """
+    The ids of the clients and sites a role is limited to. site_ids includes every
+    site of the clients. Both are empty if the role isn't limited.
+    """
+
+    client_ids: "frozenset[int]"
+    site_ids: "frozenset[int]"
+
+    @property
+    def restricted(self) -> bool:
+        return bool(self.client_ids or self.site_ids)
+
+
+UNRESTRICTED = RolePerms(frozenset(), frozenset())
 
+
+def get_role_perm_index(role: "Role") -> RolePerms:
+    """
+    Cached per role, cleared when the role, its clients/sites or a site's client changes.
+    """
+    from clients.models import Site
+
+    key = f"{ROLE_PERMS_CACHE_PREFIX}{role.pk}"
+    ret = cache.get(key)
+    if ret is None:
+        client_ids = frozenset(i.pk for i in role.can_view_clients.all())
+        site_ids = frozenset(i.pk for i in role.can_view_sites.all()) | frozenset(
+            Site.objects.filter(client_id__in=client_ids).values_list("pk", flat=True)
+        )
+        ret = RolePerms(client_ids, site_ids)
+        cache.set(key, ret, 600)
+
+    return ret
+
+
+def get_user_perms(user: "User") -> RolePerms:
+    """
+    What filter_by_role limits a user to. Views filtering several querysets can
+    fetch this once and pass it to filter_by_role with perms=.
+    """
+    role = user.role
+    if user.is_superuser or not role or getattr(role, "is_superuser"):
+        return UNRESTRICTED
+
+    return get_role_perm_index(role)
+
+
+def get_agent_site_client(agent_id: str) -> "tuple[int, int]":
+    """Returns (site id, client id) for an agent, 404 if it doesn't exist."""
+    key = f"{AGENT_SITE_CACHE_PREFIX}{agent_id}"
+    ret = cache.get(key)
+    if ret is None:
+        ret = tuple(
+            get_object_or_404(
+                Agent.objects.values_list("site_id", "site__client_id"),
+                agent_id=agent_id,
+            )
+        )
+        cache.set(key, ret, 600)
+
+    return ret
+
+
+def _to_pk(value: Any) -> "int | None":
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _has_perm_on_agent(user: "User", agent_id: str) -> bool:
     role = user.get_and_set_role_cache()
     if user.is_superuser or (role and getattr(role, "is_superuser")):
         return True
@@ -34,23 +104,12 @@ def _has_perm_on_agent(user: "User", agent_id: str) -> bool:
     elif not role:
         return False
 
-    agent = get_object_or_404(
-        Agent.objects.defer(*AGENT_DEFER).select_related("site__client"),
-        agent_id=agent_id,
-    )
-    can_view_clients = role.can_view_clients.all() if role else None
-    can_view_sites = role.can_view_sites.all() if role else None
-
-    if not can_view_clients and not can_view_sites:
-        return True
-
-    elif can_view_clients and agent.client in can_view_clients:
+    client_ids, site_ids = get_role_perm_index(role)
+    if not client_ids and not site_ids:
         return True
 
-    elif can_view_sites and agent.site in can_view_sites:
-        return True
-
-    return False
+    site_id, client_id = get_agent_site_client(agent_id)
+    return site_id in site_ids or client_id in client_ids
 
 
 def _has_perm_on_client(user: "User", client_id: int) -> bool:
@@ -64,15 +123,12 @@ def _has_perm_on_client(user: "User", client_id: int) -> bool:
     elif not role:
         return False
 
-    client = get_object_or_404(Client, pk=client_id)
-    can_view_clients = role.can_view_clients.all() if role else None
-
-    if not can_view_clients:
-        return True
-
-    elif can_view_clients and client in can_view_clients:
+    client_ids, _ = get_role_perm_index(role)
+    if not client_ids or _to_pk(client_id) in client_ids:
         return True
 
+    # only hit the db to 404 on clients that don't exist
+    get_object_or_404(Client, pk=client_id)
     return False
 
 
@@ -87,19 +143,15 @@ def _has_perm_on_site(user: "User", site_id: int) -> bool:
     elif not role:
         return False
 
-    site = get_object_or_404(Site, pk=site_id)
-    can_view_clients = role.can_view_clients.all() if role else None
-    can_view_sites = role.can_view_sites.all() if role else None
-
-    if not can_view_clients and not can_view_sites:
-        return True
-
-    elif can_view_sites and site in can_view_sites:
+    client_ids, site_ids = get_role_perm_index(role)
+    if not client_ids and not site_ids:
         return True
 
-    elif can_view_clients and site.client in can_view_clients:
+    elif _to_pk(site_id) in site_ids:
         return True
 
+    # only hit the db to 404 on sites that don't exist
+    get_object_or_404(Site, pk=site_id)
     return False
 
 
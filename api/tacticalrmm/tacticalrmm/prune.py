@@ -0,0 +1,129 @@
+"""
+Batched deletes for the history and log tables.
+
+Old rows are deleted in primary key order, a bounded batch per statement with
+a short pause in between, so no single delete holds locks or loads rows for
+long. A run that hits its time budget stores how far it got and the next run
+picks up from there. Range partitions that lie entirely before the cutoff
+are dropped instead of deleted row by row.
+"""
+
+import re
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+from tacticalrmm.constants import (
+    PRUNE_BATCH_PAUSE,
+    PRUNE_BATCH_SIZE,
+    PRUNE_CURSOR_CACHE_PREFIX,
+    PRUNE_MAX_SECONDS,
+)
+from tacticalrmm.logger import logger
+
+if TYPE_CHECKING:
+    from django.db.models import Model, QuerySet
+
+
+class PruneResult(NamedTuple):
+    deleted: int
+    seconds: float
+    finished: bool
+
+    @property
+    def rate(self) -> float:
+        return self.deleted / self.seconds if self.seconds else float(self.deleted)
+
+    def __str__(self) -> str:
+        return f"{self.deleted} rows in {self.seconds:.1f}s ({self.rate:.0f}/s)"
+
+
+def drop_old_partitions(model: "type[Model]", field: str, cutoff: datetime) -> int:
+    """
+    Drops the range partitions of the model's table, partitioned on field,
+    whose upper bound is at or before cutoff. Returns the estimated number of
+    rows dropped, 0 if the table isn't partitioned.
+    """
+    table = model._meta.db_table
+    column = model._meta.get_field(field).column
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_partkeydef(c.oid) FROM pg_class c "
+            "WHERE c.oid = %s::regclass AND c.relkind = 'p'",
+            [table],
+        )
+        row = cursor.fetchone()
+        if not row or row[0] != f"RANGE ({column})":
+            return 0
+
+        cursor.execute(
+            "SELECT c.relname, c.reltuples::bigint, "
+            "pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+            [table],
+        )
+        partitions = cursor.fetchall()
+
+        dropped = 0
+        for name, rows, bound in partitions:
+            # the default partition and MAXVALUE bounds never expire
+            m = re.search(r"TO \('([^']+)'\)", bound or "")
+            upper = parse_datetime(m.group(1)) if m else None
+            if upper and upper <= cutoff:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+                dropped += max(rows, 0)
+
+    return dropped
+
+
+def prune_older_than(
+    queryset: "QuerySet",
+    field: str,
+    cutoff: datetime,
+    *,
+    name: Optional[str] = None,
+    batch_size: int = PRUNE_BATCH_SIZE,
+    pause: float = PRUNE_BATCH_PAUSE,
+    max_seconds: float = PRUNE_MAX_SECONDS,
+) -> PruneResult:
+    model = queryset.model
+    name = name or model._meta.label_lower
+    cursor_key = f"{PRUNE_CURSOR_CACHE_PREFIX}{name}"
+    start = time.monotonic()
+
+    # a partition can only go as a whole when nothing else filters the rows
+    deleted = 0 if queryset.query.where else drop_old_partitions(model, field, cutoff)
+
+    queryset = queryset.filter(**{f"{field}__lt": cutoff}).order_by("pk")
+    last_pk = cache.get(cursor_key)
+    finished = False
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch.values_list("pk", flat=True)[:batch_size])
+        if pks:
+            model.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+            last_pk = pks[-1]
+
+        if len(pks) < batch_size:
+            finished = True
+            break
+
+        if time.monotonic() - start >= max_seconds:
+            # pick up from here next run
+            cache.set(cursor_key, last_pk, 60 * 60 * 24)
+            break
+
+        time.sleep(pause)
+
+    if finished:
+        cache.delete(cursor_key)
+
+    result = PruneResult(deleted, time.monotonic() - start, finished)
+    logger.info(f"Pruned {name}: {result}{'' if finished else ', will resume'}")
+    return result
@@ -0,0 +1,139 @@
+"""
+Routes read only work to a replica database.
+
+Reads go to the READ_REPLICA_ALIAS database inside use_replica() or a view
+wrapped with read_from_replica, as long as that alias is configured and its
+replication lag is under READ_REPLICA_MAX_LAG seconds. Everything else,
+and every write, stays on the primary. To try it locally, add a second
+DATABASES entry named "replica", for example a copy of the database on
+another local postgres.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import monotonic
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from tacticalrmm.constants import (
+    READ_REPLICA_ALIAS,
+    READ_REPLICA_CHECK_INTERVAL,
+    READ_REPLICA_MAX_LAG,
+)
+from tacticalrmm.logger import logger
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+# (expires, lag), cached per process so the lag isn't queried per read
+_replica_state: Tuple[float, Optional[float]] = (0.0, None)
+
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+def get_replica_lag() -> Optional[float]:
+    """Seconds the replica is behind, None if it can't be reached"""
+    try:
+        with connections[READ_REPLICA_ALIAS].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError as e:
+        logger.error(f"Read replica unavailable: {e}")
+        return None
+
+    # no transaction has been replayed yet
+    return float(lag) if lag is not None else None
+
+
+def replica_lag() -> Optional[float]:
+    """The last measured lag, None when no replica can be used"""
+    global _replica_state
+
+    if READ_REPLICA_ALIAS not in connections.settings:
+        return None
+
+    expires, lag = _replica_state
+    if monotonic() >= expires:
+        lag = get_replica_lag()
+        _replica_state = (monotonic() + READ_REPLICA_CHECK_INTERVAL, lag)
+
+    return lag
+
+
+def replica_available() -> bool:
+    lag = replica_lag()
+    return lag is not None and lag <= READ_REPLICA_MAX_LAG
+
+
+def replica_in_use() -> bool:
+    """Whether reads right now go to the replica"""
+    return _use_replica.get() and replica_available()
+
+
+def clear_replica_state() -> None:
+    global _replica_state
+    _replica_state = (0.0, None)
+
+
+@contextmanager
+def use_replica() -> Iterator[None]:
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_from_replica(func: F) -> F:
+    """Runs a view handler's reads on the replica"""
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with use_replica():
+            return func(*args, **kwargs)
+
+    return wrapper  # type: ignore
+
+
+def iterate_on_replica(chunks: Iterable[Any]) -> Iterator[Any]:
+    """
+    For streamed responses, which are consumed after the view returns. Only
+    the reads that produce each chunk go to the replica.
+    """
+    iterator = iter(chunks)
+    while True:
+        with use_replica():
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+
+        yield chunk
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints) -> str:
+        if replica_in_use():
+            return READ_REPLICA_ALIAS
+
+        # objects read from the replica still load their relations from the
+        # primary once outside use_replica()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
@@ -151,6 +151,9 @@ if "GHACTIONS" in os.environ:
     MESH_SITE = "https://example.com"
     MESH_TOKEN_KEY = "bd65e957a1e70c622d32523f61508400d6cd0937001a7ac12042227eba0b9ed625233851a316d4f489f02994145f74537a331415d00047dbbf13d940f556806dffe7a8ce1de216dc49edbad0c1a7399c"
     REDIS_HOST = "localhost"
+    LOG_WRITER_SYNC = True
+    # the test workers share one redis
+    REPORTING_DATA_CACHE_TTL = 0
 
 if not DOCKER_BUILD:
 
@@ -265,6 +268,8 @@ CACHES = {
     }
 }
 
+DATABASE_ROUTERS = ["tacticalrmm.routers.ReplicaRouter"]
+
 MIDDLEWARE = [
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -277,6 +282,9 @@ MIDDLEWARE = [
     "ee.sso.middleware.SSOIconMiddleware",
 ]
 
+# lists the data sources cut off at REPORTING_QUERY_MAX_ROWS in a report
+CORS_EXPOSE_HEADERS = ["X-Report-Truncated"]
+
 if SWAGGER_ENABLED:
     INSTALLED_APPS += ("drf_spectacular",)
 
@@ -30,6 +30,7 @@ TEST_CACHE = {
     CACHES=TEST_CACHE,
     DEBUG=False,
     ADMIN_ENABLED=False,
+    LOG_WRITER_SYNC=True,
 )
 @modify_settings(
     INSTALLED_APPS={
@@ -1,8 +1,15 @@
+import tempfile
+from pathlib import Path
 from unittest.mock import mock_open, patch
 
 import requests
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import Http404
 from django.test import override_settings
+from django.utils import timezone as djangotime
+from model_bakery import baker
 
+from agents.models import Agent
 from checks.constants import CHECK_DEFER, CHECK_RESULT_DEFER
 from tacticalrmm.constants import (
     AGENT_DEFER,
@@ -11,10 +18,34 @@ from tacticalrmm.constants import (
     ONLINE_AGENTS,
     POLICY_CHECK_FIELDS_TO_COPY,
     POLICY_TASK_FIELDS_TO_COPY,
+    READ_REPLICA_MAX_LAG,
+)
+from tacticalrmm.permissions import (
+    _has_perm_on_agent,
+    _has_perm_on_client,
+    _has_perm_on_site,
+    get_user_perms,
+)
+from tacticalrmm.prune import drop_old_partitions, prune_older_than
+from tacticalrmm.routers import (
+    ReplicaRouter,
+    _use_replica,
+    clear_replica_state,
+    get_replica_lag,
+    iterate_on_replica,
+    read_from_replica,
+    replica_in_use,
+    use_replica,
 )
 from tacticalrmm.test import TacticalTestCase
 
-from .utils import bitdays_to_string, generate_winagent_exe, get_bit_days, reload_nats
+from .utils import (
+    bitdays_to_string,
+    generate_winagent_exe,
+    get_bit_days,
+    reload_nats,
+    schedule_reload_nats,
+)
 
 
 class TestUtils(TacticalTestCase):
@@ -74,9 +105,47 @@ class TestUtils(TacticalTestCase):
     )
     @patch("subprocess.run")
     def test_reload_nats(self, mock_subprocess):
-        _ = reload_nats()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            BASE_DIR=Path(tmp)
+        ):
+            _ = reload_nats()
+            mock_subprocess.assert_called_once()
+
+            # config is unchanged so the file is not rewritten and nats is not signaled
+            mock_subprocess.reset_mock()
+            _ = reload_nats()
+            mock_subprocess.assert_not_called()
 
-        mock_subprocess.assert_called_once()
+            with override_settings(SECRET_KEY="sekret2"):
+                _ = reload_nats()
+            mock_subprocess.assert_called_once()
+
+    @patch("tacticalrmm.utils.reload_nats")
+    @patch("core.tasks.reload_nats_task.apply_async")
+    def test_schedule_reload_nats(self, apply_async, reload_nats):
+        # the first request reloads inline, the second queues a reload and
+        # the rest find it pending
+        with patch(
+            "tacticalrmm.utils.cache.add",
+            side_effect=[True, False, True] + [False, False] * 3,
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(5):
+                    schedule_reload_nats()
+
+        reload_nats.assert_called_once()
+        apply_async.assert_called_once()
+
+    @patch("tacticalrmm.utils.reload_nats")
+    @patch(
+        "core.tasks.reload_nats_task.apply_async", side_effect=OSError("broker down")
+    )
+    def test_schedule_reload_nats_without_broker(self, apply_async, reload_nats):
+        with patch("tacticalrmm.utils.cache.add", side_effect=[False, True]):
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_reload_nats()
+
+        reload_nats.assert_called_once()
 
     def test_bitdays_to_string(self):
         a = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
@@ -134,3 +203,241 @@ class TestUtils(TacticalTestCase):
 
         for i in CHECK_RESULT_DEFER:
             self.assertIn(i, check_result_fields)
+
+
+class TestPermissionIndex(TacticalTestCase):
+    def setUp(self):
+        self.setup_coresettings()
+        self.setup_base_instance()
+        self.cache = LocMemCache("perms", {})
+        self.cache.clear()
+        self.cache.delete_many_pattern = lambda pattern: self.cache.clear()
+        self.addCleanup(self.cache.clear)
+        for module in (
+            "tacticalrmm.permissions",
+            "accounts.models",
+            "accounts.signals",
+            "agents.models",
+        ):
+            p = patch(f"{module}.cache", self.cache)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_perm_checks_use_cached_index(self):
+        agent = baker.make_recipe("agents.agent", site=self.site3)
+        user = self.create_user_with_roles([])
+        user.role.can_view_clients.set([self.company2])
+
+        self.assertTrue(_has_perm_on_agent(user, agent.agent_id))
+        with self.assertNumQueries(0):
+            self.assertTrue(_has_perm_on_agent(user, agent.agent_id))
+            self.assertTrue(_has_perm_on_site(user, self.site3.pk))
+            self.assertTrue(_has_perm_on_client(user, str(self.company2.pk)))
+
+        with self.assertNumQueries(1):
+            self.assertFalse(_has_perm_on_site(user, self.site1.pk))
+
+        self.assertRaises(Http404, _has_perm_on_site, user, 999999)
+        self.assertRaises(Http404, _has_perm_on_agent, user, "doesnotexist")
+
+    @patch("accounts.signals.cache")
+    @patch("clients.models.cache")
+    def test_perm_index_invalidated(self, clients_cache, signals_cache):
+        user = self.create_user_with_roles([])
+        user.role.can_view_sites.set([self.site1])
+        signals_cache.delete.assert_called_with(f"roleperms_{user.role.pk}")
+
+        site = baker.make("clients.Site", client=self.company2)
+        clients_cache.delete_many_pattern.assert_called_with("roleperms_*")
+
+        # agents are cached with their site, moving one clears its entry
+        agent = baker.make_recipe("agents.agent", site=self.site1)
+        self.assertTrue(_has_perm_on_agent(user, agent.agent_id))
+        agent.site = site
+        agent.save()
+        self.assertFalse(_has_perm_on_agent(user, agent.agent_id))
+
+    def test_perm_index_invalidated_on_delete(self):
+        user = self.create_user_with_roles([])
+        user.role.can_view_clients.set([self.company2])
+        agent = baker.make_recipe("agents.agent", site=self.site3)
+        self.assertTrue(_has_perm_on_agent(user, agent.agent_id))
+        self.assertTrue(_has_perm_on_site(user, self.site3.pk))
+
+        agent.delete()
+        self.assertRaises(Http404, _has_perm_on_agent, user, agent.agent_id)
+
+        site_pk = self.site3.pk
+        self.site3.delete()
+        self.assertRaises(Http404, _has_perm_on_site, user, site_pk)
+
+    def test_filter_by_role(self):
+        from agents.models import Agent
+        from alerts.models import Alert
+        from clients.models import Client, Site
+
+        agents = [
+            baker.make_recipe("agents.agent", site=site)
+            for site in (self.site1, self.site2, self.site3)
+        ]
+        agent_alert = baker.make("alerts.Alert", agent=agents[2])
+        custom_alert = baker.make("alerts.Alert")
+        user = self.create_user_with_roles([])
+        user.role.can_view_clients.set([self.company2])
+        user.role.can_view_sites.set([self.site2])
+
+        perms = get_user_perms(user)
+        with self.assertNumQueries(0):
+            qs = Agent.objects.filter_by_role(user, perms=perms)
+            # filters on the site id column, no join through sites and clients
+            self.assertNotIn("clients_", str(qs.query))
+
+        self.assertEqual(set(qs), {agents[1], agents[2]})
+        self.assertEqual(
+            set(Site.objects.filter_by_role(user, perms=perms)),
+            {self.site2, self.site3},
+        )
+        self.assertEqual(
+            set(Client.objects.filter_by_role(user)), {self.company1, self.company2}
+        )
+        self.assertEqual(
+            set(Alert.objects.filter_by_role(user)), {agent_alert, custom_alert}
+        )
+
+        user.role.can_view_clients.clear()
+        user.role.can_view_sites.clear()
+        self.assertEqual(Agent.objects.filter_by_role(user).count(), 3)
+
+
+class TestPrune(TacticalTestCase):
+    def setUp(self):
+        self.cache = LocMemCache("prune", {})
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+        p = patch("tacticalrmm.prune.cache", self.cache)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def make_history(self, old: int, new: int) -> None:
+        from agents.models import AgentHistory
+
+        agent = baker.make_recipe("agents.agent")
+        now = djangotime.now()
+        baker.make(AgentHistory, agent=agent, _quantity=old + new)
+        pks = AgentHistory.objects.order_by("pk").values_list("pk", flat=True)
+        AgentHistory.objects.filter(pk__in=list(pks[:old])).update(
+            time=now - djangotime.timedelta(days=40)
+        )
+
+    @patch("tacticalrmm.prune.time.sleep")
+    def test_prune_in_batches(self, sleep):
+        from agents.models import AgentHistory
+
+        self.make_history(old=25, new=5)
+        cutoff = djangotime.now() - djangotime.timedelta(days=30)
+
+        result = prune_older_than(
+            AgentHistory.objects.all(), "time", cutoff, batch_size=10
+        )
+        self.assertEqual(result.deleted, 25)
+        self.assertTrue(result.finished)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(AgentHistory.objects.count(), 5)
+
+    @patch("tacticalrmm.prune.time.sleep")
+    def test_prune_resumes_after_time_budget(self, sleep):
+        from agents.models import AgentHistory
+
+        self.make_history(old=25, new=5)
+        cutoff = djangotime.now() - djangotime.timedelta(days=30)
+        qs = AgentHistory.objects.all()
+
+        result = prune_older_than(qs, "time", cutoff, batch_size=10, max_seconds=0)
+        self.assertEqual(result.deleted, 10)
+        self.assertFalse(result.finished)
+        last_pk = self.cache.get("prune_cursor_agents.agenthistory")
+        self.assertEqual(AgentHistory.objects.filter(pk__lte=last_pk).count(), 0)
+
+        result = prune_older_than(qs, "time", cutoff, batch_size=10)
+        self.assertEqual(result.deleted, 15)
+        self.assertTrue(result.finished)
+        self.assertIsNone(self.cache.get("prune_cursor_agents.agenthistory"))
+        self.assertEqual(AgentHistory.objects.count(), 5)
+
+    def test_unpartitioned_tables_are_left_alone(self):
+        from agents.models import AgentHistory
+
+        self.assertEqual(drop_old_partitions(AgentHistory, "time", djangotime.now()), 0)
+
+
+class TestReplicaRouter(TacticalTestCase):
+    def setUp(self):
+        clear_replica_state()
+        self.addCleanup(clear_replica_state)
+        self.router = ReplicaRouter()
+
+    def add_replica(self):
+        from django.db import connections
+
+        p = patch.dict(
+            connections.settings, {"replica": connections.settings["default"]}
+        )
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_no_replica_configured(self):
+        with use_replica():
+            self.assertFalse(replica_in_use())
+            self.assertEqual(self.router.db_for_read(Agent), "default")
+
+    @patch("tacticalrmm.routers.get_replica_lag", return_value=0.5)
+    def test_reads_routed_inside_use_replica(self, get_lag):
+        self.add_replica()
+
+        self.assertEqual(self.router.db_for_read(Agent), "default")
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Agent), "replica")
+            self.assertEqual(self.router.db_for_write(Agent), "default")
+            self.assertEqual(self.router.db_for_read(Agent), "replica")
+        self.assertEqual(self.router.db_for_read(Agent), "default")
+
+        # the lag is checked once per interval
+        get_lag.assert_called_once()
+
+    @patch("tacticalrmm.routers.get_replica_lag")
+    def test_falls_back_to_primary(self, get_lag):
+        self.add_replica()
+
+        for lag in (READ_REPLICA_MAX_LAG + 1, None):
+            clear_replica_state()
+            get_lag.return_value = lag
+            with use_replica():
+                self.assertEqual(self.router.db_for_read(Agent), "default")
+
+    @patch("tacticalrmm.routers.READ_REPLICA_ALIAS", "default")
+    def test_replica_lag_on_primary(self):
+        self.assertEqual(get_replica_lag(), 0)
+
+    def test_read_from_replica_decorator(self):
+        @read_from_replica
+        def view():
+            return _use_replica.get()
+
+        self.assertTrue(view())
+        self.assertFalse(_use_replica.get())
+
+    def test_iterate_on_replica(self):
+        def chunks():
+            for _ in range(2):
+                yield _use_replica.get()
+
+        stream = iterate_on_replica(chunks())
+        self.assertTrue(next(stream))
+        # nothing outside the chunks runs on the replica
+        self.assertFalse(_use_replica.get())
+        self.assertEqual(list(stream), [True])
+        self.assertFalse(_use_replica.get())
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "agents"))
+        self.assertFalse(self.router.allow_migrate("replica", "agents"))
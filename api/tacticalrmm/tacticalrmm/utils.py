@@ -4,7 +4,7 @@ import subprocess
 import tempfile
 import time
 import re
-from contextlib import contextmanager
+from contextlib import contextmanager, suppress
 from typing import TYPE_CHECKING, List, Literal, Optional, Union
 from zoneinfo import ZoneInfo
 
@@ -14,6 +14,7 @@ from channels.db import database_sync_to_async
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
+from django.db import transaction
 from django.http import FileResponse
 from knox.auth import TokenAuthentication
 from rest_framework.response import Response
@@ -24,6 +25,8 @@ from logs.models import DebugLog
 from tacticalrmm.constants import (
     MONTH_DAYS,
     MONTHS,
+    NATS_RELOAD_PENDING_KEY,
+    NATS_RELOAD_RECENT_KEY,
     REDIS_LOCK_EXPIRE,
     WEEK_DAYS,
     WEEKS,
@@ -39,6 +42,7 @@ from tacticalrmm.helpers import (
     get_nats_ports,
     notify_error,
 )
+from tacticalrmm.logger import logger
 
 if TYPE_CHECKING:
     from clients.models import Client, Site
@@ -181,32 +185,40 @@ def reload_nats() -> None:
             "permissions": {"publish": ">", "subscribe": ">"},
         }
     ]
-    agents = Agent.objects.prefetch_related("user").only(
-        "pk", "agent_id"
-    )  # type:ignore
-    for agent in agents:
-        try:
-            users.append(
-                {
-                    "user": agent.agent_id,
-                    "password": agent.user.auth_token.key,
-                    "permissions": {
-                        "publish": {"allow": agent.agent_id},
-                        "subscribe": {"allow": agent.agent_id},
-                        "allow_responses": {
-                            "expires": getattr(
-                                settings, "NATS_ALLOW_RESPONSE_EXPIRATION", "1435m"
-                            )
-                        },
+    # one joined query for every agent's credentials instead of a query per agent
+    agents = Agent.objects.order_by("pk").values_list(
+        "agent_id", "user__auth_token__key"
+    )
+    missing = []
+    for agent_id, key in agents:
+        if not key:
+            missing.append(agent_id)
+            continue
+
+        users.append(
+            {
+                "user": agent_id,
+                "password": key,
+                "permissions": {
+                    "publish": {"allow": agent_id},
+                    "subscribe": {"allow": agent_id},
+                    "allow_responses": {
+                        "expires": getattr(
+                            settings, "NATS_ALLOW_RESPONSE_EXPIRATION", "1435m"
+                        )
                     },
-                }
-            )
-        except:
-            DebugLog.critical(
-                agent=agent,
-                log_type=DebugLogType.AGENT_ISSUES,
-                message=f"{agent.hostname} does not have a user account, NATS will not work",
-            )
+                },
+            }
+        )
+
+    for agent in Agent.objects.filter(agent_id__in=missing).only(
+        "pk", "agent_id", "hostname"
+    ):
+        DebugLog.critical(
+            agent=agent,
+            log_type=DebugLogType.AGENT_ISSUES,
+            message=f"{agent.hostname} does not have a user account, NATS will not work",
+        )
 
     cert_file, key_file = get_certs()
     nats_std_host, nats_ws_host, _ = get_nats_hosts()
@@ -239,8 +251,24 @@ def reload_nats() -> None:
         config["websocket"]["compression"] = True
 
     conf = os.path.join(settings.BASE_DIR, "nats-rmm.conf")
-    with open(conf, "w") as f:
-        json.dump(config, f)
+    data = json.dumps(config).encode()
+
+    # nothing changed, so no need to rewrite the file or signal the server
+    with suppress(OSError), open(conf, "rb") as f:
+        if f.read() == data:
+            return
+
+    # write to a temp file and rename it over the old one so nats never reads a partial config
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(conf), prefix=".nats-rmm.conf.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, conf)
+    except Exception:
+        with suppress(OSError):
+            os.unlink(tmp)
+        raise
 
     if not settings.DOCKER_BUILD:
         time.sleep(0.5)
@@ -249,6 +277,36 @@ def reload_nats() -> None:
         )
 
 
+def schedule_reload_nats() -> None:
+    """
+    Reloads nats once the current transaction commits. The first request runs
+    inline, so a single new agent can connect straight away. Requests made
+    within NATS_RELOAD_DEBOUNCE seconds of it are coalesced into one queued
+    run, so installing many agents at once results in one more rebuild of the
+    nats config instead of one per agent.
+    """
+    from core.tasks import reload_nats_task
+
+    debounce = getattr(settings, "NATS_RELOAD_DEBOUNCE", 5)
+
+    def _schedule() -> None:
+        if cache.add(NATS_RELOAD_RECENT_KEY, 1, debounce):
+            reload_nats()
+            return
+
+        if cache.add(NATS_RELOAD_PENDING_KEY, 1, 120):
+            try:
+                reload_nats_task.apply_async(countdown=debounce)
+            except Exception as e:
+                # the broker is down, don't leave the agent without credentials
+                logger.error(f"Unable to queue a nats reload, reloading now: {e}")
+                cache.delete(NATS_RELOAD_PENDING_KEY)
+                reload_nats()
+
+    # after commit, so the reload is guaranteed to see the new agent
+    transaction.on_commit(_schedule)
+
+
 @database_sync_to_async
 def get_user(access_token):
     try:
@@ -125,7 +125,9 @@ func Svc(logger *logrus.Logger, cfg string) {
 						return
 					}
 					stmt := `
-					UPDATE agents_agent SET disks=$1 WHERE agents_agent.agent_id=$2;`
+					INSERT INTO agents_agentinventory (agent_id, disks)
+					SELECT agents_agent.id, $1 FROM agents_agent WHERE agents_agent.agent_id=$2
+					ON CONFLICT (agent_id) DO UPDATE SET disks=EXCLUDED.disks;`
 
 					_, err = db.Exec(stmt, b, r.Agentid)
 					if err != nil {
@@ -146,7 +148,9 @@ func Svc(logger *logrus.Logger, cfg string) {
 					}
 
 					stmt := `
-					UPDATE agents_agent SET services=$1 WHERE agents_agent.agent_id=$2;`
+					INSERT INTO agents_agentinventory (agent_id, services)
+					SELECT agents_agent.id, $1 FROM agents_agent WHERE agents_agent.agent_id=$2
+					ON CONFLICT (agent_id) DO UPDATE SET services=EXCLUDED.services;`
 
 					_, err = db.Exec(stmt, b, r.Agentid)
 					if err != nil {
@@ -166,7 +170,9 @@ func Svc(logger *logrus.Logger, cfg string) {
 						return
 					}
 					stmt := `
-					UPDATE agents_agent SET wmi_detail=$1 WHERE agents_agent.agent_id=$2;`
+					INSERT INTO agents_agentinventory (agent_id, wmi_detail)
+					SELECT agents_agent.id, $1 FROM agents_agent WHERE agents_agent.agent_id=$2
+					ON CONFLICT (agent_id) DO UPDATE SET wmi_detail=EXCLUDED.wmi_detail;`
 
 					_, err = db.Exec(stmt, b, r.Agentid)
 					if err != nil {